@@ -7,9 +7,12 @@ https://docs.djangoproject.com/en/4.1/ref/contrib/auth/#topics-auth-signals
 """
 
 from django.contrib.auth import user_logged_in, user_logged_out
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
-from .models import LoggedInUser
+from config.resultcache import bump_versions_on_commit
+
+from .models import LoggedInUser, User
 
 
 @receiver(user_logged_in)
@@ -28,3 +31,21 @@ def on_user_logged_out(sender, **kwargs):
     clave de la sesión de la tabla `loggedinuser`.
     """
     LoggedInUser.objects.filter(user=kwargs.get("user")).delete()
+
+
+@receiver([post_save, post_delete], sender=User)
+@receiver(m2m_changed, sender=User.companies_to_monitor.through)
+@receiver(m2m_changed, sender=User.vehicles_to_monitor.through)
+@receiver(m2m_changed, sender=User.group_vehicles.through)
+def on_user_changed(sender, **kwargs):
+    """
+    Señal que se dispara cuando cambia un usuario o sus asignaciones: invalida los listados de la
+    caché `listing` que dependen de `user` (usuarios y vehículos o comandos por usuario).
+
+    Cada inicio de sesión guarda `last_login`, que no aparece en los listados: ese cambio no
+    invalida nada.
+    """
+    if kwargs.get("update_fields") == {"last_login"}:
+        return
+    if kwargs.get("action", "post_").startswith("post_"):
+        bump_versions_on_commit("user")
@@ -1,6 +1,10 @@
 from django.db import DatabaseError, connection
 
+from config.resultcache import cached_procedure
+from config.resultset import ResultSet
 
+
+@cached_procedure("ListUserByCompany", "user")
 def fetch_all_user(company, user, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -11,8 +15,7 @@ def fetch_all_user(company, user, search_query=None):
             )
 
             rows = cursor.fetchall()
-            columns = [col[0] for col in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return ResultSet.from_cursor(cursor, rows)
 
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
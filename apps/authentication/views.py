@@ -45,9 +45,9 @@ from apps.log.mixins import (CreateAuditLogAsyncMixin, CreateAuditLogSyncMixin,
                              DeleteAuditLogSyncMixin, UpdateAuditLogSyncMixin,
                              obtener_ip_publica)
 from apps.log.utils import log_action
-from apps.realtime.apis import sort_key
 from apps.realtime.models import Vehicle, VehicleGroup
 from apps.whitelabel.models import Company, Module, Process
+from config.sorting import sort_rows
 
 from .forms import (LoginForm_, PasswordChangeForm_, PasswordResetForm_,
                     PermissionForm, SetPasswordForm_, UserChangeForm_,
@@ -346,11 +346,10 @@ class UserLisTemplate(PermissionRequiredMixin, LoginRequiredMixin, ListView):
         self.request.session[f"filters_sorted_users_{user.id}"] = session_filters
         self.request.session.modified = True
         users = fetch_all_user(company.id, user.id, search)
-        # Función para convertir los valores a minúsculas y extraer números cuando sea necesario
-        key_function = sort_key(order_by)
+        # Orden natural de la columna (ver `config.sorting`)
         reverse = direction == 'desc'
         try:
-            sorted_queryset = sorted(users, key=key_function, reverse=reverse)
+            sorted_queryset = sort_rows(users, order_by, reverse)
         except KeyError:
             # Ordenamiento por defecto si la clave no existe
             sorted_queryset = sorted(
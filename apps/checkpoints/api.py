@@ -2,24 +2,25 @@ import datetime
 import json
 from datetime import datetime, timedelta
 
-import pandas as pd
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.db import connection
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db import DatabaseError
 from django.db.models import Prefetch
 from django.http import HttpResponse, JsonResponse
-from django.utils import translation
 from django.utils.decorators import method_decorator
 from django.utils.translation import gettext as _
-from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 
 from apps.authentication.models import User
 from apps.events.models import Event, EventFeature
-from apps.realtime.apis import sort_key
-from apps.realtime.models import Device
+from apps.realtime.models import AVLData, Device
+from config.exportjobs import ExportJobError, create_job, job_payload
+from config.exports import COLUMNAR_CONTENT_TYPES, ExportView, spooled_response
+from config.listing import ProcedureListView, format_long_date
+from config.pdf import company_branding
 
-from .sql import (fetch_all_confidatasem, get_drivers_list,
-                  getCompanyScoresByCompanyAndUser)
+from .postgres import GeocodingService
+from .reports import REPORT_CONTENT_TYPES, fetch_report_data, write_report
 
 
 def vehicles_by_company(request, company_id):
@@ -104,6 +105,73 @@ def events_person_by_company(request, company_id):
     return JsonResponse(updated_events, safe=False)
 
 
+REPORT_FIELDS = ("Company_id", "Imei", "timezone_offset", "FechaInicial", "FechaFinal")
+
+
+def parse_report_params(data):
+    """
+    Lee los parámetros del informe AVL de los datos de la solicitud.
+
+    Args:
+        data (dict): Valores de `REPORT_FIELDS` (p. ej. `request.POST`).
+
+    Returns:
+        dict: `company_id`, `imei`, `timezone_offset` y las fechas inicial y final en UTC.
+
+    Raises:
+        ValueError: Si el desfase o las fechas no son válidos.
+    """
+    timezone_offset = int(data.get("timezone_offset") or 0)
+    # Ajustar la fecha inicial y final correctamente
+    fecha_inicial = datetime.strptime(
+        data.get("FechaInicial"), "%Y-%m-%dT%H:%M"
+    ) + timedelta(minutes=timezone_offset)
+    fecha_final = datetime.strptime(
+        data.get("FechaFinal"), "%Y-%m-%dT%H:%M"
+    ) + timedelta(minutes=timezone_offset)
+    return {
+        "company_id": data.get("Company_id"),
+        "imei": data.get("Imei"),
+        "timezone_offset": timezone_offset,
+        "fecha_inicial": fecha_inicial,
+        "fecha_final": fecha_final,
+    }
+
+
+def report_title(params):
+    """
+    Retorna el título del PDF del informe AVL: IMEI y rango de fechas en la hora del usuario.
+    """
+    offset = timedelta(minutes=params["timezone_offset"])
+    return _("AVL report %(imei)s (%(start)s - %(end)s)") % {
+        "imei": params["imei"],
+        "start": (params["fecha_inicial"] - offset).strftime("%Y-%m-%d %H:%M"),
+        "end": (params["fecha_final"] - offset).strftime("%Y-%m-%d %H:%M"),
+    }
+
+
+def run_report_job(job, file, progress):
+    """
+    Genera el archivo de un trabajo de exportación del informe AVL (ver `config.exportjobs`).
+    """
+    try:
+        params = parse_report_params(job["params"])
+    except (TypeError, ValueError) as e:
+        raise ExportJobError("Error en los parámetros de entrada: " + str(e))
+    frame = fetch_report_data(**params)
+    if frame is None:
+        raise ExportJobError("No se encontraron resultados.")
+    user = User.objects.select_related("company").get(pk=job["user_id"])
+    write_report(
+        frame,
+        job["format"],
+        file,
+        progress,
+        title=report_title(params),
+        branding=company_branding(user.company),
+    )
+
+
 def export_report(request):
     """
     Exporta un informe en el formato especificado a partir de los datos recibidos en una solicitud
@@ -121,9 +189,12 @@ def export_report(request):
     estado 500.
     - Si no se encuentran resultados, retorna una respuesta JSON con el mensaje de error 'No se
     encontraron resultados' y estado 404.
+    - Si `background` es "1", crea un trabajo de exportación y retorna su estado con estado 202
+    (ver `config.exportjobs`).
     - Si el formato es 'xlsx', retorna un archivo Excel con los datos en el cuerpo de la respuesta.
     - Si el formato es 'csv', retorna un archivo CSV con los datos en el cuerpo de la respuesta.
     - Si el formato es 'pdf', retorna un archivo PDF con los datos en el cuerpo de la respuesta.
+    - Si el formato es 'parquet' o 'arrow', retorna el archivo columnar (ver `config.columnar`).
     """
     if request.method != "POST":
         return HttpResponse("Método no soportado.", status=405)
@@ -132,103 +203,42 @@ def export_report(request):
 
     format = request.POST.get("format")
     try:
-        company_id = request.POST.get("Company_id")
-        imei = request.POST.get("Imei")
-        timezone_offset = int(request.POST.get("timezone_offset", 0))
-
-        # Ajustar la fecha inicial y final correctamente
-        fecha_inicial = datetime.strptime(
-            request.POST.get("FechaInicial"), "%Y-%m-%dT%H:%M"
-        ) + timedelta(minutes=timezone_offset)
-        fecha_final = datetime.strptime(
-            request.POST.get("FechaFinal"), "%Y-%m-%dT%H:%M"
-        ) + timedelta(minutes=timezone_offset)
-        fecha_inicial_str = fecha_inicial.strftime("%Y-%m-%d %H:%M:%S")
-        fecha_final_str = fecha_final.strftime("%Y-%m-%d %H:%M:%S")
-
-        json_result = ""
-
-        with connection.cursor() as cursor:
-            cursor.execute(
-                "EXEC [dbo].[GetAVLData] @Company_ID=%s, @IMEI=%s, @dFIni=%s, @dFFin=%s",
-                [company_id, imei, fecha_inicial_str, fecha_final_str],
-            )
-            rows = cursor.fetchall()
-            if not rows:
-                return JsonResponse(
-                    {"error": "No se encontraron resultados."}, status=404
-                )
-
-            for row in rows:
-                json_result += row[0]
-
-        json_data = json.loads(json_result)
-
-        # Ajustar las fechas en json_data a la zona horaria del usuario
-        for item in json_data:
-            for key in ["server_date", "signal_date"]:
-                if key in item and item[key]:
-                    utc_date = datetime.strptime(item[key], "%Y-%m-%dT%H:%M:%S")
-                    local_date = utc_date - timedelta(minutes=timezone_offset)
-                    item[key] = local_date.strftime("%Y-%m-%d %H:%M:%S")
-        # connectionpostgres = connect_db()
-        # if connectionpostgres is None:
-        #     return JsonResponse(
-        #         {"error": "Failed to connect to the PostgreSQL database."},
-        #         status=500,
-        #     )
-        # try:
-        #     with connectionpostgres.cursor() as geo_cursor:
-        #         for item in json_data:
-        #             latitude = str(item.get("latitude"))
-        #             longitude = str(item.get("longitude"))
-        #             if latitude and longitude:
-        #                 start_time = time.time()
-        #                 geo_cursor.execute(
-        #                     "SELECT public.rev_geocode_gpsmobile(%s, %s)",
-        #                     [longitude, latitude],
-        #                 )
-        #                 location = geo_cursor.fetchone()[0]
-        #                 end_time = time.time()
-        #                 execution_time = end_time - start_time
-        #                 # Añadir el campo "location" al diccionario
-        #                 item["location"] = location
-        # finally:
-        #     connectionpostgres.close()
-
-        df = pd.DataFrame(json_data)
-
-        if format == "xlsx":
-            response = HttpResponse(
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        params = parse_report_params(request.POST)
+
+        if request.POST.get("background") == "1" and format in REPORT_CONTENT_TYPES:
+            job = create_job(
+                "report",
+                request.user,
+                {field: request.POST.get(field) for field in REPORT_FIELDS},
+                format,
+                "report",
             )
-            response["Content-Disposition"] = 'attachment; filename="report.xlsx"'
-            df.to_excel(response, index=False, engine="openpyxl")
-            response["Content-Length"] = response.tell()
-            return response
-        elif format == "csv":
-            response = HttpResponse(content_type="text/csv")
-            response["Content-Disposition"] = 'attachment; filename="report.csv"'
-            df.to_csv(response, index=False, encoding="utf-8-sig")
-            response["Content-Length"] = response.tell()
-            return response
-        elif format == "pdf":
-            from io import BytesIO
-
-            from reportlab.pdfgen import canvas
+            return JsonResponse(job_payload(job), status=202)
 
-            buffer = BytesIO()
-            p = canvas.Canvas(buffer)
+        frame = fetch_report_data(**params)
+        if frame is None:
+            return JsonResponse(
+                {"error": "No se encontraron resultados."}, status=404
+            )
 
-            # Ejemplo: añadir contenido al PDF
-            p.drawString(100, 100, "Hello World")
-            p.showPage()
-            p.save()
+        if format in COLUMNAR_CONTENT_TYPES:
+            return spooled_response(
+                lambda file: write_report(frame, format, file),
+                f"report.{format}",
+                REPORT_CONTENT_TYPES[format],
+            )
 
-            buffer.seek(0)
-            response = HttpResponse(buffer, content_type="application/pdf")
-            response["Content-Disposition"] = 'attachment; filename="report.pdf"'
-            response["Content-Length"] = buffer.tell()
+        if format in REPORT_CONTENT_TYPES:
+            response = HttpResponse(content_type=REPORT_CONTENT_TYPES[format])
+            response["Content-Disposition"] = f'attachment; filename="report.{format}"'
+            write_report(
+                frame,
+                format,
+                response,
+                title=report_title(params),
+                branding=company_branding(request.user.company),
+            )
+            response["Content-Length"] = response.tell()
             return response
 
     except ValueError as e:
@@ -241,401 +251,279 @@ def export_report(request):
         )
 
 
-@method_decorator(csrf_exempt, name="dispatch")
-class SearchDrivers(View):
-    def get(self, request):
-        company = request.user.company_id
-        user_id = request.user.id
-        session_filters = request.session.get(f'filters_sorted_driver_{user_id}', {})
-        search_query = request.GET.get('query', None)
-        page_number = request.GET.get('page', session_filters.get('page', [1]))[0]
-
-        if not company or not user_id:
-            return JsonResponse({"error": "Faltan parámetros"}, status=400)
-        paginate_by = request.POST.get('paginate_by', None)  # Obtener paginate_by de los parámetros POST
-        if paginate_by is None:
-            session_filters = request.session.get(
-                f"filters_sorted_driver_{user_id}", {}
-            )
-            paginate_by = session_filters.get("paginate_by", 15)
-        # Convertir a entero si es una lista
-        try:
-            paginate_by = int(
-                paginate_by[0]
-            )  # Convertir el primer elemento de la lista a entero
-        except (TypeError, ValueError):
-            paginate_by = int(paginate_by) if paginate_by else 15
-        drivers = get_drivers_list(company, user_id, search_query)
-        order_by = session_filters.get('order_by', [None])[0]
-        direction = session_filters.get('direction', [None])[0]
-        # Obtener la función de clave para ordenar
-        key_function = sort_key(order_by)
-        # Determinar si es orden descendente
-        reverse = direction == 'desc'
-        try:
-            drivers = sorted(drivers, key=key_function, reverse=reverse)
-        except KeyError:
-            # Ordenamiento por defecto si la clave no existe
-            drivers = sorted(drivers, key=lambda x: x['company'].lower(), reverse=reverse)
-        page_size = paginate_by  # Número de elementos por página.
-        paginator = Paginator(drivers, page_size)
-        try:
-            page = paginator.page(page_number)
-        except PageNotAnInteger:
-            page = paginator.page(1)
-        except EmptyPage:
-            page = paginator.page(paginator.num_pages)
-        current_language = translation.get_language()
-
-        formatted_results = []
-        for driver in page.object_list:
-            date_joined = driver["date_joined"]
-            month_name = date_joined.strftime("%B")
-            month_name = _(month_name)
-            if date_joined:
-                if current_language == "es":
-                    # Formato en español
-                    formatted_date = date_joined.strftime(
-                        f'%d {_("de")} {month_name} {_("de")} %Y'
-                    )
-                else:
-                    # Formato en inglés u otros idiomas
-                    formatted_date = date_joined.strftime("%B %d, %Y")
-            formatted_results.append(
-                {
-                    "id": driver["id"],
-                    "company": driver["company"] or "",
-                    "first_name": driver["first_name"] or "",
-                    "last_name": driver["last_name"] or "",
-                    "personal_identification_number": driver[
-                        "personal_identification_number"
-                    ]
-                    or "",
-                    "phone_number": driver["phone_number"] or "",
-                    "address": driver["address"] or "",
-                    "is_active": driver["is_active"] or False,
-                    "date_joined": formatted_date,
-                }
-            )
+# Columnas de la exportación masiva de `realtime_avl_data`: (columna, campo, tipo de Arrow).
+# Las fechas se exportan en UTC, como se guardan.
+AVL_EXPORT_COLUMNS = (
+    ("imei", "device__imei", "string"),
+    ("main_event", "main_event", "int32"),
+    ("server_date", "server_date", "timestamp[ms]"),
+    ("signal_date", "signal_date", "timestamp[ms]"),
+    ("latitude", "latitude", "float64"),
+    ("longitude", "longitude", "float64"),
+    ("odometer", "odometer", "float64"),
+    ("calculated_speed", "calculated_speed", "uint16"),
+    ("angle", "angle", "uint16"),
+    ("info", "info", "string"),
+)
+
+
+def avl_export_rows(company_id, imei, fecha_inicial, fecha_final):
+    """
+    Retorna las tramas de `realtime_avl_data` de una compañía (o de un IMEI) entre dos fechas UTC,
+    leídas del cursor por bloques de `EXPORT_CHUNK_SIZE` filas.
+    """
+    queryset = AVLData.objects.filter(
+        device__company_id=company_id, server_date__range=(fecha_inicial, fecha_final)
+    )
+    if imei:
+        queryset = queryset.filter(device__imei=imei)
+    fields = [field for column, field, alias in AVL_EXPORT_COLUMNS]
+    return (
+        queryset.order_by("server_date")
+        .values_list(*fields)
+        .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    )
 
-        response_data = {
-            "results": formatted_results,
-            "page": {
-                "has_next": page.has_next(),
-                "has_previous": page.has_previous(),
-                "number": page.number,
-                "num_pages": paginator.num_pages,
-                "start_index": page.start_index(),
-                "end_index": page.end_index(),
-                "total_items": paginator.count,
-            },
-            "query_string": request.GET.urlencode(),
-        }
 
-        return JsonResponse(response_data, safe=False)
+def write_avl_export(file, export_format, params, progress=None):
+    """
+    Escribe la exportación masiva AVL en Parquet o Arrow IPC (ver `config.columnar`).
+
+    Args:
+        file: Archivo binario de destino.
+        export_format (str): Una clave de `COLUMNAR_CONTENT_TYPES`.
+        params (dict): Parámetros de `parse_report_params`.
+        progress (JobProgress, optional): Avance del trabajo de exportación.
+    """
+    from config.columnar import arrow_schema, row_batches, write_batches
+
+    schema = arrow_schema([(column, alias) for column, field, alias in AVL_EXPORT_COLUMNS])
+    rows = avl_export_rows(
+        params["company_id"], params["imei"], params["fecha_inicial"], params["fecha_final"]
+    )
+    write_batches(file, export_format, schema, row_batches(rows, schema), progress)
+
+
+def run_avl_export_job(job, file, progress):
+    """
+    Genera el archivo de un trabajo de exportación masiva AVL (ver `config.exportjobs`).
+    """
+    try:
+        params = parse_report_params(job["params"])
+    except (TypeError, ValueError) as e:
+        raise ExportJobError("Error en los parámetros de entrada: " + str(e))
+    write_avl_export(file, job["format"], params, progress)
+
+
+@login_required
+def export_avl_data(request):
+    """
+    Exporta las tramas AVL de la compañía del usuario en un formato columnar, para cargas
+    masivas (BI).
+
+    Parámetros GET:
+    - format: "parquet" (por defecto) o "arrow" (Arrow IPC).
+    - FechaInicial, FechaFinal: Rango en la hora del usuario (`%Y-%m-%dT%H:%M`).
+    - timezone_offset: Desfase del usuario en minutos (`getTimezoneOffset()`).
+    - Imei (opcional): Solo las tramas de ese dispositivo.
+    - background (opcional): Con "1" crea un trabajo de exportación (ver `config.exportjobs`).
+
+    Retorna:
+    - El archivo, con las columnas de `AVL_EXPORT_COLUMNS` y las fechas en UTC.
+    - Estado 202 con el estado del trabajo si `background` es "1".
+    - Estado 400 si el formato o los parámetros no son válidos.
+    - Estado 500 si ocurre un error de base de datos.
+    """
+    format = request.GET.get("format", "parquet")
+    if format not in COLUMNAR_CONTENT_TYPES:
+        return JsonResponse({"error": f"Formato no soportado: {format}"}, status=400)
+    # La compañía es siempre la del usuario
+    data = {field: request.GET.get(field) for field in REPORT_FIELDS}
+    data["Company_id"] = request.user.company_id
+    try:
+        params = parse_report_params(data)
+    except (TypeError, ValueError) as e:
+        return JsonResponse(
+            {"error": "Error en los parámetros de entrada: " + str(e)}, status=400
+        )
+
+    if request.GET.get("background") == "1":
+        job = create_job("avl", request.user, data, format, "avl_data")
+        return JsonResponse(job_payload(job), status=202)
+
+    try:
+        return spooled_response(
+            lambda file: write_avl_export(file, format, params),
+            f"avl_data.{format}",
+            COLUMNAR_CONTENT_TYPES[format],
+        )
+    except DatabaseError as e:
+        print("Error de base de datos:", e)
+        return JsonResponse({"error": _("The data could not be exported")}, status=500)
+
+
+@login_required
+def geocode_coordinates(request):
+    """
+    Retorna las direcciones de un lote de coordenadas para las tablas del frontend.
+
+    El cuerpo es un JSON con `points`: una lista de pares `[latitud, longitud]` o de objetos
+    `{"latitude": ..., "longitude": ...}`. Las coordenadas repetidas o muy cercanas se consultan
+    una sola vez (ver `ReverseGeocoder.reverse_many`).
+
+    Retorna:
+    - Un JSON `{"addresses": [...]}` con la dirección (o null) de cada punto en el mismo orden.
+    - Estado 400 si el cuerpo no es válido o supera `GEOCODING_BATCH_MAX` puntos.
+    - Estado 405 si el método no es POST.
+    """
+    if request.method != "POST":
+        return HttpResponse("Método no soportado.", status=405)
+
+    try:
+        points = json.loads(request.body).get("points")
+        if not isinstance(points, list):
+            raise ValueError("Se requiere la lista 'points'.")
+        if len(points) > settings.GEOCODING_BATCH_MAX:
+            raise ValueError(f"Máximo {settings.GEOCODING_BATCH_MAX} puntos por solicitud.")
+        points = [
+            (point.get("latitude"), point.get("longitude"))
+            if isinstance(point, dict)
+            else tuple(point)[:2]
+            for point in points
+        ]
+        if any(len(point) != 2 for point in points):
+            raise ValueError("Cada punto requiere latitud y longitud.")
+    except (AttributeError, TypeError, ValueError) as e:
+        return JsonResponse({"error": "Error en los parámetros de entrada: " + str(e)}, status=400)
+
+    return JsonResponse({"addresses": GeocodingService().rev_geocode_many(points)})
 
 
 @method_decorator(csrf_exempt, name="dispatch")
-class SearchScores(View):
-    def get(self, request):
-        company = request.user.company_id
-        user_id = request.user.id
-        session_filters = request.session.get(f'filters_sorted_scoredriver_{user_id}', {})
-        search_query = request.GET.get('query', None)
-        page_number = request.GET.get('page', session_filters.get('page', [1]))[0]
-
-        if not company or not user_id:
-            return JsonResponse({"error": "Faltan parámetros"}, status=400)
-        paginate_by = request.POST.get('paginate_by', None)  # Obtener paginate_by de los parámetros GET
-        if paginate_by is None:
-            paginate_by = session_filters.get('paginate_by', 15)
-        # Convertir a entero si es una lista
-        try:
-            paginate_by = int(
-                paginate_by[0]
-            )  # Convertir el primer elemento de la lista a entero
-        except (TypeError, ValueError):
-            paginate_by = int(paginate_by) if paginate_by else 15
-        scores = getCompanyScoresByCompanyAndUser(company, user_id, search_query)
-        order_by = session_filters.get('order_by', [None])[0]
-        direction = session_filters.get('direction', [None])[0]
-        # Obtener la función de clave para ordenar
-        key_function = sort_key(order_by)
-        # Determinar si es orden descendente
-        reverse = direction == 'desc'
-        try:
-            scores = sorted(scores, key=key_function, reverse=reverse)
-        except KeyError:
-            # Ordenamiento por defecto si la clave no existe
-            scores = sorted(scores, key=lambda x: x['company'].lower(), reverse=reverse)
-        page_size = paginate_by  # Número de elementos por página.
-        paginator = Paginator(scores, page_size)
-        try:
-            page = paginator.page(page_number)
-        except PageNotAnInteger:
-            page = paginator.page(1)
-        except EmptyPage:
-            page = paginator.page(paginator.num_pages)
-
-        formatted_results = []
-        for score in page.object_list:
-            formatted_results.append(
-                {
-                    "company_id": score["company_id"],
-                    "company": score["company"] or 0,
-                    "min_score": score["min_score"] or 0,
-                    "max_score": score["max_score"] or 0,
-                }
-            )
+class SearchDrivers(ProcedureListView):
+    procedure = "ListCheckpointsDrivers"
+    session_name = "driver"
+    cache_entities = ("driver",)
 
-        response_data = {
-            "results": formatted_results,
-            "page": {
-                "has_next": page.has_next(),
-                "has_previous": page.has_previous(),
-                "number": page.number,
-                "num_pages": paginator.num_pages,
-                "start_index": page.start_index(),
-                "end_index": page.end_index(),
-                "total_items": paginator.count,
-            },
-            "query_string": request.GET.urlencode(),
+    def format_row(self, driver):
+        return {
+            "id": driver["id"],
+            "company": driver["company"] or "",
+            "first_name": driver["first_name"] or "",
+            "last_name": driver["last_name"] or "",
+            "personal_identification_number": driver["personal_identification_number"] or "",
+            "phone_number": driver["phone_number"] or "",
+            "address": driver["address"] or "",
+            "is_active": driver["is_active"] or False,
+            "date_joined": format_long_date(driver["date_joined"]),
         }
 
-        return JsonResponse(response_data, safe=False)
+
+@method_decorator(csrf_exempt, name="dispatch")
+class SearchScores(ProcedureListView):
+    procedure = "ListCompanyScoresByCompanyAndUser"
+    session_name = "scoredriver"
+    cache_entities = ("score",)
+
+    def format_row(self, score):
+        return {
+            "company_id": score["company_id"],
+            "company": score["company"] or 0,
+            "min_score": score["min_score"] or 0,
+            "max_score": score["max_score"] or 0,
+        }
 
 @method_decorator(csrf_exempt, name='dispatch')
-class ExportDataScoreDriver(View):
-    def get(self, request):
-        company = request.user.company_id
-        user_id = request.user.id
-        search_query = request.GET.get('query', None)
-        scores = getCompanyScoresByCompanyAndUser(company, user_id, search_query)
-        formatted_results = []
-        # Encabezados traducidos
-        headers = [
-            _("company"),
-            _("Minimum score"),
-            _("Maximum score")
+class ExportDataScoreDriver(ExportView):
+    procedure = "ListCompanyScoresByCompanyAndUser"
+    filename = "scores"
+
+    def get_params(self, request):
+        return {
+            "CompanyId": request.user.company_id,
+            "UserId": request.user.id,
+            "SearchQuery": request.GET.get('query', None),
+        }
+
+    def get_columns(self):
+        return [
+            (_("company"), "company"),
+            (_("Minimum score"), "min_score"),
+            (_("Maximum score"), "max_score"),
         ]
 
-        for score in scores:
-            formatted_results.append({
-                "company": score['company'] or 0,
-                "min_score": score['min_score'] or 0,
-                "max_score": score['max_score'] or 0,
-            })
-        response_data = {
-            'headers': headers,
-            'data': formatted_results
+    def format_row(self, score):
+        return {
+            "company": score['company'] or 0,
+            "min_score": score['min_score'] or 0,
+            "max_score": score['max_score'] or 0,
         }
-        return JsonResponse(response_data, safe=False)
-    
+
+
 @method_decorator(csrf_exempt, name='dispatch')
-class ExportDataDriver(View):
-    def get(self, request):
-        company = request.user.company_id
-        user_id = request.user.id
-        search_query = request.GET.get('query', None)
-        drivers = get_drivers_list(company, user_id, search_query)
-        formatted_results = []
-        # Encabezados traducidos
-        headers = [
-            _("Personal ID"),
-            _("Company"),
-            _("First name"),
-            _("Last name"),
-            _("Mobile numbere"),
-            _("Date joined"),
-            _("Status"),
-            _("Address")
+class ExportDataDriver(ExportView):
+    procedure = "ListCheckpointsDrivers"
+    filename = "drivers"
+
+    def get_params(self, request):
+        return {
+            "CompanyId": request.user.company_id,
+            "UserId": request.user.id,
+            "SearchQuery": request.GET.get('query', None),
+        }
+
+    def get_columns(self):
+        return [
+            (_("Personal ID"), "personal_identification_number"),
+            (_("Company"), "company"),
+            (_("First name"), "first_name"),
+            (_("Last name"), "last_name"),
+            (_("Mobile numbere"), "phone_number"),
+            (_("Date joined"), "date_joined"),
+            (_("Status"), "is_active"),
+            (_("Address"), "address"),
         ]
 
-        for driver in drivers:
-            formatted_results.append({
-                "company": driver['company'] or "",
-                "first_name": driver['first_name'] or "",
-                "last_name": driver['last_name'] or "",
-                "personal_identification_number": driver['personal_identification_number'] or "",
-                "phone_number": driver['phone_number'] or "",
-                "address": driver['address'] or "",
-                "is_active": driver['is_active'] or False,
-                "date_joined": driver['date_joined'] or "",
-            })
-        response_data = {
-            'headers': headers,
-            'data': formatted_results
+    def format_row(self, driver):
+        return {
+            "company": driver['company'] or "",
+            "first_name": driver['first_name'] or "",
+            "last_name": driver['last_name'] or "",
+            "personal_identification_number": driver['personal_identification_number'] or "",
+            "phone_number": driver['phone_number'] or "",
+            "address": driver['address'] or "",
+            "is_active": driver['is_active'] or False,
+            "date_joined": driver['date_joined'] or "",
         }
-        return JsonResponse(response_data, safe=False)
-    
+
+
 @method_decorator(csrf_exempt, name="dispatch")
-class SearchDataSem(View):
+class SearchDataSem(ProcedureListView):
     """
-    Vista para buscar y paginar datos SEM (Search Engine Marketing) según los filtros y parámetros proporcionados.
-
-    Métodos:
-        get: Maneja solicitudes GET para buscar, ordenar y paginar los datos SEM.
-        get_page_number: Obtiene el número de página actual de la solicitud o de los filtros de sesión.
-        get_paginate_by: Obtiene el número de elementos por página de la solicitud o de los filtros de sesión.
-        sort_datasem: Ordena los datos SEM según los filtros de sesión.
-        paginate_datasem: Pagina los datos SEM según el tamaño de página y el número de página proporcionados.
-        format_results: Formatea los resultados de la página actual para la respuesta JSON.
-        construct_response: Construye la respuesta JSON con los resultados formateados y la información de paginación.
+    Vista para buscar y paginar las configuraciones DataSeM de las compañías del usuario.
     """
 
-    def get(self, request):
-        """
-        Maneja solicitudes GET para buscar, ordenar y paginar los datos SEM.
-
-        Args:
-            request (HttpRequest): La solicitud HTTP.
-
-        Returns:
-            JsonResponse: La respuesta JSON con los datos buscados, ordenados y paginados.
-        """
-        company = request.user.company_id
-        user_id = request.user.id
-        session_filters = request.session.get(f'filters_sorted_confidatasem_{user_id}', {})
-        search_query = request.GET.get("query", None)
-        page_number = self.get_page_number(request, session_filters)
-        paginate_by = self.get_paginate_by(request, session_filters)
-
-        if not company or not user_id:
-            return JsonResponse({"error": "Faltan parámetros"}, status=400)
-
-        datasem = fetch_all_confidatasem(request.user.company, request.user, search_query)
-        datasem = self.sort_datasem(datasem, session_filters)
-        page = self.paginate_datasem(datasem, paginate_by, page_number)
-        formatted_results = self.format_results(page)
-
-        response_data = self.construct_response(formatted_results, page, request)
-        return JsonResponse(response_data, safe=False)
-
-    def get_page_number(self, request, session_filters):
-        """
-        Obtiene el número de página actual de la solicitud o de los filtros de sesión.
-
-        Args:
-            request (HttpRequest): La solicitud HTTP.
-            session_filters (dict): Los filtros guardados en la sesión del usuario.
-
-        Returns:
-            int: El número de página actual.
-        """
-        return request.GET.get('page', session_filters.get('page', [1]))[0]
-
-    def get_paginate_by(self, request, session_filters):
-        """
-        Obtiene el número de elementos por página de la solicitud o de los filtros de sesión.
-
-        Args:
-            request (HttpRequest): La solicitud HTTP.
-            session_filters (dict): Los filtros guardados en la sesión del usuario.
-
-        Returns:
-            int: El número de elementos por página.
-        """
-        paginate_by = request.POST.get("paginate_by", None)
-        if paginate_by is None:
-            paginate_by = session_filters.get("paginate_by", 15)
-        try:
-            paginate_by = int(paginate_by[0])
-        except (TypeError, ValueError):
-            paginate_by = int(paginate_by) if paginate_by else 15
-        return paginate_by
-
-    def sort_datasem(self, datasem, session_filters):
-        """
-        Ordena los datos SEM según los filtros de sesión.
-
-        Args:
-            datasem (list): La lista de datos SEM a ordenar.
-            session_filters (dict): Los filtros guardados en la sesión del usuario.
-
-        Returns:
-            list: La lista de datos SEM ordenada.
-        """
-        order_by = session_filters.get('order_by', [None])[0]
-        direction = session_filters.get('direction', [None])[0]
-        key_function = sort_key(order_by)
-        reverse = direction == 'desc'
-        try:
-            return sorted(datasem, key=key_function, reverse=reverse)
-        except KeyError:
-            return sorted(datasem, key=lambda x: x['company_name'].lower(), reverse=reverse)
-
-    def paginate_datasem(self, datasem, page_size, page_number):
-        """
-        Pagina los datos SEM según el tamaño de página y el número de página proporcionados.
-
-        Args:
-            datasem (list): La lista de datos SEM a paginar.
-            page_size (int): El número de elementos por página.
-            page_number (int): El número de la página actual.
-
-        Returns:
-            Page: Un objeto de página con los elementos de la página actual.
-        """
-        paginator = Paginator(datasem, page_size)
-        try:
-            return paginator.page(page_number)
-        except PageNotAnInteger:
-            return paginator.page(1)
-        except EmptyPage:
-            return paginator.page(paginator.num_pages)
-
-    def format_results(self, page):
-        """
-        Formatea los resultados de la página actual para la respuesta JSON.
-
-        Args:
-            page (Page): Un objeto de página con los elementos de la página actual.
-
-        Returns:
-            list: Una lista de diccionarios con los resultados formateados.
-        """
-        formatted_results = []
-        for datasem in page.object_list:
-            formatted_results.append(
-                {
-                    "id": datasem["id"],
-                    "company_name": datasem["company_name"] or "",
-                    "full_name": datasem["full_name"] or "",
-                    "workspace": datasem["workspace"] or "",
-                    "name": datasem["name"] or "",
-                    "report": datasem["report"] or "",
-                    "price": datasem["price"],
-                }
-            )
-        return formatted_results
-
-    def construct_response(self, formatted_results, page, request):
-        """
-        Construye la respuesta JSON con los resultados formateados y la información de paginación.
+    procedure = "ListConfigDataSeM"
+    session_name = "confidatasem"
+    cache_entities = ("datasem", "user")
 
-        Args:
-            formatted_results (list): Una lista de diccionarios con los resultados formateados.
-            page (Page): Un objeto de página con los elementos de la página actual.
-            request (HttpRequest): La solicitud HTTP.
+    def get_params(self, request):
+        params = super().get_params(request)
+        params["SearchQuery"] = params["SearchQuery"] or ""
+        return params
 
-        Returns:
-            dict: Un diccionario con los resultados formateados y la información de paginación.
-        """
+    def format_row(self, datasem):
         return {
-            "results": formatted_results,
-            "page": {
-                "has_next": page.has_next(),
-                "has_previous": page.has_previous(),
-                "number": page.number,
-                "num_pages": page.paginator.num_pages,
-                "start_index": page.start_index(),
-                "end_index": page.end_index(),
-                "total_items": page.paginator.count,
-            },
-            "query_string": request.GET.urlencode(),
+            "id": datasem["id"],
+            "company_name": datasem["company_name"] or "",
+            "full_name": datasem["full_name"] or "",
+            "workspace": datasem["workspace"] or "",
+            "name": datasem["name"] or "",
+            "report": datasem["report"] or "",
+            "price": datasem["price"],
         }
-        
-        
+
+
 def user_by_company(request,company_id):
     try:
         user = User.objects.filter(company_id=company_id)
@@ -0,0 +1,65 @@
+"""
+Genera el índice local de lugares usado como primer nivel de la geocodificación inversa.
+
+Los lugares se leen de PostGIS (base `POSTGRES_*`) con una consulta que retorne
+`nombre, latitud, longitud`, o de un CSV con esas tres columnas. Las vías deben exportarse como
+puntos a lo largo de la línea para que el lugar más cercano sea representativo, por ejemplo:
+
+    python manage.py build_place_index /srv/geocoding/places --query "
+        SELECT name, ST_Y(geom), ST_X(geom)
+        FROM (SELECT name, (ST_DumpPoints(ST_Segmentize(way::geography, 50)::geometry)).geom
+              FROM planet_osm_line WHERE highway IS NOT NULL AND name IS NOT NULL) AS points"
+
+Se ejecuta periódicamente (cron); los workers abren la nueva versión en menos de
+`GEOCODING_OFFLINE_RELOAD` segundos.
+"""
+
+import csv
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.checkpoints.places import build_place_index
+from apps.checkpoints.postgres import connect_db
+
+
+class Command(BaseCommand):
+    help = "Genera el índice local de lugares para la geocodificación inversa"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", nargs="?", help="Directorio del índice; por defecto GEOCODING_OFFLINE_INDEX"
+        )
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument("--query", help="Consulta de PostGIS: nombre, latitud, longitud")
+        source.add_argument("--csv", help="CSV con las columnas nombre, latitud, longitud")
+        parser.add_argument(
+            "--cell-size", type=float, default=0.01, help="Tamaño de la grilla en grados"
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"] or settings.GEOCODING_OFFLINE_INDEX
+        if not path:
+            raise CommandError("Indique el directorio o configure GEOCODING_OFFLINE_INDEX")
+
+        if options["csv"]:
+            with open(options["csv"], newline="", encoding="utf-8") as file:
+                count = build_place_index(
+                    (row[:3] for row in csv.reader(file) if len(row) >= 3 and row[0]),
+                    path,
+                    options["cell_size"],
+                )
+        else:
+            connection = connect_db()
+            if connection is None:
+                raise CommandError("No se pudo conectar a PostGIS")
+            try:
+                # Cursor del servidor para no cargar la extracción completa en memoria
+                with connection.cursor(name="place_index") as cursor:
+                    cursor.itersize = 10000
+                    cursor.execute(options["query"])
+                    count = build_place_index(cursor, path, options["cell_size"])
+            finally:
+                connection.close()
+
+        self.stdout.write(self.style.SUCCESS(f"{count} puntos indexados en {path}"))
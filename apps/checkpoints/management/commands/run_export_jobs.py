@@ -0,0 +1,44 @@
+"""
+Worker de los trabajos de exportación en segundo plano (`EXPORT_JOB_BACKEND = "redis"`).
+
+Toma los trabajos de la cola de Redis y genera sus archivos con un pool de hilos; se pueden
+ejecutar varios workers, en el mismo servidor o en otros, con el mismo `EXPORT_JOB_REDIS_URL`:
+
+    python manage.py run_export_jobs --threads 4
+
+Con `EXPORT_JOB_BACKEND = "thread"` los trabajos se ejecutan en los procesos web; en ese caso
+`run_export_jobs --purge` (cron) borra los archivos de los trabajos vencidos.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from config.exportjobs import purge_files, serve
+
+
+class Command(BaseCommand):
+    help = "Procesa los trabajos de exportación encolados en Redis"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=settings.EXPORT_JOB_THREADS,
+            help="Trabajos simultáneos; por defecto EXPORT_JOB_THREADS",
+        )
+        parser.add_argument(
+            "--purge",
+            action="store_true",
+            help="Solo borra los archivos de los trabajos vencidos y termina",
+        )
+
+    def handle(self, *args, **options):
+        if options["purge"]:
+            removed = purge_files()
+            self.stdout.write(f"Archivos borrados: {removed}")
+            return
+        self.stdout.write(f"Procesando trabajos de exportación con {options['threads']} hilos")
+        try:
+            serve(options["threads"])
+        except KeyboardInterrupt:
+            pass
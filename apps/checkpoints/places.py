@@ -0,0 +1,235 @@
+"""
+Índice local de lugares para direcciones aproximadas sin consultar PostGIS.
+
+`build_place_index` escribe en un directorio los puntos de una extracción de la tabla de vías y
+localidades (nombre, latitud, longitud), ordenados por una grilla regular de `cell_size` grados:
+
+- `meta.json`: parámetros de la grilla.
+- `latitude.npy`, `longitude.npy` (float32) y `name.npy` (int32): un registro por punto.
+- `offsets.npy`: posición del primer punto de cada celda (`filas * columnas + 1`).
+- `names.bin` y `name_offsets.npy`: nombres en UTF-8, uno tras otro.
+
+Los arreglos se abren con `mmap_mode="r"`, de modo que todos los workers comparten las mismas
+páginas del sistema operativo. `PlaceIndex.nearest` revisa solo las celdas vecinas que alcanzan
+`GEOCODING_OFFLINE_MAX_DISTANCE` metros; si no hay un lugar a esa distancia retorna None y la
+dirección se consulta en PostGIS (ver `ReverseGeocoder`).
+"""
+
+import json
+import math
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+FORMAT_VERSION = 1
+# Metros por grado de latitud (aproximación equirectangular, suficiente para distancias cortas)
+METERS_PER_DEGREE = 111320.0
+
+
+def build_place_index(places, path, cell_size=0.01):
+    """
+    Construye el índice a partir de una secuencia de lugares.
+
+    El directorio se escribe aparte y reemplaza al anterior con un renombrado, así los workers
+    que lo tienen abierto siguen usando sus archivos hasta recargar.
+
+    Args:
+        places (iterable): Tuplas `(nombre, latitud, longitud)`; se omiten las filas sin nombre
+            o con coordenadas no numéricas.
+        path (str): Directorio del índice.
+        cell_size (float): Tamaño en grados de las celdas de la grilla.
+
+    Returns:
+        int: Número de puntos indexados.
+    """
+    names = {}
+    latitudes, longitudes, name_ids = [], [], []
+    for name, latitude, longitude in places:
+        try:
+            latitude, longitude = float(latitude), float(longitude)
+        except (TypeError, ValueError):
+            # Encabezados o filas sin coordenadas
+            continue
+        if not name:
+            continue
+        latitudes.append(latitude)
+        longitudes.append(longitude)
+        name_ids.append(names.setdefault(str(name), len(names)))
+    latitude = np.array(latitudes, dtype=np.float64)
+    longitude = np.array(longitudes, dtype=np.float64)
+
+    if len(latitude):
+        min_lat, min_lon = float(latitude.min()), float(longitude.min())
+        rows = int((latitude.max() - min_lat) // cell_size) + 1
+        cols = int((longitude.max() - min_lon) // cell_size) + 1
+    else:
+        min_lat = min_lon = 0.0
+        rows = cols = 1
+    cells = (
+        ((latitude - min_lat) // cell_size).astype(np.int64) * cols
+        + ((longitude - min_lon) // cell_size).astype(np.int64)
+    )
+    order = np.argsort(cells, kind="stable")
+    offsets = np.searchsorted(cells[order], np.arange(rows * cols + 1)).astype(np.int64)
+
+    encoded = [name.encode("utf-8") for name in names]
+    name_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    name_offsets[1:] = np.cumsum([len(name) for name in encoded])
+
+    path = os.path.abspath(path)
+    staging = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    np.save(os.path.join(staging, "latitude.npy"), latitude[order].astype(np.float32))
+    np.save(os.path.join(staging, "longitude.npy"), longitude[order].astype(np.float32))
+    np.save(os.path.join(staging, "name.npy"), np.array(name_ids, np.int32)[order])
+    np.save(os.path.join(staging, "offsets.npy"), offsets)
+    np.save(os.path.join(staging, "name_offsets.npy"), name_offsets)
+    with open(os.path.join(staging, "names.bin"), "wb") as file:
+        file.write(b"".join(encoded))
+    with open(os.path.join(staging, "meta.json"), "w") as file:
+        json.dump(
+            {
+                "version": FORMAT_VERSION,
+                "cell_size": cell_size,
+                "min_lat": min_lat,
+                "min_lon": min_lon,
+                "rows": rows,
+                "cols": cols,
+                "count": len(latitude),
+                "created": time.time(),
+            },
+            file,
+        )
+
+    previous = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.rename(path, previous)
+    os.rename(staging, path)
+    shutil.rmtree(previous, ignore_errors=True)
+    return len(latitude)
+
+
+class PlaceIndex:
+    """
+    Índice de lugares abierto en modo de solo lectura con `mmap`.
+
+    Args:
+        path (str): Directorio generado por `build_place_index`.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as file:
+            meta = json.load(file)
+            self.modified = os.fstat(file.fileno()).st_mtime
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Versión de índice no soportada: {meta.get('version')}")
+        self.path = path
+        self.cell_size = meta["cell_size"]
+        self.min_lat = meta["min_lat"]
+        self.min_lon = meta["min_lon"]
+        self.rows = meta["rows"]
+        self.cols = meta["cols"]
+        self.count = meta["count"]
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode="r")
+
+        self.latitude = load("latitude.npy")
+        self.longitude = load("longitude.npy")
+        self.name = load("name.npy")
+        self.offsets = load("offsets.npy")
+        self.name_offsets = load("name_offsets.npy")
+        if os.path.getsize(os.path.join(path, "names.bin")):
+            self.names = np.memmap(os.path.join(path, "names.bin"), dtype=np.uint8, mode="r")
+        else:
+            self.names = np.zeros(0, dtype=np.uint8)
+
+    def name_of(self, name_id):
+        start, end = self.name_offsets[name_id], self.name_offsets[name_id + 1]
+        return self.names[start:end].tobytes().decode("utf-8")
+
+    def nearest(self, latitude, longitude, max_distance=None):
+        """
+        Retorna el nombre del lugar más cercano.
+
+        Args:
+            latitude (float): Latitud.
+            longitude (float): Longitud.
+            max_distance (float, optional): Distancia máxima en metros; por defecto
+                `GEOCODING_OFFLINE_MAX_DISTANCE`.
+
+        Returns:
+            str | None: El nombre, o None si no hay un lugar a esa distancia o las coordenadas no
+            son finitas.
+        """
+        if max_distance is None:
+            max_distance = settings.GEOCODING_OFFLINE_MAX_DISTANCE
+        latitude, longitude = float(latitude), float(longitude)
+        if not (math.isfinite(latitude) and math.isfinite(longitude)):
+            return None
+        scale = math.cos(math.radians(latitude))
+        reach_lat = max_distance / METERS_PER_DEGREE
+        reach_lon = reach_lat / max(scale, 0.01)
+
+        size = self.cell_size
+        first_row = max(int((latitude - reach_lat - self.min_lat) // size), 0)
+        last_row = min(int((latitude + reach_lat - self.min_lat) // size), self.rows - 1)
+        first_col = max(int((longitude - reach_lon - self.min_lon) // size), 0)
+        last_col = min(int((longitude + reach_lon - self.min_lon) // size), self.cols - 1)
+        if first_row > last_row or first_col > last_col:
+            return None
+
+        best, best_distance = None, max_distance ** 2
+        for row in range(first_row, last_row + 1):
+            # Las columnas de una fila son contiguas en los arreglos ordenados
+            start = self.offsets[row * self.cols + first_col]
+            end = self.offsets[row * self.cols + last_col + 1]
+            if start == end:
+                continue
+            dy = (self.latitude[start:end] - latitude) * METERS_PER_DEGREE
+            dx = (self.longitude[start:end] - longitude) * (METERS_PER_DEGREE * scale)
+            distances = dx * dx + dy * dy
+            index = int(np.argmin(distances))
+            if distances[index] <= best_distance:
+                best, best_distance = start + index, float(distances[index])
+        return None if best is None else self.name_of(int(self.name[best]))
+
+
+_index = None
+_index_checked = 0.0
+_index_lock = threading.Lock()
+
+
+def get_place_index():
+    """
+    Retorna el índice de `GEOCODING_OFFLINE_INDEX`, o None si no está configurado o no existe.
+
+    Cada `GEOCODING_OFFLINE_RELOAD` segundos se revisa si `meta.json` cambió (una nueva
+    exportación) y en ese caso se abre de nuevo.
+    """
+    global _index, _index_checked
+    path = settings.GEOCODING_OFFLINE_INDEX
+    if not path:
+        return None
+    with _index_lock:
+        now = time.monotonic()
+        current = _index is not None and _index.path == path
+        if current and now - _index_checked < settings.GEOCODING_OFFLINE_RELOAD:
+            return _index
+        _index_checked = now
+        try:
+            modified = os.path.getmtime(os.path.join(path, "meta.json"))
+        except OSError:
+            _index = None
+            return None
+        if not current or _index.modified != modified:
+            try:
+                _index = PlaceIndex(path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error al abrir el índice de lugares: {e}")
+        return _index
@@ -1,11 +1,39 @@
+"""
+Acceso a las bases PostGIS de geocodificación inversa.
+
+`get_geocoder` retorna un `ReverseGeocoder` compartido por proceso para cada función de
+geocodificación y base de datos. Cada uno mantiene un pool de conexiones
+(`psycopg2.pool.ThreadedConnectionPool`) en lugar de abrir una conexión TLS por consulta, y
+guarda las direcciones con las coordenadas redondeadas a `GEOCODING_PRECISION` decimales en
+dos niveles: una caché LRU en memoria del proceso y la caché `geocoding` (Redis), compartida
+entre workers. Un vehículo detenido se resuelve así sin consultar la base de datos.
+
+Si `GEOCODING_OFFLINE_INDEX` apunta a un índice de lugares (ver `places.py`), la dirección
+aproximada del lugar más cercano se toma de él y PostGIS queda solo para los puntos sin un lugar
+cercano.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 import psycopg2
 from decouple import config
+from django.conf import settings
+from django.core.cache import caches
+from psycopg2 import pool
 
+from .places import get_place_index
 
-def connect_db():
-    params = {
+logger = logging.getLogger(__name__)
+
+
+def connection_params():
+    return {
         "dbname": config("POSTGRES_NAME"),
         "user": config("POSTGRES_USER"),
         "password": config("POSTGRES_PASSWORD"),
@@ -13,36 +41,325 @@ def connect_db():
         "port": config("POSTGRES_PORT", cast=int),
         "sslmode": config("POSTGRES_SSLMODE"),
     }
+
+
+def connect_db():
     try:
-        connection = psycopg2.connect(**params)
+        connection = psycopg2.connect(**connection_params())
         return connection
     except Exception as e:
         print(f"Error al conectar a la base de datos: {e}")
         return None
 
 
+class LocalCache:
+    """
+    Caché LRU en memoria con expiración, segura entre hilos.
+
+    Args:
+        size (int): Número máximo de entradas.
+        timeout (float): Segundos que vive cada entrada.
+    """
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Retorna `(encontrado, valor)` para la clave indicada.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class ReverseGeocoder:
+    """
+    Geocodificación inversa con pool de conexiones y caché por coordenadas redondeadas.
+
+    Args:
+        function (str): Función de PostGIS que recibe `(longitud, latitud)` y retorna la
+            dirección (p. ej. `rev_geocode_gpsmobile`).
+        params (dict, optional): Parámetros de conexión de psycopg2; por defecto los
+            `POSTGRES_*` del entorno.
+    """
+
+    def __init__(self, function, params=None):
+        self.function = function
+        self.params = params
+        self.local = LocalCache(
+            settings.GEOCODING_LOCAL_CACHE_SIZE, settings.GEOCODING_LOCAL_CACHE_TIMEOUT
+        )
+        self._pool = None
+        self._argument_type = None
+        self._lock = threading.Lock()
+        # ThreadedConnectionPool falla si se agota; el semáforo hace esperar a los hilos
+        self._slots = threading.BoundedSemaphore(settings.GEOCODING_POOL_SIZE)
+
+    def cache_key(self, latitude, longitude):
+        latitude, longitude = float(latitude), float(longitude)
+        # NaN o infinito: ni el índice local ni PostGIS pueden resolverlas
+        if not (math.isfinite(latitude) and math.isfinite(longitude)):
+            raise ValueError("Coordenadas no finitas")
+        precision = settings.GEOCODING_PRECISION
+        return f"{self.function}:{latitude:.{precision}f}:{longitude:.{precision}f}"
+
+    def get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = pool.ThreadedConnectionPool(
+                    0, settings.GEOCODING_POOL_SIZE, **(self.params or connection_params())
+                )
+            return self._pool
+
+    def close(self):
+        """
+        Cierra todas las conexiones del pool.
+        """
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+
+    def execute(self, callback):
+        """
+        Ejecuta `callback(cursor)` con una conexión del pool y retorna su resultado.
+
+        Una conexión cerrada por el servidor (reinicio o inactividad) se descarta y la consulta
+        se reintenta una vez con una conexión nueva.
+        """
+        connection_pool = self.get_pool()
+        with self._slots:
+            for attempt in range(2):
+                connection = connection_pool.getconn()
+                broken = False
+                try:
+                    connection.autocommit = True
+                    with connection.cursor() as cursor:
+                        return callback(cursor)
+                except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                    broken = True
+                    if attempt:
+                        raise
+                finally:
+                    connection_pool.putconn(connection, close=broken or bool(connection.closed))
+
+    def argument_type(self, cursor):
+        # Tipo de los parámetros de la función, para convertir los arreglos de texto
+        if self._argument_type is None:
+            cursor.execute(
+                "SELECT format_type(p.proargtypes[0], NULL) FROM pg_proc p "
+                "JOIN pg_namespace n ON n.oid = p.pronamespace "
+                "WHERE n.nspname = 'public' AND p.proname = %s AND p.pronargs = 2 LIMIT 1",
+                [self.function],
+            )
+            row = cursor.fetchone()
+            self._argument_type = row[0] if row else "text"
+        return self._argument_type
+
+    def query_many(self, points):
+        """
+        Consulta en la base de datos, sin caché, las direcciones de varias coordenadas con una
+        sola sentencia sobre arreglos (`unnest`).
+
+        Args:
+            points (list): Pares `(latitud, longitud)`.
+
+        Returns:
+            list: La dirección (o None) de cada par, en el mismo orden.
+        """
+
+        def run(cursor):
+            argument_type = self.argument_type(cursor)
+            cursor.execute(
+                f"SELECT t.position, public.{self.function}("
+                f"t.longitude::{argument_type}, t.latitude::{argument_type}) "
+                "FROM unnest(%s::text[], %s::text[]) "
+                "WITH ORDINALITY AS t(longitude, latitude, position)",
+                [
+                    [str(longitude) for _, longitude in points],
+                    [str(latitude) for latitude, _ in points],
+                ],
+            )
+            addresses = [None] * len(points)
+            for position, address in cursor.fetchall():
+                addresses[position - 1] = address
+            return addresses
+
+        return self.execute(run)
+
+    def reverse(self, latitude, longitude):
+        """
+        Retorna la dirección de unas coordenadas.
+
+        Args:
+            latitude (str | float): Latitud.
+            longitude (str | float): Longitud.
+
+        Returns:
+            str | None: La dirección, o None si las coordenadas no son válidas o la función no
+            encontró una dirección (también se guarda en caché).
+        """
+        return self.reverse_many([(latitude, longitude)])[0]
+
+    def reverse_many(self, points):
+        """
+        Retorna las direcciones de muchas coordenadas.
+
+        Las coordenadas se agrupan por su clave redondeada; cada clave se busca en el índice
+        local de lugares (`GEOCODING_OFFLINE_INDEX`), en la caché en memoria y luego en la caché
+        `geocoding` con una sola lectura. Las faltantes se consultan en lotes de
+        `GEOCODING_BATCH_SIZE` repartidos entre `GEOCODING_BATCH_WORKERS` hilos.
+
+        Args:
+            points (iterable): Pares `(latitud, longitud)`.
+
+        Returns:
+            list: La dirección (o None) de cada par, en el mismo orden.
+        """
+        points = list(points)
+        keys = []
+        # Primer par recibido de cada clave, usado para la consulta
+        unique = {}
+        for latitude, longitude in points:
+            try:
+                key = self.cache_key(latitude, longitude)
+            except (TypeError, ValueError):
+                key = None
+            else:
+                unique.setdefault(key, (latitude, longitude))
+            keys.append(key)
+
+        found = {}
+        index = get_place_index()
+        for key, (latitude, longitude) in unique.items():
+            # Primer nivel: el lugar más cercano del índice local, si está configurado
+            address = index.nearest(latitude, longitude) if index is not None else None
+            if address:
+                found[key] = address
+                continue
+            hit, address = self.local.get(key)
+            if hit:
+                found[key] = address
+
+        pending = [key for key in unique if key not in found]
+        shared = caches["geocoding"]
+        if pending:
+            try:
+                cached = shared.get_many(pending)
+            except Exception as e:
+                logger.warning("Caché de geocodificación no disponible: %s", e)
+                cached, shared = {}, None
+            for key, address in cached.items():
+                found[key] = address
+                self.local.set(key, address)
+
+        missing = [key for key in pending if key not in found]
+        if missing:
+            fresh = self.resolve(missing, unique)
+            if shared is not None:
+                try:
+                    shared.set_many(fresh, settings.GEOCODING_CACHE_TIMEOUT)
+                except Exception as e:
+                    logger.warning("No se pudo guardar la dirección en caché: %s", e)
+            for key, address in fresh.items():
+                self.local.set(key, address)
+            found.update(fresh)
+
+        return [found.get(key) or None if key else None for key in keys]
+
+    def resolve(self, keys, points):
+        # Consulta las claves faltantes por lotes; las coordenadas sin dirección se guardan como
+        # cadena vacía
+        size = max(settings.GEOCODING_BATCH_SIZE, 1)
+        chunks = [keys[start:start + size] for start in range(0, len(keys), size)]
+
+        def run(chunk):
+            addresses = self.query_many([points[key] for key in chunk])
+            return {key: address or "" for key, address in zip(chunk, addresses)}
+
+        fresh = {}
+        if len(chunks) == 1:
+            fresh.update(run(chunks[0]))
+            return fresh
+        workers = min(max(settings.GEOCODING_BATCH_WORKERS, 1), len(chunks))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(run, chunks):
+                fresh.update(result)
+        return fresh
+
+
+_geocoders = {}
+_geocoders_lock = threading.Lock()
+
+
+def get_geocoder(function="rev_geocode_gpsmobile", params=None):
+    """
+    Retorna el `ReverseGeocoder` compartido del proceso para una función y base de datos.
+
+    Args:
+        function (str): Función de PostGIS.
+        params (dict, optional): Parámetros de conexión; por defecto los `POSTGRES_*`.
+
+    Returns:
+        ReverseGeocoder: La misma instancia (y el mismo pool) en cada llamada.
+    """
+    key = (function, tuple(sorted((params or {}).items())))
+    with _geocoders_lock:
+        if key not in _geocoders:
+            _geocoders[key] = ReverseGeocoder(function, params)
+        return _geocoders[key]
+
+
 class GeocodingService:
+    """
+    Fachada de `get_geocoder()` para los reportes; `connect` y `close` ya no abren ni cierran
+    conexiones porque estas pertenecen al pool compartido.
+    """
+
     def __init__(self):
-        self.connection = None
+        self.geocoder = get_geocoder()
 
     def connect(self):
-        if not self.connection:
-            self.connection = connect_db()
+        pass
 
     def close(self):
-        if self.connection:
-            self.connection.close()
-            self.connection = None
+        pass
 
     def rev_geocode(self, latitude, longitude):
-        if not self.connection:
+        try:
+            return self.geocoder.reverse(latitude, longitude)
+        except Exception as e:
+            print(f"Error al consultar la dirección: {e}")
             return None
-        with self.connection.cursor() as cursor:
-            cursor.execute(
-                "SELECT public.rev_geocode_gpsmobile(%s, %s)",
-                [longitude, latitude],
-            )
-            return cursor.fetchone()[0]
+
+    def rev_geocode_many(self, points):
+        try:
+            return self.geocoder.reverse_many(points)
+        except Exception as e:
+            print(f"Error al consultar las direcciones: {e}")
+            return [None] * len(points)
 
     @staticmethod
     def adjust_dates(date_str, timezone_offset):
@@ -1,9 +1,26 @@
 from django.db import connection
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_delete, post_migrate, post_save
 from django.dispatch import receiver
 
+from config.resultcache import bump_versions_on_commit
+
+from .models import CompanyScoreSetup, Driver, ItemScore, ItemScoreSetup
+
 # @receiver(post_migrate)
 # def create_schema(sender, **kwargs):
 #     if sender.name == 'apps.checkpoints':  # Reemplaza 'your_app_name' por el nombre de tu aplicación
 #         with connection.cursor() as cursor:
 #             cursor.execute('ALTER SCHEMA PowerBI TRANSFER advanced_analytical')
+
+
+@receiver([post_save, post_delete], sender=Driver)
+def on_driver_changed(sender, **kwargs):
+    # Invalida los listados de conductores guardados en la caché `listing`
+    bump_versions_on_commit("driver")
+
+
+@receiver([post_save, post_delete], sender=CompanyScoreSetup)
+@receiver([post_save, post_delete], sender=ItemScoreSetup)
+@receiver([post_save, post_delete], sender=ItemScore)
+def on_score_changed(sender, **kwargs):
+    bump_versions_on_commit("score")
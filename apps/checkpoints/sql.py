@@ -1,6 +1,10 @@
 from django.db import DatabaseError, connection
 
+from config.resultcache import cached_procedure
+from config.resultset import ResultSet
 
+
+@cached_procedure("ListCheckpointsDrivers", "driver")
 def get_drivers_list(user_company_id, user_id, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -11,9 +15,7 @@ def get_drivers_list(user_company_id, user_id, search_query=None):
             )
             rows = cursor.fetchall()
 
-            # Usar cursor.description para obtener los nombres de las columnas
-            columns = [col[0] for col in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return ResultSet.from_cursor(cursor, rows)
 
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
@@ -25,6 +27,7 @@ def get_drivers_list(user_company_id, user_id, search_query=None):
         return []
 
 
+@cached_procedure("ListCompanyScoresByCompanyAndUser", "score")
 def getCompanyScoresByCompanyAndUser(company_id, user_id, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -35,9 +38,7 @@ def getCompanyScoresByCompanyAndUser(company_id, user_id, search_query=None):
             )
             rows = cursor.fetchall()
 
-            # Usar cursor.description para obtener los nombres de las columnas
-            columns = [col[0] for col in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return ResultSet.from_cursor(cursor, rows)
 
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
@@ -49,6 +50,7 @@ def getCompanyScoresByCompanyAndUser(company_id, user_id, search_query=None):
         return []
 
 
+@cached_procedure("ListConfigDataSeM", "datasem", "user")
 def fetch_all_confidatasem(company, user, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -68,9 +70,7 @@ def fetch_all_confidatasem(company, user, search_query=None):
             )
 
             rows = cursor.fetchall()
-            columns = [col[0] for col in cursor.description]
-
-            result = [dict(zip(columns, row)) for row in rows]
+            result = ResultSet.from_cursor(cursor, rows)
             print("Resultado de la consulta:", result)  # Debug: Imprimir el resultado de la consulta
             return result
     except DatabaseError as e:
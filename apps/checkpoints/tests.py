@@ -1,3 +1,950 @@
-from django.test import TestCase
+import io
+import json
+import os
+import pickle
+import re
+import tempfile
+from datetime import datetime, timezone
+from importlib.util import find_spec
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import pandas as pd
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.db import DatabaseError
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from openpyxl import load_workbook
+from PIL import Image
+
+from apps.authentication.models import User
+from apps.events.models import Alarm
+from apps.realtime.apis import (ExportDataDevices, ExportDataVehicles,
+                                SearchDevices, SearchSendCommand,
+                                SearchVehicles)
+from apps.realtime.models import Vehicle
+from config import exportjobs, exports, listing, pdf, resultcache, sorting
+from config.resultset import ResultSet
+
+from . import api, reports
+from .places import PlaceIndex, build_place_index
+from .postgres import LocalCache, ReverseGeocoder, get_geocoder
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "geocoding": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "geocoding-tests",
+    },
+    "listing": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "listing-tests",
+    },
+    "exports": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "exports-tests",
+    },
+}
+
+
+class CountingGeocoder(ReverseGeocoder):
+    def __init__(self, *args, addresses=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.addresses = addresses or {}
+        self.queries = []
+
+    def query_many(self, points):
+        self.queries.append(list(points))
+        return [self.addresses.get(point) for point in points]
+
+
+class LocalCacheTestCase(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LocalCache(size=2, timeout=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), (True, 1))
+        self.assertEqual(cache.get("b"), (False, None))
+
+    def test_expired_entries_are_missing(self):
+        cache = LocalCache(size=2, timeout=-1)
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), (False, None))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, GEOCODING_PRECISION=4)
+class ReverseGeocoderTestCase(SimpleTestCase):
+    def setUp(self):
+        caches["geocoding"].clear()
+
+    def test_nearby_coordinates_share_the_cached_address(self):
+        geocoder = CountingGeocoder(
+            "rev_geocode_test", addresses={("4.60971", "-74.08175"): "Calle 1 # 2-3"}
+        )
+        self.assertEqual(geocoder.reverse("4.60971", "-74.08175"), "Calle 1 # 2-3")
+        self.assertEqual(geocoder.reverse("4.609712", "-74.081748"), "Calle 1 # 2-3")
+        self.assertEqual(len(geocoder.queries), 1)
+
+    def test_reverse_many_deduplicates_rounded_points(self):
+        geocoder = CountingGeocoder(
+            "rev_geocode_test", addresses={("1.0", "2.0"): "Carrera 7", ("3.0", "4.0"): "Calle 9"}
+        )
+        geocoder.reverse("3.0", "4.0")
+        points = [("1.0", "2.0"), ("1.00001", "2.00001"), ("3.0", "4.0"), (None, None)]
+        self.assertEqual(geocoder.reverse_many(points), ["Carrera 7", "Carrera 7", "Calle 9", None])
+        self.assertEqual(geocoder.queries, [[("3.0", "4.0")], [("1.0", "2.0")]])
+
+    @override_settings(GEOCODING_BATCH_SIZE=2, GEOCODING_BATCH_WORKERS=2)
+    def test_reverse_many_splits_misses_in_batches(self):
+        points = [(str(number), "0") for number in range(5)]
+        geocoder = CountingGeocoder(
+            "rev_geocode_test", addresses={point: point[0] for point in points}
+        )
+        self.assertEqual(geocoder.reverse_many(points), ["0", "1", "2", "3", "4"])
+        self.assertEqual(sorted(len(batch) for batch in geocoder.queries), [1, 2, 2])
+
+    def test_shared_cache_is_used_by_other_processes(self):
+        first = CountingGeocoder("rev_geocode_test", addresses={("1.0", "2.0"): "Carrera 7"})
+        first.reverse("1.0", "2.0")
+        second = CountingGeocoder("rev_geocode_test")
+        self.assertEqual(second.reverse("1.0", "2.0"), "Carrera 7")
+        self.assertEqual(second.queries, [])
+
+    def test_missing_addresses_are_cached(self):
+        geocoder = CountingGeocoder("rev_geocode_test")
+        self.assertIsNone(geocoder.reverse("1.0", "2.0"))
+        self.assertIsNone(geocoder.reverse("1.0", "2.0"))
+        self.assertEqual(len(geocoder.queries), 1)
+
+    def test_invalid_coordinates(self):
+        geocoder = CountingGeocoder("rev_geocode_test")
+        self.assertIsNone(geocoder.reverse("None", "None"))
+        self.assertEqual(geocoder.queries, [])
+
+    def test_get_geocoder_is_shared(self):
+        params = {"dbname": "geo", "host": "localhost"}
+        geocoder = get_geocoder("rev_geocode_test", params)
+        self.assertIs(get_geocoder("rev_geocode_test", dict(params)), geocoder)
+        self.assertIsNot(get_geocoder("rev_geocode_other", params), geocoder)
+
+
+class PlaceIndexTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "places")
+        build_place_index(
+            [
+                ("nombre", "latitud", "longitud"),
+                ("Calle 26", 4.6300, -74.0800),
+                ("Calle 26", 4.6300, -74.0790),
+                ("Carrera 7", 4.6100, -74.0700),
+                ("Autopista Norte", 4.7500, -74.0450),
+            ],
+            self.path,
+            cell_size=0.01,
+        )
+
+    def test_nearest_place(self):
+        index = PlaceIndex(self.path)
+        self.assertEqual(index.count, 4)
+        self.assertEqual(index.nearest(4.6302, -74.0792, max_distance=100), "Calle 26")
+        self.assertEqual(index.nearest(4.6099, -74.0701, max_distance=100), "Carrera 7")
+
+    def test_nearest_near_cell_border(self):
+        index = PlaceIndex(self.path)
+        # A unos 60 m del punto, cerca del borde de su celda
+        self.assertEqual(index.nearest(4.7495, -74.0451, max_distance=100), "Autopista Norte")
+
+    def test_far_points_have_no_place(self):
+        index = PlaceIndex(self.path)
+        self.assertIsNone(index.nearest(4.6200, -74.0750, max_distance=100))
+        self.assertIsNone(index.nearest(10.0, -70.0, max_distance=100))
+
+    def test_non_finite_points_have_no_place(self):
+        index = PlaceIndex(self.path)
+        self.assertIsNone(index.nearest(float("nan"), -74.0800, max_distance=100))
+        self.assertIsNone(index.nearest(4.6300, float("inf"), max_distance=100))
+
+    @override_settings(CACHES=LOCMEM_CACHES, GEOCODING_OFFLINE_MAX_DISTANCE=100)
+    def test_non_finite_points_do_not_blank_the_batch(self):
+        caches["geocoding"].clear()
+        geocoder = CountingGeocoder("rev_geocode_nan", addresses={("1.0", "2.0"): "Carrera 7"})
+        points = [("4.6301", "-74.0799"), (float("nan"), -74.08), ("1.0", "2.0"), ("inf", "2.0")]
+        with override_settings(GEOCODING_OFFLINE_INDEX=self.path):
+            addresses = geocoder.reverse_many(points)
+        self.assertEqual(addresses, ["Calle 26", None, "Carrera 7", None])
+        self.assertEqual(geocoder.queries, [[("1.0", "2.0")]])
+
+    @override_settings(CACHES=LOCMEM_CACHES, GEOCODING_OFFLINE_MAX_DISTANCE=100)
+    def test_geocoder_falls_back_to_postgis(self):
+        geocoder = CountingGeocoder("rev_geocode_test", addresses={("1.0", "2.0"): "Carrera 7"})
+        with override_settings(GEOCODING_OFFLINE_INDEX=self.path):
+            addresses = geocoder.reverse_many([("4.6301", "-74.0799"), ("1.0", "2.0")])
+        self.assertEqual(addresses, ["Calle 26", "Carrera 7"])
+        self.assertEqual(geocoder.queries, [[("1.0", "2.0")]])
+
+
+class GeocodeCoordinatesTestCase(SimpleTestCase):
+    def post(self, user, points):
+        request = RequestFactory().post(
+            "/checkpoints/geocode", json.dumps({"points": points}), content_type="application/json"
+        )
+        request.user = user
+        return api.geocode_coordinates(request)
+
+    def test_anonymous_requests_are_redirected_to_login(self):
+        with mock.patch.object(api, "GeocodingService") as service:
+            response = self.post(AnonymousUser(), [[4.6097, -74.0817]])
+        self.assertEqual(response.status_code, 302)
+        service.assert_not_called()
+
+    def test_addresses_are_returned_in_order(self):
+        user = SimpleNamespace(id=7, company_id=3, is_authenticated=True)
+        with mock.patch.object(api, "GeocodingService") as service:
+            service.return_value.rev_geocode_many.return_value = ["Calle 26", None]
+            response = self.post(user, [[4.63, -74.08], {"latitude": 1.0, "longitude": 2.0}])
+        self.assertEqual(json.loads(response.content), {"addresses": ["Calle 26", None]})
+        service.return_value.rev_geocode_many.assert_called_once_with(
+            [(4.63, -74.08), (1.0, 2.0)]
+        )
+
+
+class FakeProcedures:
+    """
+    Procedimientos `List*` en memoria; con los parámetros de paginación retornan la página, con
+    `TotalRecords` salvo los de `uncounted`.
+    """
+
+    def __init__(self, rows, uncounted=()):
+        self.rows = rows
+        self.uncounted = set(uncounted)
+        self.calls = []
+
+    def __call__(self, procedure, params):
+        self.calls.append((procedure, dict(params)))
+        rows = [dict(row) for row in self.rows.get(procedure, [])]
+        if "PageSize" not in params:
+            return ResultSet.from_dicts(rows)
+        rows.sort(key=lambda row: row[params["OrderBy"]], reverse=params["Direction"] == "desc")
+        start = (params["PageNumber"] - 1) * params["PageSize"]
+        page = rows[start:start + params["PageSize"]]
+        if procedure in self.uncounted:
+            return ResultSet.from_dicts(page)
+        return ResultSet.from_dicts(dict(row, TotalRecords=len(rows)) for row in page)
+
+
+class ListEngineTestCase(SimpleTestCase):
+    rows = [{"id": number, "name": f"Vehiculo {number:02d}"} for number in range(1, 8)]
+
+    def fetch(self, procedures, **kwargs):
+        options = {"order_by": "name", "direction": "desc", "page_number": 1, "page_size": 3}
+        options.update(kwargs)
+        sources = options.pop("sources", [("ListTest", {"CompanyId": 1})])
+        with mock.patch.object(listing, "execute_procedure", procedures):
+            return listing.fetch_page(sources, **options)
+
+    @override_settings(LIST_ENGINE_PAGED_PROCEDURES={"ListTest"})
+    def test_page_is_sorted_and_sliced_by_the_procedure(self):
+        procedures = FakeProcedures({"ListTest": self.rows})
+        page = self.fetch(procedures, page_number="2")
+        self.assertEqual([row["id"] for row in page.object_list], [4, 3, 2])
+        self.assertEqual(page.object_list[0], {"id": 4, "name": "Vehiculo 04"})
+        self.assertEqual(page.as_dict()["total_items"], 7)
+        self.assertEqual(page.as_dict()["num_pages"], 3)
+        self.assertEqual(len(procedures.calls), 1)
+        self.assertEqual(procedures.calls[0][1]["PageNumber"], 2)
+
+    def test_procedures_without_paging_are_sorted_in_python(self):
+        procedures = FakeProcedures({"ListTest": self.rows})
+        page = self.fetch(procedures, page_number="2")
+        self.assertEqual([row["id"] for row in page.object_list], [4, 3, 2])
+        self.assertEqual(page.count, 7)
+        # Sin habilitar la paginación en la base de datos no se envían sus parámetros
+        self.assertEqual(procedures.calls, [("ListTest", {"CompanyId": 1})])
+
+    @override_settings(LIST_ENGINE_PAGED_PROCEDURES={"ListTest"})
+    def test_pages_without_total_count_their_rows(self):
+        procedures = FakeProcedures({"ListTest": self.rows}, uncounted=["ListTest"])
+        page = self.fetch(procedures)
+        self.assertEqual(page.count, 3)
+        page = self.fetch(procedures, page_number=3)
+        self.assertEqual([row["id"] for row in page.object_list], [1])
+        self.assertEqual(page.as_dict()["start_index"], 7)
+        self.assertEqual(page.as_dict()["total_items"], 7)
+
+    @override_settings(LIST_ENGINE_PAGED_PROCEDURES={"ListTest"})
+    def test_out_of_range_page_returns_the_last_page(self):
+        procedures = FakeProcedures({"ListTest": self.rows})
+        page = self.fetch(procedures, page_number=9)
+        self.assertEqual(page.number, 3)
+        self.assertEqual([row["id"] for row in page.object_list], [1])
+
+    @override_settings(LIST_ENGINE_PAGED_PROCEDURES={"ListTest", "ListOther"})
+    def test_fallback_procedure_is_used_when_the_first_is_empty(self):
+        procedures = FakeProcedures({"ListOther": self.rows})
+        page = self.fetch(procedures, sources=[("ListTest", {}), ("ListOther", {})])
+        self.assertEqual(page.count, 7)
+        self.assertEqual([procedure for procedure, _ in procedures.calls], ["ListTest", "ListOther"])
+
+    def test_database_errors_return_an_empty_page(self):
+        def failing(procedure, params):
+            raise DatabaseError("timeout")
+
+        with self.assertLogs("config.listing", "ERROR"):
+            page = self.fetch(failing)
+        self.assertEqual(page.object_list, [])
+        self.assertEqual(page.as_dict()["start_index"], 0)
+
+
+class KeysetTestCase(SimpleTestCase):
+    fields = ["server_date", "pk"]
+
+    def test_cursor_round_trip(self):
+        token = listing.encode_cursor([datetime(2024, 5, 1, 8, 30), 42], backward=True)
+        values, backward = listing.decode_cursor(token, Alarm, self.fields)
+        self.assertEqual(values, [datetime(2024, 5, 1, 8, 30), 42])
+        self.assertTrue(backward)
+
+    def test_invalid_cursors_are_ignored(self):
+        token = listing.encode_cursor([datetime(2024, 5, 1, 8, 30), 42])
+        self.assertIsNone(listing.decode_cursor(token + "x", Alarm, self.fields))
+        self.assertIsNone(listing.decode_cursor(token, Alarm, ["pk"]))
+        self.assertIsNone(listing.decode_cursor("basura", Alarm, self.fields))
+
+    def test_seek_filter(self):
+        moment = datetime(2024, 5, 1, 8, 30)
+        self.assertEqual(
+            listing.seek_filter(self.fields, [moment, 42], descending=True),
+            Q(server_date__lt=moment) | Q(server_date=moment, pk__lt=42),
+        )
+        self.assertEqual(listing.seek_filter(["pk"], [42]), Q(pk__gt=42))
+
+    def test_first_page_has_no_previous_cursor(self):
+        page = listing.KeysetPage([], 20)
+        self.assertEqual(
+            page.as_dict(),
+            {
+                "has_next": False,
+                "has_previous": False,
+                "next": None,
+                "previous": None,
+                "page_size": 20,
+            },
+        )
+
+
+class CursorScopeTestCase(SimpleTestCase):
+    def request(self, assigned):
+        user = SimpleNamespace(
+            id=7,
+            company_id=5,
+            companies_to_monitor=mock.Mock(**{"values_list.return_value": []}),
+            vehicles_to_monitor=mock.Mock(**{"exists.return_value": assigned}),
+            group_vehicles=mock.Mock(**{"exists.return_value": False}),
+        )
+        request = RequestFactory().get("/search", {"cursor": ""})
+        request.user = user
+        return request
+
+    def test_restricted_users_only_see_their_vehicles(self):
+        request = self.request(assigned=True)
+        for view in (SearchVehicles, SearchSendCommand):
+            sql = str(view().get_queryset(request).query)
+            self.assertIn("authentication_user_vehicles_to_monitor", sql)
+            self.assertIn("authentication_user_group_vehicles", sql)
+            self.assertIn('"user_id" = 7', sql)
+
+    def test_users_without_vehicles_see_the_company(self):
+        request = self.request(assigned=False)
+        for view in (SearchVehicles, SearchSendCommand):
+            sql = str(view().get_queryset(request).query)
+            self.assertNotIn("authentication_user_vehicles_to_monitor", sql)
+
+    def test_devices_include_the_ip(self):
+        device = SimpleNamespace(
+            pk="860000000000001",
+            imei="860000000000001",
+            company=None,
+            ip="10.0.0.8",
+            serial_number="S1",
+            simcard=None,
+            is_active=True,
+            familymodel=None,
+            create_date=None,
+        )
+        self.assertEqual(SearchDevices().format_instance(device)["ip"], "10.0.0.8")
+
+
+@override_settings(CACHES=LOCMEM_CACHES, LIST_CACHE_TIMEOUT=60)
+class ResultCacheTestCase(SimpleTestCase):
+    rows = [{"id": 1, "license": "ABC123", "installation_date": datetime(2024, 1, 5)}]
+
+    def setUp(self):
+        caches["listing"].clear()
+        self.calls = []
+
+        @resultcache.cached_procedure("ListVehicleTest", "vehicle")
+        def list_vehicles(company_id, user_id, search_query=None):
+            self.calls.append((company_id, user_id, search_query))
+            return [dict(row) for row in self.rows if search_query != "vacío"]
+
+        self.list_vehicles = list_vehicles
+
+    def test_repeated_calls_use_the_cache(self):
+        self.assertEqual(self.list_vehicles(1, 2, "abc"), self.rows)
+        self.assertEqual(self.list_vehicles(1, 2, "abc"), self.rows)
+        self.list_vehicles(1, 3, "abc")
+        self.assertEqual(self.calls, [(1, 2, "abc"), (1, 3, "abc")])
+
+    def test_saving_a_model_invalidates_its_lists(self):
+        self.list_vehicles(1, 2)
+        post_save.send(sender=Vehicle, instance=None, created=False)
+        self.list_vehicles(1, 2)
+        resultcache.bump_versions("device")
+        self.list_vehicles(1, 2)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_changes_inside_a_transaction_invalidate_on_commit(self):
+        self.list_vehicles(1, 2)
+        callbacks = []
+        atomic = mock.Mock(**{"get_connection.return_value.in_atomic_block": True})
+        atomic.on_commit.side_effect = callbacks.append
+        with mock.patch.object(resultcache, "transaction", atomic):
+            post_save.send(sender=Vehicle, instance=None, created=False)
+        # Antes del commit se sigue leyendo el resultado guardado
+        self.list_vehicles(1, 2)
+        self.assertEqual(len(self.calls), 1)
+        for callback in callbacks:
+            callback()
+        self.list_vehicles(1, 2)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_logins_do_not_invalidate_user_lists(self):
+        with mock.patch.object(resultcache, "bump_versions") as bump:
+            post_save.send(sender=User, instance=None, created=False, update_fields={"last_login"})
+            bump.assert_not_called()
+            post_save.send(sender=User, instance=None, created=False, update_fields=None)
+            bump.assert_called_once_with("user")
+
+    def test_company_changes_invalidate_every_list(self):
+        self.list_vehicles(1, 2)
+        resultcache.bump_versions("company")
+        self.list_vehicles(1, 2)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_empty_results_are_not_cached(self):
+        self.assertEqual(self.list_vehicles(1, 2, "vacío"), [])
+        self.list_vehicles(1, 2, "vacío")
+        self.assertEqual(len(self.calls), 2)
+
+    def test_list_engine_sorts_and_pages_the_cached_result(self):
+        procedures = FakeProcedures({"ListTest": ListEngineTestCase.rows})
+        with mock.patch.object(listing, "execute_procedure", procedures):
+            for number in (1, 2, 3):
+                page = listing.fetch_page(
+                    [("ListTest", {"CompanyId": 1})], "name", "asc", number, 3,
+                    entities=("vehicle",),
+                )
+        self.assertEqual([row["id"] for row in page.object_list], [7])
+        # Una sola consulta completa
+        self.assertEqual(len(procedures.calls), 1)
+
+
+class SortingTestCase(SimpleTestCase):
+    values = ["10", "9", "b", "A", "#x", None, "", "2 ejes", "a", "9", "Ñandú"]
+
+    def rows(self):
+        return [{"id": position, "name": value} for position, value in enumerate(self.values)]
+
+    def test_natural_order(self):
+        rows = sorting.sort_rows(self.rows(), "name")
+        self.assertEqual(
+            [row["name"] for row in rows],
+            ["2 ejes", "9", "9", "10", "A", "a", "b", "Ñandú", "#x", None, ""],
+        )
+
+    @override_settings(SORT_VECTORIZE_THRESHOLD=1)
+    def test_vectorized_order_matches_sorted(self):
+        for reverse in (False, True):
+            for key_function in (sorting.sort_key, sorting.natural_sort_key(sorting.LETTERS_FIRST)):
+                expected = sorted(self.rows(), key=key_function("name"), reverse=reverse)
+                rows = sorting.sort_rows(self.rows(), "name", reverse, key_function)
+                self.assertEqual([row["id"] for row in rows], [row["id"] for row in expected])
+
+    @override_settings(SORT_VECTORIZE_THRESHOLD=1)
+    def test_values_outside_the_arrays_use_sorted(self):
+        rows = [{"iccid": "89570101234567890123"}, {"iccid": "12"}, {"iccid": 5}]
+        with self.assertRaises(TypeError):
+            sorting.sort_rows(rows, "iccid")
+        rows = sorting.sort_rows(rows[:2], "iccid", reverse=True)
+        self.assertEqual(rows[0]["iccid"], "89570101234567890123")
+
+    def test_commands_sort_dates_first(self):
+        rows = [{"date": None}, {"date": datetime(2024, 1, 2)}, {"date": datetime(2024, 1, 1)}]
+        rows = sorting.sort_rows(rows, "date", key_function=sorting.sort_key_commands_datetime)
+        self.assertEqual(
+            [row["date"] for row in rows], [datetime(2024, 1, 1), datetime(2024, 1, 2), None]
+        )
+
+
+class ResultSetTestCase(SimpleTestCase):
+    def setUp(self):
+        self.result = ResultSet(
+            ["id", "imei", "create_date"],
+            [(1, "860000000000001", datetime(2024, 1, 5)), (2, "860000000000002", None)],
+        )
+
+    def test_rows_read_like_dictionaries(self):
+        row = self.result[0]
+        self.assertEqual(row["imei"], "860000000000001")
+        self.assertEqual(row.get("ip", ""), "")
+        self.assertIn("create_date", row)
+        self.assertEqual(dict(row), {"id": 1, "imei": "860000000000001", "create_date": row[2]})
+        with self.assertRaises(KeyError):
+            row["ip"]
+        # Todas las filas comparten la clase y las columnas
+        self.assertIs(type(row), type(self.result[1]))
+
+    def test_rows_are_tuples_without_dict(self):
+        row = self.result[1]
+        self.assertIsInstance(row, tuple)
+        self.assertFalse(hasattr(row, "__dict__"))
+
+    def test_cache_round_trip(self):
+        result = pickle.loads(pickle.dumps(self.result))
+        self.assertEqual(result, self.result)
+        self.assertEqual(resultcache._decode(resultcache._encode(self.result)), self.result)
+
+    def test_without_and_json(self):
+        result = self.result.without("create_date")
+        self.assertEqual(result.columns, ("id", "imei"))
+        self.assertEqual(
+            result.to_json(), '[{"id":1,"imei":"860000000000001"},{"id":2,"imei":"860000000000002"}]'
+        )
+        self.assertEqual(
+            self.result[1:].to_compact_json(),
+            '{"columns":["id","imei","create_date"],"rows":[[2,"860000000000002",null]]}',
+        )
+
+
+@override_settings(TIME_ZONE="America/Bogota")
+class ExportTestCase(SimpleTestCase):
+    devices = ResultSet.from_dicts(
+        {
+            "imei": f"86000000000000{number}",
+            "company": "Tracking S.A.",
+            "ip": None,
+            "serial_number": f"SN-{number}",
+            "simcard": "3001234567",
+            "simcard_visible": True,
+            "is_active": number % 2 == 1,
+            "familymodel": "FMB920",
+            "create_date": datetime(2024, 3, number, 15, 30, tzinfo=timezone.utc),
+        }
+        for number in range(1, 4)
+    )
+
+    def get(self, view, query, procedures):
+        calls = []
+
+        def fake_iter_procedure(procedure, params, chunk_size=None):
+            calls.append(procedure)
+            return iter(procedures.get(procedure, []))
+
+        request = RequestFactory().get("/export", query)
+        request.user = SimpleNamespace(id=7, company_id=3)
+        with mock.patch.object(exports, "iter_procedure", fake_iter_procedure):
+            response = view.as_view()(request)
+        return response, calls
+
+    def test_json_response_is_kept_by_default(self):
+        response, _ = self.get(ExportDataDevices, {}, {"ListDeviceByCompany": self.devices})
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn(b'"headers": ["Company", "IMEI"', response.content)
+        self.assertIn(b'"imei": "860000000000001"', response.content)
+
+    def test_csv_follows_the_header_order(self):
+        response, _ = self.get(
+            ExportDataDevices, {"format": "csv"}, {"ListDeviceByCompany": self.devices}
+        )
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="devices.csv"')
+        lines = b"".join(response.streaming_content).decode("utf-8").splitlines()
+        self.assertTrue(lines[0].startswith("\ufeffCompany,IMEI,Serial Number"))
+        self.assertEqual(
+            lines[1],
+            "Tracking S.A.,860000000000001,SN-1,FMB920,3001234567,,2024-03-01 10:30:00,True",
+        )
+        self.assertEqual(len(lines), 4)
+
+    def test_xlsx_is_a_workbook_with_naive_dates(self):
+        response, _ = self.get(
+            ExportDataDevices, {"format": "xlsx"}, {"ListDeviceByCompany": self.devices}
+        )
+        workbook = load_workbook(io.BytesIO(b"".join(response.streaming_content)))
+        rows = list(workbook.active.values)
+        self.assertEqual(rows[0][:2], ("Company", "IMEI"))
+        self.assertEqual(rows[3][1], "860000000000003")
+        # Hora local, sin zona horaria
+        self.assertEqual(rows[1][6], datetime(2024, 3, 1, 10, 30))
+        self.assertEqual(len(rows), 4)
+
+    def test_fallback_procedure_is_used_when_the_first_is_empty(self):
+        vehicles = ResultSet.from_dicts([
+            {
+                "device": "860000000000001",
+                "company": "Tracking S.A.",
+                "license": "ABC123",
+                "vehicle_type": "Camión",
+                "n_interno": "7",
+                "is_active": True,
+                "installation_date": None,
+            }
+        ])
+        response, calls = self.get(
+            ExportDataVehicles, {"format": "csv"}, {"ListVehicleByCompany": vehicles}
+        )
+        content = b"".join(response.streaming_content).decode("utf-8")
+        self.assertIn("Tracking S.A.,ABC123,7,860000000000001,Camión,,True", content)
+        self.assertEqual(calls, ["ListVehicleByUserAndCompany", "ListVehicleByCompany"])
+
+    def test_database_errors_do_not_return_a_partial_file(self):
+        def failing():
+            yield self.devices[0]
+            raise DatabaseError("timeout")
+
+        response, _ = self.get(
+            ExportDataDevices, {"format": "xlsx"}, {"ListDeviceByCompany": failing()}
+        )
+        self.assertEqual(response.status_code, 500)
+
+    def test_cells_drop_control_characters(self):
+        self.assertEqual(exports.cell_value("Ruta\x0b 1"), "Ruta 1")
+        self.assertEqual(exports.cell_value(5), 5)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, TIME_ZONE="America/Bogota")
+class ExportJobsTestCase(SimpleTestCase):
+    user = SimpleNamespace(id=7, company_id=3)
+
+    def setUp(self):
+        caches["exports"].clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = media.name
+        storage = override_settings(MEDIA_ROOT=media.name)
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+    def request(self, path, query=None, user=None):
+        request = RequestFactory().get(path, query or {})
+        request.user = user or self.user
+        return request
+
+    def enqueue_devices(self):
+        request = self.request("/export", {"format": "csv", "background": "1", "query": "86"})
+        with mock.patch.object(exportjobs, "enqueue") as enqueue:
+            response = ExportDataDevices.as_view()(request)
+        self.assertEqual(response.status_code, 202)
+        job_id = enqueue.call_args[0][0]
+        job = exportjobs.get_job(job_id)
+        self.assertEqual(job["status"], exportjobs.QUEUED)
+        self.assertEqual(job["params"]["query"], "format=csv&query=86")
+        return job_id
+
+    def run_job(self, job_id):
+        users = mock.Mock()
+        users.objects.get.return_value = self.user
+        with mock.patch.object(exports, "get_user_model", return_value=users), \
+                mock.patch.object(
+                    exports, "iter_procedure", return_value=iter(ExportTestCase.devices)
+                ) as iter_procedure:
+            exportjobs.run_job(job_id)
+        return iter_procedure
+
+    def test_list_job_runs_with_the_original_parameters(self):
+        job_id = self.enqueue_devices()
+        iter_procedure = self.run_job(job_id)
+        params = iter_procedure.call_args[0][1]
+        self.assertEqual(params, {"CompanyId": 3, "UserId": 7, "SearchQuery": "86"})
+
+        status = json.loads(exportjobs.job_status(self.request("/status"), job_id).content)
+        self.assertEqual(status["status"], exportjobs.DONE)
+        self.assertEqual(status["rows"], 3)
+        self.assertEqual(status["filename"], "devices.csv")
+        self.assertGreater(status["expires_in"], 3500)
+
+    def test_download_is_served_once(self):
+        job_id = self.enqueue_devices()
+        self.run_job(job_id)
+        token = exportjobs.get_job(job_id)["token"]
+        storage_name = exportjobs.get_job(job_id)["storage_name"]
+        self.assertTrue(os.path.exists(os.path.join(self.media, storage_name)))
+
+        response = exportjobs.job_download(self.request("/download", {"token": token}), job_id)
+        content = b"".join(response.streaming_content).decode("utf-8")
+        response.close()
+        self.assertTrue(content.startswith("\ufeffCompany,IMEI"))
+        self.assertEqual(len(content.splitlines()), 4)
+        self.assertFalse(os.path.exists(os.path.join(self.media, storage_name)))
+        self.assertEqual(exportjobs.get_job(job_id)["status"], exportjobs.DOWNLOADED)
+
+        again = exportjobs.job_download(self.request("/download", {"token": token}), job_id)
+        self.assertEqual(again.status_code, 410)
+
+    def test_download_link_expires_and_belongs_to_the_user(self):
+        job_id = self.enqueue_devices()
+        self.run_job(job_id)
+        token = exportjobs.get_job(job_id)["token"]
+        other = SimpleNamespace(id=8, company_id=3)
+        response = exportjobs.job_download(
+            self.request("/download", {"token": token}, user=other), job_id
+        )
+        self.assertEqual(response.status_code, 404)
+        with override_settings(EXPORT_DOWNLOAD_MAX_AGE=-1):
+            response = exportjobs.job_download(self.request("/download", {"token": token}), job_id)
+        self.assertEqual(response.status_code, 410)
+
+    def test_failed_jobs_report_the_error(self):
+        job_id = self.enqueue_devices()
+        users = mock.Mock()
+        users.objects.get.return_value = self.user
+        failing = mock.patch.object(
+            exports, "iter_procedure", side_effect=DatabaseError("timeout")
+        )
+        with mock.patch.object(exports, "get_user_model", return_value=users), failing, \
+                self.assertLogs("config.exportjobs", "ERROR"):
+            exportjobs.run_job(job_id)
+        job = exportjobs.get_job(job_id)
+        self.assertEqual(job["status"], exportjobs.FAILED)
+        self.assertIn("timeout", job["error"])
+        self.assertIsNone(job["storage_name"])
+
+    def test_purge_removes_files_of_expired_jobs(self):
+        job_id = self.enqueue_devices()
+        self.run_job(job_id)
+        self.assertEqual(exportjobs.purge_files(), 0)
+        caches["exports"].clear()
+        self.assertEqual(exportjobs.purge_files(), 1)
+        self.assertEqual(os.listdir(os.path.join(self.media, "exports")), [])
+
+
+class ReportPipelineTestCase(SimpleTestCase):
+    records = [
+        {
+            "imei": "860000000000001",
+            "server_date": "2024-03-01T15:30:00",
+            "signal_date": "2024-03-01T15:29:58.123",
+            "latitude": 4.6097,
+            "longitude": -74.0817,
+            "speed": 42,
+        },
+        {
+            "imei": "860000000000001",
+            "server_date": "2024-03-01T00:10:00",
+            "signal_date": None,
+            "speed": 0,
+        },
+    ]
+
+    def build(self, records=None):
+        geocoder = mock.Mock()
+        geocoder.rev_geocode_many.side_effect = lambda points: [
+            "Bogotá" if latitude is not None else None for latitude, _ in points
+        ]
+        with mock.patch.object(reports, "GeocodingService", return_value=geocoder):
+            frame = reports.build_report_frame(records or self.records, 300)
+        return frame, geocoder
+
+    def test_dates_are_shifted_to_the_user_timezone(self):
+        frame, _ = self.build()
+        self.assertEqual(
+            list(frame["server_date"]), ["2024-03-01 10:30:00", "2024-02-29 19:10:00"]
+        )
+        self.assertEqual(frame["signal_date"][0], "2024-03-01 10:29:58")
+        self.assertIsNone(frame["signal_date"][1])
+
+    def test_positions_are_geocoded_in_one_batch(self):
+        frame, geocoder = self.build()
+        geocoder.rev_geocode_many.assert_called_once_with(
+            [(4.6097, -74.0817), (None, None)]
+        )
+        self.assertEqual(list(frame["location"]), ["Bogotá", None])
+
+    def test_missing_values_stay_none_with_string_columns(self):
+        # Con el tipo `str` (el predeterminado de pandas 3) los nulos de la entrada son NaN
+        values = pd.Series(["2024-03-01T15:30:00", None, "sin fecha"], dtype="string")
+        dates = reports.local_dates(values, 300)
+        self.assertEqual(dates.dtype, object)
+        self.assertEqual(list(dates), ["2024-03-01 10:30:00", None, "sin fecha"])
+        frame, _ = self.build()
+        self.assertEqual(frame["location"].dtype, object)
+
+    @override_settings(EXPORT_CHUNK_SIZE=1)
+    def test_csv_is_written_by_chunks(self):
+        frame, _ = self.build()
+        file = io.BytesIO()
+        reports.write_report(frame, "csv", file)
+        lines = file.getvalue().decode("utf-8").splitlines()
+        self.assertEqual(
+            lines[0], "\ufeffimei,server_date,signal_date,latitude,longitude,speed,location"
+        )
+        self.assertEqual(lines[2], "860000000000001,2024-02-29 19:10:00,,,,0,")
+        self.assertEqual(len(lines), 3)
+
+    def test_xlsx_leaves_missing_values_empty(self):
+        frame, _ = self.build()
+        file = io.BytesIO()
+        reports.write_report(frame, "xlsx", file)
+        rows = list(load_workbook(file).active.values)
+        self.assertEqual(rows[1][1], "2024-03-01 10:30:00")
+        self.assertEqual(
+            rows[2], ("860000000000001", "2024-02-29 19:10:00", None, None, None, 0, None)
+        )
+
+
+class PdfTestCase(SimpleTestCase):
+    headers = ["IMEI", "Fecha", "Velocidad", "Ubicación"]
+
+    def rows(self, count):
+        for number in range(count):
+            yield (
+                f"86000000000{number:04d}",
+                datetime(2024, 3, 1, 15, 30),
+                number * 0.5,
+                "Carrera 7 # 26-20, Bogotá, Cundinamarca, Colombia & alrededores",
+            )
+
+    def pages(self, data):
+        return len(re.findall(rb"/Type /Page\b(?!s)", data))
+
+    def test_rows_are_laid_out_over_several_pages(self):
+        file = io.BytesIO()
+        pdf.write_pdf(file, self.headers, self.rows(500), title="Informe")
+        data = file.getvalue()
+        self.assertTrue(data.startswith(b"%PDF"))
+        self.assertGreater(self.pages(data), 5)
+
+    def test_flowables_are_taken_from_the_generator_one_by_one(self):
+        taken = []
+
+        def flowables():
+            for number in range(3):
+                taken.append(number)
+                yield number
+
+        stream = pdf.FlowableStream(flowables())
+        self.assertEqual(len(stream), 1)
+        self.assertEqual(taken, [0])
+        del stream[0]
+        self.assertEqual(len(stream), 1)
+        self.assertEqual(taken, [0, 1])
+
+    def test_branding_logo_and_empty_report(self):
+        logo = io.BytesIO()
+        Image.new("RGB", (40, 20), "red").save(logo, format="PNG")
+        branding = pdf.Branding("Tracking S.A.", logo.getvalue(), "#1A73E8")
+        file = io.BytesIO()
+        pdf.write_pdf(file, self.headers, iter([]), title="Informe", branding=branding)
+        self.assertEqual(self.pages(file.getvalue()), 1)
+        self.assertIn(b"/Subtype /Image", file.getvalue())
+
+    def test_company_branding_uses_the_theme_color(self):
+        company = mock.Mock(pk=3, company_name="Tracking S.A.", company_logo=None)
+        company.theme_set.first.return_value = SimpleNamespace(button_color="#1A73E8")
+        branding = pdf.company_branding(company)
+        self.assertEqual((branding.name, branding.logo, branding.color), (
+            "Tracking S.A.", None, "#1A73E8"
+        ))
+        company.theme_set.first.return_value = None
+        self.assertEqual(pdf.company_branding(company).color, pdf.DEFAULT_COLOR)
+
+    def test_export_view_returns_a_pdf(self):
+        request = RequestFactory().get("/export", {"format": "pdf"})
+        request.user = SimpleNamespace(id=7, company_id=3, company=None)
+        with mock.patch.object(
+            exports, "iter_procedure", return_value=iter(ExportTestCase.devices)
+        ):
+            response = ExportDataDevices.as_view()(request)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="devices.pdf"')
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+    def test_report_pdf_is_built_from_the_frame(self):
+        frame = pd.DataFrame.from_records(ReportPipelineTestCase.records)
+        file = io.BytesIO()
+        reports.write_report(frame, "pdf", file, title="Informe AVL")
+        self.assertTrue(file.getvalue().startswith(b"%PDF"))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ColumnarExportTestCase(SimpleTestCase):
+    user = SimpleNamespace(id=7, company_id=3, is_authenticated=True)
+    query = {
+        "FechaInicial": "2024-03-01T00:00",
+        "FechaFinal": "2024-03-02T00:00",
+        "timezone_offset": "300",
+    }
+
+    def setUp(self):
+        caches["exports"].clear()
+
+    def get(self, query):
+        request = RequestFactory().get("/checkpoints/avldat/bulk", query)
+        request.user = self.user
+        return api.export_avl_data(request)
+
+    def test_bulk_export_rejects_other_formats(self):
+        response = self.get({**self.query, "format": "csv"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_export_requires_the_dates(self):
+        response = self.get({"format": "parquet"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_job_is_limited_to_the_user_company(self):
+        query = {**self.query, "format": "arrow", "background": "1", "Company_id": "99"}
+        with mock.patch.object(exportjobs, "enqueue") as enqueue:
+            response = self.get(query)
+        self.assertEqual(response.status_code, 202)
+        job = exportjobs.get_job(enqueue.call_args[0][0])
+        self.assertEqual((job["kind"], job["filename"]), ("avl", "avl_data.arrow"))
+        self.assertEqual(job["params"]["Company_id"], 3)
+
+    @skipUnless(find_spec("pyarrow"), "pyarrow no está instalado")
+    def test_rows_are_written_in_typed_row_groups(self):
+        import pyarrow.parquet as pq
+
+        from config import columnar
+
+        schema = columnar.arrow_schema(
+            [(column, alias) for column, field, alias in api.AVL_EXPORT_COLUMNS]
+        )
+        rows = [
+            ("860000000000001", 240, datetime(2024, 3, 1, 5, number), None, 4.6097, -74.0817,
+             1200.5, number, 90, None)
+            for number in range(5)
+        ]
+        file = io.BytesIO()
+        columnar.write_batches(file, "parquet", schema, columnar.row_batches(rows, schema, 2))
+        parquet = pq.ParquetFile(io.BytesIO(file.getvalue()))
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        self.assertEqual(str(parquet.schema_arrow.field("latitude").type), "double")
+        self.assertEqual(parquet.read().column("server_date")[4].as_py().minute, 4)
+
+    @skipUnless(find_spec("pyarrow"), "pyarrow no está instalado")
+    def test_report_is_written_as_arrow_with_typed_dates(self):
+        import pyarrow as pa
+
+        frame = pd.DataFrame.from_records(ReportPipelineTestCase.records)
+        frame["server_date"] = reports.local_dates(frame["server_date"], 300)
+        file = io.BytesIO()
+        reports.write_report(frame, "arrow", file)
+        table = pa.ipc.open_file(io.BytesIO(file.getvalue())).read_all()
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(str(table.schema.field("server_date").type), "timestamp[ms]")
+        self.assertEqual(str(table.schema.field("signal_date").type), "timestamp[ms]")
@@ -5,8 +5,8 @@ from apps.checkpoints.sql import fetch_all_confidatasem
 from . import views
 from .api import (ExportDataDriver, ExportDataScoreDriver, SearchDataSem,
                   SearchDrivers, SearchScores, events_by_company,
-                  events_person_by_company, export_report, user_by_company,
-                  vehicles_by_company)
+                  events_person_by_company, export_avl_data, export_report,
+                  geocode_coordinates, user_by_company, vehicles_by_company)
 
 app_name = "checkpoints"
 
@@ -94,6 +94,8 @@ urlpatterns = [
                     name="events_by_company",
                 ),
                 path("avldat", export_report, name="avldat"),
+                path("avldat/bulk", export_avl_data, name="avldat_bulk"),
+                path("geocode", geocode_coordinates, name="geocode_coordinates"),
                 
             ]
         ),
@@ -28,12 +28,13 @@ from apps.log.mixins import (CreateAuditLogAsyncMixin,
                              DeleteAuditLogAsyncMixin,
                              UpdateAuditLogAsyncMixin, obtener_ip_publica)
 from apps.log.utils import log_action
-from apps.realtime.apis import extract_number, get_user_companies, sort_key
+from apps.realtime.apis import get_user_companies
 from apps.realtime.models import AVLData, Device, Vehicle
 from apps.realtime.serializer import AVLDataSerializer
 from apps.realtime.sql import fetch_all_dataplan
 from apps.whitelabel.models import Company
 from config.pagination import get_paginate_by
+from config.sorting import sort_rows
 
 from .forms import (CompanyScoreForm, DataSemConfigurationForm,
                     DriverAnalyticForm, DriverForm, ItemScoreFormsets,
@@ -115,11 +116,10 @@ class ListDriverTemplate(PermissionRequiredMixin, LoginRequiredMixin, ListView):
         # Obtener los planes de datos a través de la función fetch_all_dataplan.
         queryset = get_drivers_list(company.id, user.id, search)
 
-        # Función para convertir los valores a minúsculas y extraer números cuando sea necesario
-        key_function = sort_key(order_by)
+        # Orden natural de la columna (ver `config.sorting`)
         reverse = direction == 'desc'
         try:
-            sorted_queryset = sorted(queryset, key=key_function, reverse=reverse)
+            sorted_queryset = sort_rows(queryset, order_by, reverse)
         except KeyError:
             # Ordenamiento por defecto si la clave no existe
             sorted_queryset = sorted(
@@ -601,12 +601,11 @@ class ListScoreCompanyTemplate(PermissionRequiredMixin, LoginRequiredMixin, List
         self.request.session.modified = True
         # Obtener los planes de datos a través de la función fetch_all_dataplan.
         queryset = getCompanyScoresByCompanyAndUser(self.request.user.company_id, self.request.user.id, search)
-        # Función para convertir los valores a minúsculas y extraer números cuando sea necesario
-        key_function = sort_key(order_by)
+        # Orden natural de la columna (ver `config.sorting`)
         # Determinar si es orden descendente
         reverse = direction == 'desc'
         try:
-            sorted_queryset = sorted(queryset, key=key_function, reverse=reverse)
+            sorted_queryset = sort_rows(queryset, order_by, reverse)
         except KeyError:
             # Ordenamiento por defecto si la clave no existe
             sorted_queryset = sorted(queryset, key=lambda x: x['company'].lower(), reverse=reverse)
@@ -1150,24 +1149,17 @@ class ReportTodayView(PermissionRequiredMixin, View, LoginRequiredMixin):
             list: Una lista de diccionarios actualizados con las fechas y la ubicación ajustadas.
         """
         geocoding_service = GeocodingService()
-        geocoding_service.connect()
 
-        try:
-            for item in json_data:
-                for key in ["server_date", "signal_date"]:
-                    if key in item:
-                        item[key] = geocoding_service.adjust_dates(
-                            item[key], timezone_offset
-                        )
+        for item in json_data:
+            for key in ["server_date", "signal_date"]:
+                if key in item:
+                    item[key] = geocoding_service.adjust_dates(item[key], timezone_offset)
 
-                latitude = str(item.get("latitude"))
-                longitude = str(item.get("longitude"))
-                if latitude and longitude:
-                    location = geocoding_service.rev_geocode(latitude, longitude)
-                    if location:
-                        item["location"] = location
-        finally:
-            geocoding_service.close()
+        # Todas las direcciones del reporte se resuelven en lote
+        points = [(item.get("latitude"), item.get("longitude")) for item in json_data]
+        for item, location in zip(json_data, geocoding_service.rev_geocode_many(points)):
+            if location:
+                item["location"] = location
         return json_data
 
     def get(self, request, *args, **kwargs):
@@ -1448,10 +1440,9 @@ class DataSemConfigurationList(LoginRequiredMixin, ListView):
         Returns:
             list: Conjunto de datos ordenado.
         """
-        key_function = sort_key(order_by)
         reverse = direction == 'desc'
         try:
-            return sorted(queryset, key=key_function, reverse=reverse)
+            return sort_rows(queryset, order_by, reverse)
         except KeyError:
             return sorted(queryset, key=lambda x: x["company_name"].lower(), reverse=reverse)
 
@@ -5,3 +5,7 @@ class EventsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.events"
     label = "events"
+
+    def ready(self):
+        # Conecta los manejadores de señales decorados con @receiver.
+        from . import signals
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.7 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_eventfeature_custom_alarm_sound_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alarm',
+            index=models.Index(fields=['company', 'server_date', 'id'], name='alarm_company_date_idx'),
+        ),
+    ]
@@ -195,6 +195,10 @@ class Alarm(models.Model):
 
     class Meta:
         ordering = ["server_date"]
+        # Paginación por cursor de las alarmas por compañía
+        indexes = [
+            models.Index(fields=["company", "server_date", "id"], name="alarm_company_date_idx"),
+        ]
 
     def __str__(self):
         return f"{self.company} Alarm: {self.main_event}"
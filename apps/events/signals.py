@@ -0,0 +1,17 @@
+"""
+Señales de la aplicación: invalidan los listados guardados en la caché `listing` cuando cambia
+un registro (ver `config.resultcache`).
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from config.resultcache import bump_versions_on_commit
+
+from .models import Event, EventFeature
+
+
+@receiver([post_save, post_delete], sender=Event)
+@receiver([post_save, post_delete], sender=EventFeature)
+def on_event_changed(sender, **kwargs):
+    bump_versions_on_commit("event")
@@ -1,6 +1,10 @@
 from django.db import DatabaseError, connection
 
+from config.resultcache import cached_procedure
+from config.resultset import ResultSet
 
+
+@cached_procedure("ListEnventdByCompany", "event")
 def fetch_all_event(search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -13,8 +17,7 @@ def fetch_all_event(search_query=None):
             )
 
             rows = cursor.fetchall()
-            columns = [col[0] for col in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return ResultSet.from_cursor(cursor, rows)
 
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
@@ -26,6 +29,7 @@ def fetch_all_event(search_query=None):
         return []
 
 
+@cached_procedure("ListEnventPersonalizedByCompany", "event")
 def fetch_all_event_personalized(company, user, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -39,8 +43,7 @@ def fetch_all_event_personalized(company, user, search_query=None):
             )
 
             rows = cursor.fetchall()
-            columns = [col[0] for col in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return ResultSet.from_cursor(cursor, rows)
 
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
@@ -12,7 +12,8 @@ https://docs.djangoproject.com/en/4.0/ref/urls/
 from django.urls import include, path
 
 from . import views  # Importación de las vistas del mismo módulo
-from .apis import SearchEventPredefined, SearchEventUser, ExportDataEvents, ExportDataEventsusers
+from .apis import (SearchAlarms, SearchEventPredefined, SearchEventUser, ExportDataEvents,
+                   ExportDataEventsusers)
 
 app_name = "events"  # Nombre de la aplicación para el espacio de nombres de URL
 
@@ -81,4 +82,6 @@ urlpatterns = [
             ]
         ),
     ),
+    # API de alarmas paginada por cursor
+    path("alarms", SearchAlarms.as_view(), name="alarms"),
 ]
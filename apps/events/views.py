@@ -1,5 +1,3 @@
-import datetime
-
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.db.models import Q
 from django.http import HttpResponse
@@ -17,10 +15,12 @@ from apps.log.mixins import (
     DeleteAuditLogAsyncMixin,
     UpdateAuditLogAsyncMixin,
 )
-from apps.realtime.apis import extract_number, get_user_companies, sort_key
+from apps.realtime.apis import get_user_companies
 from apps.whitelabel.models import Company
 from config.pagination import get_paginate_by
+from config.sorting import sort_rows
 
+from .apis import event_sort_key
 from .forms import EventForm, EventUserForm
 from .models import Event, EventFeature
 from .sql import fetch_all_event, fetch_all_event_personalized
@@ -93,11 +93,10 @@ class ListEventsView(LoginRequiredMixin, ListView):
         ] = session_filters
         self.request.session.modified = True
         queryset = fetch_all_event(search)
-        # Función para convertir los valores a minúsculas y extraer números cuando sea necesario
-        key_function = sort_key(order_by)
+        # Orden natural de la columna (ver `config.sorting`)
         reverse = direction == 'desc'
         try:
-            sorted_queryset = sorted(queryset, key=key_function, reverse=reverse)
+            sorted_queryset = sort_rows(queryset, order_by, reverse)
         except KeyError:
             # Ordenamiento por defecto si la clave no existe
             sorted_queryset = sorted(
@@ -304,28 +303,11 @@ class ListUserEventsTemplate(
         self.request.session.modified = True
         queryset = fetch_all_event_personalized(company, user.id, search)
 
-        # Función para convertir los valores a minúsculas y extraer números cuando sea necesario
-        def sort_key(x):
-            value = x.get(order_by)
-            if value is None or value == "":
-                return (4, "")  # Prioridad 4 para valores nulos o vacíos
-            if isinstance(value, str):
-                # Verificar si comienza con números, letras o caracteres especiales
-                if value[0].isdigit():
-                    return (2, extract_number(value))  # Prioridad 1 para números
-                elif value[0].isalpha():
-                    return (1, value.lower())  # Prioridad 2 para letras
-                else:
-                    return (3, value.lower())  # Prioridad 3 para caracteres especiales
-            if isinstance(value, datetime.time):
-                return (5, value)  # Prioridad 5 para objetos datetime.time
-            return (6, value)  # Prioridad 6 para otros tipos
-
         # Determinar si es orden descendente
         reverse = direction == "desc"
 
         try:
-            sorted_queryset = sorted(queryset, key=sort_key, reverse=reverse)
+            sorted_queryset = sort_rows(queryset, order_by, reverse, event_sort_key)
         except KeyError:
             # Ordenamiento por defecto si la clave no existe
             sorted_queryset = sorted(
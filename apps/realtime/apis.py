@@ -2,26 +2,24 @@ import re
 from datetime import datetime
 
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.db import DatabaseError, connection
-from django.db.models import F, Q, Value
+from django.db.models import F, OuterRef, Q, Subquery, Value
 from django.db.models.functions import Concat
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
-from django.utils import translation
 from django.utils.decorators import method_decorator
 from django.utils.translation import gettext as _
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 
 from apps.whitelabel.models import Company
+from config.exports import ExportView
+from config.listing import ProcedureListView, company_filter, format_long_date
+from config.sorting import sort_key_commands_datetime
 
 from .models import (Brands_assets, DataPlan, Device, FamilyModelUEC,
-                     Line_assets, Manufacture, SimCard, Vehicle)
-from .sql import (ListDeviceByCompany, ListVehicleByUserAndCompany,
-                  ListVehicleGroupsByCompany, fetch_all_dataplan,
-                  fetch_all_geozones, fetch_all_response_commands,
-                  fetch_all_sending_commands, fetch_all_simcards)
+                     Line_assets, Manufacture, Sending_Commands, SimCard,
+                     Vehicle)
 
 
 def list_family_model(request, manufacture_id):
@@ -372,665 +370,264 @@ def get_user_companies(user):
         return companies
 
 
-@method_decorator(csrf_exempt, name="dispatch")
-class SearchVehicles(View):
-    def get(self, request):
-        company = request.user.company_id
-        user_id = request.user.id
-        session_filters = request.session.get(f'filters_sorted_vehicle_{user_id}', {})
-        search_query = request.GET.get("query", None)
-        page_number = request.GET.get('page', session_filters.get('page', [1]))[0]
-
-        if not company or not user_id:
-            return JsonResponse({"error": "Faltan parámetros"}, status=400)
-        paginate_by = request.POST.get(
-            "paginate_by", None
-        )  # Obtener paginate_by de los parámetros GET
-        if paginate_by is None:
-            paginate_by = session_filters.get("paginate_by", 15)
-        # Convertir a entero si es una lista
-        try:
-            paginate_by = int(
-                paginate_by[0]
-            )  # Convertir el primer elemento de la lista a entero
-        except (TypeError, ValueError):
-            paginate_by = int(paginate_by) if paginate_by else 15
-        vehicles = ListVehicleByUserAndCompany(company, user_id, search_query)
-        order_by = session_filters.get('order_by', [None])[0]
-        direction = session_filters.get('direction', [None])[0]
-        page_size = paginate_by # Número de elementos por página.
-        # Obtener la función de clave para ordenar
-        key_function = sort_key(order_by)
-        # Determinar si es orden descendente
-        reverse = direction == 'desc'
-        try:
-            vehicles = sorted(vehicles, key=key_function, reverse=reverse)
-        except KeyError:
-            # Ordenamiento por defecto si la clave no existe
-            vehicles = sorted(vehicles, key=lambda x: x['company'].lower(), reverse=reverse)
-        page_size = paginate_by  # Número de elementos por página.
-        paginator = Paginator(vehicles, page_size)
-
-        try:
-            page = paginator.page(page_number)
-        except PageNotAnInteger:
-            page = paginator.page(1)
-        except EmptyPage:
-            page = paginator.page(paginator.num_pages)
-        current_language = translation.get_language()
-
-        formatted_results = []
-        for vehicle in page.object_list:
-            installation_date = vehicle["installation_date"]
-            month_name = installation_date.strftime("%B")
-            month_name = _(month_name)
-            if installation_date:
-                if current_language == "es":
-                    # Formato en español
-                    formatted_date = installation_date.strftime(
-                        f'%d {_("de")} {month_name} {_("de")} %Y'
-                    )
-                else:
-                    # Formato en inglés u otros idiomas
-                    formatted_date = installation_date.strftime("%B %d, %Y")
-            formatted_results.append(
-                {
-                    "id": vehicle["id"],
-                    "device": vehicle["device"],
-                    "company": vehicle["company"] or "",
-                    "license": vehicle["license"] or "",
-                    "vehicle_type": vehicle["vehicle_type"] or "",
-                    "n_interno": vehicle["n_interno"] or "",
-                    "is_active": vehicle["is_active"] or False,
-                    "icon": vehicle["icon"] or "",
-                    "installation_date": formatted_date,
-                }
-            )
+def assigned_vehicles(user):
+    """
+    Vehículos asignados al usuario, directamente o por sus grupos de vehículos: el alcance de
+    `ListVehicleByUserAndCompany` y `ListSendingCommandsdByCompanyAndUser`.
 
-        response_data = {
-            "results": formatted_results,
-            "page": {
-                "has_next": page.has_next(),
-                "has_previous": page.has_previous(),
-                "number": page.number,
-                "num_pages": paginator.num_pages,
-                "start_index": page.start_index(),
-                "end_index": page.end_index(),
-                "total_items": paginator.count,
-            },
-            "query_string": request.GET.urlencode(),
-        }
-        return JsonResponse(response_data, safe=False)
+    Returns:
+        QuerySet | None: Los vehículos, o None si el usuario no tiene vehículos asignados y ve
+        todos los de sus compañías.
+    """
+    if not (user.vehicles_to_monitor.exists() or user.group_vehicles.exists()):
+        return None
+    return Vehicle.objects.filter(
+        Q(vehicles_to_monitor=user.id) | Q(vehiclegroup__group_vehicles=user.id)
+    )
 
 
 @method_decorator(csrf_exempt, name="dispatch")
-class SearchDevices(View):
-    def get(self, request):
-        company = request.user.company_id
-        user_id = request.user.id
-        session_filters = request.session.get(f'filters_sorted_device_{user_id}', {})
-        search_query = request.GET.get("query", None)
-        page_number = request.GET.get('page', session_filters.get('page', [1]))[0]
-
-        if not company or not user_id:
-            return JsonResponse({"error": "Faltan parámetros"}, status=400)
-        paginate_by = request.POST.get(
-            "paginate_by", None
-        )  # Obtener paginate_by de los parámetros GET
-        if paginate_by is None:
-            paginate_by = session_filters.get("paginate_by", 15)
-        # Convertir a entero si es una lista
-        try:
-            paginate_by = int(
-                paginate_by[0]
-            )  # Convertir el primer elemento de la lista a entero
-        except (TypeError, ValueError):
-            paginate_by = int(paginate_by) if paginate_by else 15
-        devices = ListDeviceByCompany(company, user_id, search_query)
-        order_by = session_filters.get('order_by', [None])[0]
-        direction = session_filters.get('direction', [None])[0]
-        # Obtener la función de clave para ordenar
-        key_function = sort_key(order_by)
-        # Determinar si es orden descendente
-        reverse = direction == 'desc'
-        try:
-            devices = sorted(devices, key=key_function, reverse=reverse)
-        except KeyError:
-            # Ordenamiento por defecto si la clave no existe
-            devices = sorted(devices, key=lambda x: x['company'].lower(), reverse=reverse)
-        page_size = paginate_by  # Número de elementos por página.
-        paginator = Paginator(devices, page_size)
-
-        try:
-            page = paginator.page(page_number)
-        except PageNotAnInteger:
-            page = paginator.page(1)
-        except EmptyPage:
-            page = paginator.page(paginator.num_pages)
-        current_language = translation.get_language()
-
-        formatted_results = []
-        for device in page.object_list:
-            installation_date = device["create_date"]
-            month_name = installation_date.strftime("%B")
-            month_name = _(month_name)
-            if installation_date:
-                if current_language == "es":
-                    # Formato en español
-                    formatted_date = installation_date.strftime(
-                        f'%d {_("de")} {month_name} {_("de")} %Y'
-                    )
-                else:
-                    # Formato en inglés u otros idiomas
-                    formatted_date = installation_date.strftime("%B %d, %Y")
-            formatted_results.append(
-                {
-                    "pk": device["pk"],
-                    "imei": device["imei"],
-                    "company": device["company"] or "",
-                    "ip": device["ip"] or "",
-                    "serial_number": device["serial_number"] or "",
-                    "simcard": device["simcard"] or "",
-                    "simcard_visible": device["simcard_visible"] or False,
-                    "is_active": device["is_active"] or False,
-                    "familymodel": device["familymodel"] or "",
-                    "create_date": _(formatted_date),
-                }
-            )
-
-        response_data = {
-            "results": formatted_results,
-            "page": {
-                "has_next": page.has_next(),
-                "has_previous": page.has_previous(),
-                "number": page.number,
-                "num_pages": paginator.num_pages,
-                "start_index": page.start_index(),
-                "end_index": page.end_index(),
-                "total_items": paginator.count,
-            },
-            "query_string": request.GET.urlencode(),
+class SearchVehicles(ProcedureListView):
+    procedure = "ListVehicleByUserAndCompany"
+    # Usuarios sin vehículos asignados: todos los vehículos de la compañía
+    fallback_procedure = "ListVehicleByCompany"
+    session_name = "vehicle"
+    cache_entities = ("vehicle", "device", "user")
+    keyset_fields = {
+        "id": "pk",
+        "license": "license",
+        "installation_date": "installation_date",
+    }
+    keyset_search_fields = ("license", "n_interno", "device__imei")
+
+    def get_fallback_params(self, request):
+        return {
+            "CompanyId": request.user.company_id,
+            "SearchQuery": request.GET.get("query", None),
         }
-        return JsonResponse(response_data, safe=False)
-
-
-@method_decorator(csrf_exempt, name="dispatch")
-class SearchSimcards(View):
-    def get(self, request):
-        company = request.user.company_id
-        user_id = request.user.id
-        session_filters = request.session.get(f'filters_sorted_simcard_{user_id}', {})
-        search_query = request.GET.get("query", None)
-        page_number = request.GET.get('page', session_filters.get('page', [1]))[0]
-
-        if not company or not user_id:
-            return JsonResponse({"error": "Faltan parámetros"}, status=400)
-        paginate_by = request.POST.get(
-            "paginate_by", None
-        )  # Obtener paginate_by de los parámetros POST
-        if paginate_by is None:
-            paginate_by = session_filters.get("paginate_by", 15)
-        # Convertir a entero si es una lista
-        try:
-            paginate_by = int(
-                paginate_by[0]
-            )  # Convertir el primer elemento de la lista a entero
-        except (TypeError, ValueError):
-            paginate_by = int(paginate_by) if paginate_by else 15
-        simcards = fetch_all_simcards(request.user.company, request.user, search_query)
-        order_by = session_filters.get('order_by', [None])[0]
-        direction = session_filters.get('direction', [None])[0]
-        # Obtener la función de clave para ordenar
-        key_function = sort_key(order_by)
-        # Determinar si es orden descendente
-        reverse = direction == 'desc'
-        try:
-            simcards = sorted(simcards, key=key_function, reverse=reverse)
-        except KeyError:
-            # Ordenamiento por defecto si la clave no existe
-            simcards = sorted(simcards, key=lambda x: x['Company'].lower(), reverse=reverse)
-        page_size = paginate_by  # Número de elementos por página.
-        paginator = Paginator(simcards, page_size)
-        try:
-            page = paginator.page(page_number)
-        except PageNotAnInteger:
-            page = paginator.page(1)
-        except EmptyPage:
-            page = paginator.page(paginator.num_pages)
-        current_language = translation.get_language()
-
-        formatted_results = []
-        for simcard in page.object_list:
-            installation_date = simcard["activate_date"]
-            month_name = installation_date.strftime("%B")
-            month_name = _(month_name)
-            if installation_date:
-                if current_language == "es":
-                    # Formato en español
-                    formatted_date = installation_date.strftime(
-                        f'%d {_("de")} {month_name} {_("de")} %Y'
-                    )
-                else:
-                    # Formato en inglés u otros idiomas
-                    formatted_date = installation_date.strftime("%B %d, %Y")
-            formatted_results.append(
-                {
-                    "id": simcard["id"],
-                    "company": simcard["Company"] or "",
-                    "serial_number": simcard["serial_number"] or "",
-                    "phone_number": simcard["phone_number"] or "",
-                    "data_plan": simcard["data_plan"] or "",
-                    "is_active": simcard["is_active"] or False,
-                    "activate_date": formatted_date,
-                }
-            )
 
-        response_data = {
-            "results": formatted_results,
-            "page": {
-                "has_next": page.has_next(),
-                "has_previous": page.has_previous(),
-                "number": page.number,
-                "num_pages": paginator.num_pages,
-                "start_index": page.start_index(),
-                "end_index": page.end_index(),
-                "total_items": paginator.count,
-            },
-            "query_string": request.GET.urlencode(),
+    def get_queryset(self, request):
+        vehicles = Vehicle.objects.filter(company_filter(request.user), visible=True)
+        assigned = assigned_vehicles(request.user)
+        if assigned is not None:
+            vehicles = vehicles.filter(pk__in=assigned.values("pk"))
+        return vehicles.select_related("company")
+
+    def format_instance(self, vehicle):
+        return {
+            "id": vehicle.id,
+            "device": vehicle.device_id,
+            "company": vehicle.company.company_name if vehicle.company else "",
+            "license": vehicle.license or "",
+            "vehicle_type": vehicle.vehicle_type or "",
+            "n_interno": vehicle.n_interno or "",
+            "is_active": vehicle.is_active,
+            "icon": str(vehicle.icon or ""),
+            "installation_date": format_long_date(vehicle.installation_date),
         }
 
-        return JsonResponse(response_data, safe=False)
+    def format_row(self, vehicle):
+        return {
+            "id": vehicle["id"],
+            "device": vehicle["device"],
+            "company": vehicle["company"] or "",
+            "license": vehicle["license"] or "",
+            "vehicle_type": vehicle["vehicle_type"] or "",
+            "n_interno": vehicle["n_interno"] or "",
+            "is_active": vehicle["is_active"] or False,
+            "icon": vehicle["icon"] or "",
+            "installation_date": format_long_date(vehicle["installation_date"]),
+        }
 
 
 @method_decorator(csrf_exempt, name="dispatch")
-class SearchDataPlan(View):
-    def get(self, request):
-        company = request.user.company_id
-        user_id = request.user.id
-        session_filters = request.session.get(f'filters_sorted_dataplan_{user_id}', {})
-        search_query = request.GET.get("query", None)
-        page_number = request.GET.get('page', session_filters.get('page', [1]))[0]
-
-        if not company or not user_id:
-            return JsonResponse({"error": "Faltan parámetros"}, status=400)
-        paginate_by = request.POST.get(
-            "paginate_by", None
-        )  # Obtener paginate_by de los parámetros GET
-        if paginate_by is None:
-            paginate_by = session_filters.get("paginate_by", 15)
-        # Convertir a entero si es una lista
-        try:
-            paginate_by = int(
-                paginate_by[0]
-            )  # Convertir el primer elemento de la lista a entero
-        except (TypeError, ValueError):
-            paginate_by = int(paginate_by) if paginate_by else 15
-        dataplans = fetch_all_dataplan(request.user.company, request.user, search_query)
-        order_by = session_filters.get('order_by', [None])[0]
-        direction = session_filters.get('direction', [None])[0]
-        # Obtener la función de clave para ordenar
-        key_function = sort_key(order_by)
-        # Determinar si es orden descendente
-        reverse = direction == 'desc'
-        try:
-            dataplans = sorted(dataplans, key=key_function, reverse=reverse)
-        except KeyError:
-            # Ordenamiento por defecto si la clave no existe
-            dataplans = sorted(dataplans, key=lambda x: x['Company'].lower(), reverse=reverse)
-        page_size = paginate_by  # Número de elementos por página.
-        paginator = Paginator(dataplans, page_size)
-        try:
-            page = paginator.page(page_number)
-        except PageNotAnInteger:
-            page = paginator.page(1)
-        except EmptyPage:
-            page = paginator.page(paginator.num_pages)
-
-        formatted_results = []
-        for dataplan in page.object_list:
-            formatted_results.append(
-                {
-                    "id": dataplan["id"],
-                    "company": dataplan["Company"] or "",
-                    "DataPlanName": dataplan["DataPlanName"] or "",
-                    "operator": dataplan["Operator"] or "",
-                    "coin": dataplan["Coin"] or "",
-                    "price": dataplan["price"] or "",
-                }
-            )
+class SearchDevices(ProcedureListView):
+    procedure = "ListDeviceByCompany"
+    session_name = "device"
+    cache_entities = ("device", "simcard")
+    keyset_fields = {"imei": "imei", "serial_number": "serial_number"}
+    keyset_search_fields = ("imei", "serial_number", "simcard__phone_number")
+
+    def get_queryset(self, request):
+        return Device.objects.filter(company_filter(request.user), visible=True).select_related(
+            "company", "simcard", "familymodel__manufacture", "familymodel__model"
+        )
 
-        response_data = {
-            "results": formatted_results,
-            "page": {
-                "has_next": page.has_next(),
-                "has_previous": page.has_previous(),
-                "number": page.number,
-                "num_pages": paginator.num_pages,
-                "start_index": page.start_index(),
-                "end_index": page.end_index(),
-                "total_items": paginator.count,
-            },
-            "query_string": request.GET.urlencode(),
+    def format_instance(self, device):
+        return {
+            "pk": device.pk,
+            "imei": device.imei,
+            "company": device.company.company_name if device.company else "",
+            "ip": device.ip or "",
+            "serial_number": device.serial_number or "",
+            "simcard": device.simcard.phone_number if device.simcard else "",
+            "simcard_visible": device.simcard.visible if device.simcard else False,
+            "is_active": device.is_active,
+            "familymodel": str(device.familymodel) if device.familymodel else "",
+            "create_date": format_long_date(device.create_date),
         }
 
-        return JsonResponse(response_data, safe=False)
+    def format_row(self, device):
+        return {
+            "pk": device["pk"],
+            "imei": device["imei"],
+            "company": device["company"] or "",
+            "ip": device["ip"] or "",
+            "serial_number": device["serial_number"] or "",
+            "simcard": device["simcard"] or "",
+            "simcard_visible": device["simcard_visible"] or False,
+            "is_active": device["is_active"] or False,
+            "familymodel": device["familymodel"] or "",
+            "create_date": format_long_date(device["create_date"]),
+        }
 
 
 @method_decorator(csrf_exempt, name="dispatch")
-class SearchSendCommand(View):
-    def format_date(self, date_obj):
-        if isinstance(date_obj, datetime):
-            return date_obj.strftime("%d/%m/%Y %H:%M:%S")
-        return ""
-
-    def get(self, request):
-        company = request.user.company_id
-        user_id = request.user.id
-        session_filters = request.session.get(f'filters_sorted_sendcommands_{user_id}', {})
-        search_query = request.GET.get('query', None)
-        page_number = request.GET.get('page', session_filters.get('page', [1]))[0]
-        if not company or not user_id:
-            return JsonResponse({"error": "Faltan parámetros"}, status=400)
-        paginate_by = request.POST.get('paginate_by', None)  # Obtener paginate_by de los parámetros POST
-        if paginate_by is None:
-            paginate_by = session_filters.get('paginate_by', 20)
-        # Convertir a entero si es una lista
-        try:
-            paginate_by = int(
-                paginate_by[0]
-            )  # Convertir el primer elemento de la lista a entero
-        except (TypeError, ValueError):
-            paginate_by = int(paginate_by) if paginate_by else 20
-        send_commands = fetch_all_sending_commands(company, user_id, search_query)
-        order_by = session_filters.get('order_by', [None])[0]
-        direction = session_filters.get('direction', [None])[0]
-        # Determinar si es orden descendente
-        reverse = direction == 'desc'
-        try:
-            send_commands = sorted(send_commands, key=sort_key_commands_datetime(order_by), reverse=reverse)
-        except KeyError:
-            # Ordenamiento por defecto si la clave no existe
-            send_commands = sorted(send_commands, key=lambda x: x['id'].lower(), reverse=reverse)
-        page_size = paginate_by  # Número de elementos por página.
-        paginator = Paginator(send_commands, page_size)
-        try:
-            page = paginator.page(page_number)
-        except PageNotAnInteger:
-            page = paginator.page(1)
-        except EmptyPage:
-            page = paginator.page(paginator.num_pages)
-
-        formatted_results = []
-        for send_command in page.object_list:
-            formatted_results.append(
-                {
-                    "id": send_command["id"],
-                    "command": send_command["command"] or "",
-                    "codigo": send_command["codigo"] or "",
-                    "model": send_command["familymodel_name"] or "",
-                    "license": send_command["license"] or "",
-                    "status": send_command["status"] or False,
-                    "shipping_date": send_command['shipping_date'].strftime('%Y-%m-%d %H:%M:%S') or "",
-                    "answer_date": send_command["answer_date"].strftime(
-                        "%Y-%m-%d %H:%M:%S"
-                    )
-                    or "",
-                }
-            )
-
-        response_data = {
-            "results": formatted_results,
-            "page": {
-                "has_next": page.has_next(),
-                "has_previous": page.has_previous(),
-                "number": page.number,
-                "num_pages": paginator.num_pages,
-                "start_index": page.start_index(),
-                "end_index": page.end_index(),
-                "total_items": paginator.count,
-            },
-            "query_string": request.GET.urlencode(),
+class SearchSimcards(ProcedureListView):
+    procedure = "ListSimcardsByCompany"
+    session_name = "simcard"
+    cache_entities = ("simcard", "dataplan")
+
+    def format_row(self, simcard):
+        return {
+            "id": simcard["id"],
+            "company": simcard["Company"] or "",
+            "serial_number": simcard["serial_number"] or "",
+            "phone_number": simcard["phone_number"] or "",
+            "data_plan": simcard["data_plan"] or "",
+            "is_active": simcard["is_active"] or False,
+            "activate_date": format_long_date(simcard["activate_date"]),
         }
-        return JsonResponse(response_data, safe=False)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
-class SearchResponseCommand(View):
-    def format_date(self, date_obj):
-        if isinstance(date_obj, datetime):
-            return date_obj.strftime("%d/%m/%Y %H:%M:%S")
-        return ""
-
-    def get(self, request):
-        company = request.user.company_id
-        user_id = request.user.id
-        session_filters = request.session.get(f'filters_sorted_responsecommands_{user_id}', {})
-        search_query = request.GET.get('query', None)
-        page_number = request.GET.get('page', session_filters.get('page', [1]))[0]
-
-        if not company or not user_id:
-            return JsonResponse({"error": "Faltan parámetros"}, status=400)
-        paginate_by = request.POST.get('paginate_by', None)  # Obtener paginate_by de los parámetros GET
-        if paginate_by is None:
-            session_filters = request.session.get(
-                f"filters_sorted_responsecommands_{user_id}", {}
-            )
-            paginate_by = session_filters.get("paginate_by", 20)
-        # Convertir a entero si es una lista
-        try:
-            paginate_by = int(
-                paginate_by[0]
-            )  # Convertir el primer elemento de la lista a entero
-        except (TypeError, ValueError):
-            paginate_by = int(paginate_by) if paginate_by else 20
-        response_commands = fetch_all_response_commands(company, user_id, search_query)
-        order_by = session_filters.get('order_by', [None])[0]
-        direction = session_filters.get('direction', [None])[0]
-        page_size = paginate_by # Número de elementos por página.
-        # Obtener la función de clave para ordenar
-        key_function = sort_key(order_by)
-        # Determinar si es orden descendente
-        reverse = direction == 'desc'
-        try:
-            response_commands = sorted(response_commands, key=key_function, reverse=reverse)
-        except KeyError:
-            # Ordenamiento por defecto si la clave no existe
-            response_commands = sorted(response_commands, key=lambda x: x['id'].lower(), reverse=reverse)
-        paginator = Paginator(response_commands, page_size)
-        try:
-            page = paginator.page(page_number)
-        except PageNotAnInteger:
-            page = paginator.page(1)
-        except EmptyPage:
-            page = paginator.page(paginator.num_pages)
-
-        formatted_results = []
-        for response_command in page.object_list:
-            formatted_results.append(
-                {
-                    "id": response_command["id"],
-                    "response": response_command["response"] or "",
-                    "ip": response_command["ip"] or "",
-                    "license": response_command["license"] or "",
-                    "answer_date": response_command["answer_date"].strftime(
-                        "%Y-%m-%d %H:%M:%S"
-                    )
-                    or "",
-                }
-            )
-
-        response_data = {
-            "results": formatted_results,
-            "page": {
-                "has_next": page.has_next(),
-                "has_previous": page.has_previous(),
-                "number": page.number,
-                "num_pages": paginator.num_pages,
-                "start_index": page.start_index(),
-                "end_index": page.end_index(),
-                "total_items": paginator.count,
-            },
-            "query_string": request.GET.urlencode(),
+class SearchDataPlan(ProcedureListView):
+    procedure = "ListDataplanByCompany"
+    session_name = "dataplan"
+    cache_entities = ("dataplan",)
+
+    def format_row(self, dataplan):
+        return {
+            "id": dataplan["id"],
+            "company": dataplan["Company"] or "",
+            "DataPlanName": dataplan["DataPlanName"] or "",
+            "operator": dataplan["Operator"] or "",
+            "coin": dataplan["Coin"] or "",
+            "price": dataplan["price"] or "",
         }
 
-        return JsonResponse(response_data, safe=False)
 
+def format_datetime(date_obj):
+    if isinstance(date_obj, datetime):
+        return date_obj.strftime("%Y-%m-%d %H:%M:%S")
+    return ""
 
-@method_decorator(csrf_exempt, name="dispatch")
-class SearchGeofence(View):
-    def format_date(self, date_obj):
-        if isinstance(date_obj, datetime):
-            return date_obj.strftime("%d/%m/%Y %H:%M:%S")
-        return ""
-
-    def get(self, request):
-        company = request.user.company_id
-        user_id = request.user.id
-        session_filters = request.session.get(f'filters_sorted_geofence_{user_id}', {})
-        search_query = request.GET.get('query', None)
-        page_number = request.GET.get('page', session_filters.get('page', [1]))[0]
-
-        if not company or not user_id:
-            return JsonResponse({"error": "Faltan parámetros"}, status=400)
-        paginate_by = request.POST.get('paginate_by', None)  # Obtener paginate_by de los parámetros POST
-        if paginate_by is None:
-            paginate_by = session_filters.get('paginate_by', 20)
-        # Convertir a entero si es una lista
-        try:
-            paginate_by = int(
-                paginate_by[0]
-            )  # Convertir el primer elemento de la lista a entero
-        except (TypeError, ValueError):
-            paginate_by = int(paginate_by) if paginate_by else 20
-        geofences = fetch_all_geozones(company, user_id, search_query)
-        order_by = session_filters.get('order_by', [None])[0]
-        direction = session_filters.get('direction', [None])[0]
-        page_size = paginate_by # Número de elementos por página.
-        # Obtener la función de clave para ordenar
-        key_function = sort_key(order_by)
-        # Determinar si es orden descendente
-        reverse = direction == 'desc'
-        try:
-            geofences = sorted(geofences, key=key_function, reverse=reverse)
-        except KeyError:
-            # Ordenamiento por defecto si la clave no existe
-            geofences = sorted(geofences, key=lambda x: x['company'].lower(), reverse=reverse)
-        page_size = paginate_by  # Número de elementos por página.
-        paginator = Paginator(geofences, page_size)
-        try:
-            page = paginator.page(page_number)
-        except PageNotAnInteger:
-            page = paginator.page(1)
-        except EmptyPage:
-            page = paginator.page(paginator.num_pages)
-
-        formatted_results = []
-        for geofence in page.object_list:
-            formatted_results.append(
-                {
-                    "id": geofence["id"],
-                    "company": geofence["company"] or "",
-                    "name": geofence["name"] or "",
-                    "type_event": geofence["type_event"] or "",
-                    "shape_type": geofence["shape_type"] or "",
-                    "latitude": geofence["latitude"] or "",
-                    "longitude": geofence["longitude"] or "",
-                }
-            )
 
-        response_data = {
-            "results": formatted_results,
-            "page": {
-                "has_next": page.has_next(),
-                "has_previous": page.has_previous(),
-                "number": page.number,
-                "num_pages": paginator.num_pages,
-                "start_index": page.start_index(),
-                "end_index": page.end_index(),
-                "total_items": paginator.count,
-            },
-            "query_string": request.GET.urlencode(),
+@method_decorator(csrf_exempt, name="dispatch")
+class SearchSendCommand(ProcedureListView):
+    procedure = "ListSendingCommandsdByCompanyAndUser"
+    fallback_procedure = "ListSendingCommandsdByCompany"
+    session_name = "sendcommands"
+    cache_entities = ("command", "device", "vehicle", "user")
+    paginate_by = 20
+    # `shipping_date` se asigna al crear el registro, así que sigue el orden de `id`
+    keyset_fields = {"id": "pk", "shipping_date": "pk"}
+    keyset_direction = "desc"
+    keyset_search_fields = ("command__name", "command__command", "device__imei")
+
+    key_function = staticmethod(sort_key_commands_datetime)
+
+    def get_queryset(self, request):
+        licenses = Vehicle.objects.filter(device_id=OuterRef("device_id")).values("license")
+        commands = Sending_Commands.objects.filter(company_filter(request.user))
+        assigned = assigned_vehicles(request.user)
+        if assigned is not None:
+            commands = commands.filter(device_id__in=assigned.values("device_id"))
+        return commands.select_related(
+            "command__model__manufacture", "command__model__model"
+        ).annotate(license=Subquery(licenses[:1]))
+
+    def format_instance(self, send_command):
+        command = send_command.command
+        return {
+            "id": send_command.id,
+            "command": (command.name or "") if command else "",
+            "codigo": (command.command or "") if command else "",
+            "model": str(command.model) if command and command.model else "",
+            "license": send_command.license or "",
+            "status": send_command.status,
+            "shipping_date": format_datetime(send_command.shipping_date),
+            "answer_date": format_datetime(send_command.answer_date),
         }
 
-        return JsonResponse(response_data, safe=False)
+    def format_row(self, send_command):
+        return {
+            "id": send_command["id"],
+            "command": send_command["command"] or "",
+            "codigo": send_command["codigo"] or "",
+            "model": send_command["familymodel_name"] or "",
+            "license": send_command["license"] or "",
+            "status": send_command["status"] or False,
+            "shipping_date": format_datetime(send_command["shipping_date"]),
+            "answer_date": format_datetime(send_command["answer_date"]),
+        }
 
 
 @method_decorator(csrf_exempt, name="dispatch")
-class SearchGroupAssets(View):
-    def get(self, request):
-        company = request.user.company_id
-        user_id = request.user.id
-        session_filters = request.session.get(f'filters_sorted_vehiclegroup_{user_id}', {})
-        search_query = request.GET.get('query', None)
-        page_number = request.GET.get('page', session_filters.get('page', [1]))[0]
-
-        if not company or not user_id:
-            return JsonResponse({"error": "Faltan parámetros"}, status=400)
-        paginate_by = request.POST.get(
-            "paginate_by", None
-        )  # Obtener paginate_by de los parámetros GET
-        if paginate_by is None:
-            session_filters = request.session.get(
-                f"filters_sorted_vehiclegroup_{user_id}", {}
-            )
-            paginate_by = session_filters.get("paginate_by", 15)
-        # Convertir a entero si es una lista
-        try:
-            paginate_by = int(
-                paginate_by[0]
-            )  # Convertir el primer elemento de la lista a entero
-        except (TypeError, ValueError):
-            paginate_by = int(paginate_by) if paginate_by else 15
-        groupAssets = ListVehicleGroupsByCompany(company, search_query)
-        order_by = session_filters.get('order_by', [None])[0]
-        direction = session_filters.get('direction', [None])[0]
-        key_function = sort_key(order_by)
-        # Determinar si es orden descendente
-        reverse = direction == 'desc'
-        try:
-            groupAssets = sorted(groupAssets, key=key_function, reverse=reverse)
-        except KeyError:
-            # Ordenamiento por defecto si la clave no existe
-            groupAssets = sorted(groupAssets, key=lambda x: x['name'].lower(), reverse=reverse)
-        page_size = paginate_by  # Número de elementos por página.
-        paginator = Paginator(groupAssets, page_size)
-        try:
-            page = paginator.page(page_number)
-        except PageNotAnInteger:
-            page = paginator.page(1)
-        except EmptyPage:
-            page = paginator.page(paginator.num_pages)
-
-        formatted_results = []
-        for groupAsset in page.object_list:
-            formatted_results.append(
-                {
-                    "id": groupAsset["id"],
-                    "name": groupAsset["name"] or "",
-                    "VehicleCount": groupAsset["VehicleCount"] or 0,
-                }
-            )
+class SearchResponseCommand(ProcedureListView):
+    procedure = "ListResponseCommandsdByCompanyAndUser"
+    fallback_procedure = "ListResponseCommandsdByCompany"
+    session_name = "responsecommands"
+    cache_entities = ("command", "device", "vehicle", "user")
+    paginate_by = 20
+
+    def format_row(self, response_command):
+        return {
+            "id": response_command["id"],
+            "response": response_command["response"] or "",
+            "ip": response_command["ip"] or "",
+            "license": response_command["license"] or "",
+            "answer_date": format_datetime(response_command["answer_date"]),
+        }
+
 
-        response_data = {
-            "results": formatted_results,
-            "page": {
-                "has_next": page.has_next(),
-                "has_previous": page.has_previous(),
-                "number": page.number,
-                "num_pages": paginator.num_pages,
-                "start_index": page.start_index(),
-                "end_index": page.end_index(),
-                "total_items": paginator.count,
-            },
-            "query_string": request.GET.urlencode(),
+@method_decorator(csrf_exempt, name="dispatch")
+class SearchGeofence(ProcedureListView):
+    procedure = "ListGeoZonesByCompany"
+    session_name = "geofence"
+    cache_entities = ("geozone",)
+    paginate_by = 20
+
+    def format_row(self, geofence):
+        return {
+            "id": geofence["id"],
+            "company": geofence["company"] or "",
+            "name": geofence["name"] or "",
+            "type_event": geofence["type_event"] or "",
+            "shape_type": geofence["shape_type"] or "",
+            "latitude": geofence["latitude"] or "",
+            "longitude": geofence["longitude"] or "",
         }
 
-        return JsonResponse(response_data, safe=False)
 
+@method_decorator(csrf_exempt, name="dispatch")
+class SearchGroupAssets(ProcedureListView):
+    procedure = "ListVehicleGroupsByCompany"
+    session_name = "vehiclegroup"
+    cache_entities = ("vehicle_group", "vehicle")
+
+    def get_params(self, request):
+        return {
+            "company_id": request.user.company_id,
+            "SearchQuery": request.GET.get("query", None),
+        }
 
-def extract_number(text):
-    match = re.search(r"\d+", text)
-    return int(match.group()) if match else float("inf")
+    def format_row(self, group_asset):
+        return {
+            "id": group_asset["id"],
+            "name": group_asset["name"] or "",
+            "VehicleCount": group_asset["VehicleCount"] or 0,
+        }
 
 
 def extract_number_tp(s):
@@ -1041,316 +638,273 @@ def extract_number_tp(s):
     match = re.search(r"\d+", s)
     return int(match.group()) if match else 0
 
-def sort_key(order_by):
-    """
-    Función clave para ordenar campos de las listas main.
 
-    Args:
-        order_by (str): El campo por el que ordenar.
+def format_export_date(value):
+    return value.strftime("%Y-%m-%d %H:%M:%S") if isinstance(value, datetime) else ""
 
-    Returns:
-        callable: Función para usar como clave en la ordenación.
-    """
-    def key(x):
-        value = x.get(order_by)
-        if value is None or value == '':
-            return (4, '')  # Prioridad 4 para valores nulos o vacíos
-        if isinstance(value, str):
-            # Verificar si comienza con números, letras o caracteres especiales
-            if value[0].isdigit():
-                return (1, extract_number(value))  # Prioridad 1 para números
-            elif value[0].isalpha():
-                return (2, value.lower())  # Prioridad 2 para letras
-            else:
-                return (3, value.lower())  # Prioridad 3 para caracteres especiales
-        return value
-    return key
-
-def sort_key_commands_datetime(order_by):
-        def extract_number(value):
-            # Implementa tu lógica para extraer números si es necesario
-            return int(''.join(filter(str.isdigit, value)))
-        def date_key(value):
-            # Manejo específico para fechas nulas o vacías
-            if value is None:
-                return (4, datetime.max)  # Prioridad 4, y asignamos la fecha máxima para que quede al final
-            return (1, value)  # Prioridad 1 para fechas válidas
-
-        def key_func(x):
-            value = x.get(order_by)
-            if isinstance(value, datetime):
-                # Si el campo es una fecha
-                return date_key(value)
-            elif value is None or value == '':
-                # Valores nulos o vacíos
-                return (4, '')  # Prioridad 4 para valores nulos o vacíos
-            if isinstance(value, str):
-                # Verificar si comienza con números, letras o caracteres especiales
-                if value[0].isdigit():
-                    return (2, extract_number(value))  # Prioridad 2 para números
-                elif value[0].isalpha():
-                    return (3, value.lower())  # Prioridad 3 para letras
-                else:
-                    return (4, value.lower())  # Prioridad 4 para caracteres especiales
-            return (5, value)  # Prioridad 5 para otros tipos de valores
-        return key_func
 
 @method_decorator(csrf_exempt, name='dispatch')
-class ExportDataSendCommands(View):
-    def format_date(self, date_obj):
-        if isinstance(date_obj, datetime):
-            return date_obj.strftime('%d/%m/%Y %H:%M:%S')
-        return ""
-    def get(self, request):
-        company = request.user.company_id
-        user_id = request.user.id
-        search_query = request.GET.get('query', None)
-        send_commands = fetch_all_sending_commands(company, user_id, search_query)
-        formatted_results = []
-        # Encabezados traducidos
-        headers = [
-            _("command"),
-            _("code"),
-            _("model"),
-            _("License"),
-            _("Status"),
-            _("shipping_date"),
-            _("answer_date")
+class ExportDataSendCommands(ExportView):
+    procedure = "ListSendingCommandsdByCompanyAndUser"
+    fallback_procedure = "ListSendingCommandsdByCompany"
+    filename = "commands"
+
+    def get_params(self, request):
+        return {
+            "CompanyId": request.user.company_id,
+            "UserId": request.user.id,
+            "SearchQuery": request.GET.get("query", None),
+        }
+
+    def get_columns(self):
+        return [
+            (_("command"), "command"),
+            (_("code"), "codigo"),
+            (_("model"), "model"),
+            (_("License"), "license"),
+            (_("Status"), "status"),
+            (_("shipping_date"), "shipping_date"),
+            (_("answer_date"), "answer_date"),
         ]
 
-        for send_command in send_commands:
-            formatted_results.append({
-                "command": send_command['command'] or "",
-                "codigo": send_command['codigo'] or "",
-                "model": send_command['familymodel_name'] or "",
-                "license": send_command['license'] or "",
-                "status": send_command['status'] or False,
-                "shipping_date": send_command['shipping_date'].strftime('%Y-%m-%d %H:%M:%S') or "",
-                "answer_date": send_command['answer_date'].strftime('%Y-%m-%d %H:%M:%S') or "",
-            })
-        response_data = {
-            'headers': headers,
-            'data': formatted_results
+    def format_row(self, send_command):
+        return {
+            "command": send_command['command'] or "",
+            "codigo": send_command['codigo'] or "",
+            "model": send_command['familymodel_name'] or "",
+            "license": send_command['license'] or "",
+            "status": send_command['status'] or False,
+            "shipping_date": format_export_date(send_command['shipping_date']),
+            "answer_date": format_export_date(send_command['answer_date']),
         }
-        return JsonResponse(response_data, safe=False)
+
 
 @method_decorator(csrf_exempt, name='dispatch')
-class ExportDataResponseCommands(View):
-    def format_date(self, date_obj):
-        if isinstance(date_obj, datetime):
-            return date_obj.strftime('%d/%m/%Y %H:%M:%S')
-        return ""
-    def get(self, request):
-        company = request.user.company_id
-        user_id = request.user.id
-        search_query = request.GET.get('query', None)
-        response_commands = fetch_all_response_commands(company, user_id, search_query)
-        formatted_results = []
-        # Encabezados traducidos
-        headers = [
-            _("license"),
-            _("ip"),
-            _("response"),
-            _("answer_date")
+class ExportDataResponseCommands(ExportView):
+    procedure = "ListResponseCommandsdByCompanyAndUser"
+    fallback_procedure = "ListResponseCommandsdByCompany"
+    filename = "response_commands"
+
+    def get_params(self, request):
+        return {
+            "CompanyId": request.user.company_id,
+            "UserId": request.user.id,
+            "SearchQuery": request.GET.get("query", None),
+        }
+
+    def get_columns(self):
+        return [
+            (_("license"), "license"),
+            (_("ip"), "ip"),
+            (_("response"), "response"),
+            (_("answer_date"), "answer_date"),
         ]
 
-        for response_command in response_commands:
-            formatted_results.append({
-                "ip": response_command['ip'] or "",
-                "response": response_command['response'] or "",
-                "license": response_command['license'] or "",
-                "answer_date": response_command['answer_date'].strftime('%Y-%m-%d %H:%M:%S') or "",
-            })
-        response_data = {
-            'headers': headers,
-            'data': formatted_results
+    def format_row(self, response_command):
+        return {
+            "ip": response_command['ip'] or "",
+            "response": response_command['response'] or "",
+            "license": response_command['license'] or "",
+            "answer_date": format_export_date(response_command['answer_date']),
         }
-        return JsonResponse(response_data, safe=False)
-    
+
+
 @method_decorator(csrf_exempt, name='dispatch')
-class ExportDataGeofence(View):
-    def get(self, request):
-        company = request.user.company_id
-        user_id = request.user.id
-        search_query = request.GET.get('query', None)
-        geofences = fetch_all_geozones(company, user_id, search_query)
-        formatted_results = []
-        # Encabezados traducidos
-        headers = [
-            _("Company"),
-            _("Name geozone"),
-            _("Event"),
-            _("Type the geozone"),
-            _("Latitude"),
-            _("Longitude")
+class ExportDataGeofence(ExportView):
+    procedure = "ListGeoZonesByCompany"
+    filename = "geofences"
+
+    def get_params(self, request):
+        return {
+            "CompanyId": request.user.company_id,
+            "UserId": request.user.id,
+            "SearchQuery": request.GET.get("query", None),
+        }
+
+    def get_columns(self):
+        return [
+            (_("Company"), "company"),
+            (_("Name geozone"), "name"),
+            (_("Event"), "type_event"),
+            (_("Type the geozone"), "shape_type"),
+            (_("Latitude"), "latitude"),
+            (_("Longitude"), "longitude"),
         ]
 
-        for geofence in geofences:
-            formatted_results.append({
-                "company": geofence['company'] or "",
-                "name": geofence['name'] or "",
-                "type_event": geofence['type_event'] or "",
-                "shape_type": geofence['shape_type'] or "",
-                "latitude": geofence['latitude'] or "",
-                "longitude": geofence['longitude'] or "",
-            })
-        response_data = {
-            'headers': headers,
-            'data': formatted_results
+    def format_row(self, geofence):
+        return {
+            "company": geofence['company'] or "",
+            "name": geofence['name'] or "",
+            "type_event": geofence['type_event'] or "",
+            "shape_type": geofence['shape_type'] or "",
+            "latitude": geofence['latitude'] or "",
+            "longitude": geofence['longitude'] or "",
         }
-        return JsonResponse(response_data, safe=False)
-    
+
+
 @method_decorator(csrf_exempt, name='dispatch')
-class ExportDataPlans(View):
-    def get(self, request):
-        search_query = request.GET.get('query', None)
-        dataplans = fetch_all_dataplan(request.user.company, request.user, search_query)
-        formatted_results = []
-        # Encabezados traducidos
-        headers = [
-            _("Company"),
-            _("Name"),
-            _("Operator"),
-            _("Coin"),
-            _("Price")
+class ExportDataPlans(ExportView):
+    procedure = "ListDataplanByCompany"
+    filename = "dataplans"
+
+    def get_params(self, request):
+        return {
+            "CompanyId": request.user.company_id,
+            "UserId": request.user.id,
+            "SearchQuery": request.GET.get("query", None),
+        }
+
+    def get_columns(self):
+        return [
+            (_("Company"), "company"),
+            (_("Name"), "DataPlanName"),
+            (_("Operator"), "operator"),
+            (_("Coin"), "coin"),
+            (_("Price"), "price"),
         ]
 
-        for dataplan in dataplans:
-            formatted_results.append({
-                "company": dataplan["Company"] or "",
-                "DataPlanName": dataplan["DataPlanName"] or "",
-                "operator": dataplan["Operator"] or "",
-                "coin": dataplan["Coin"] or "",
-                "price": dataplan["price"] or "",
-            })
-        response_data = {
-            'headers': headers,
-            'data': formatted_results
+    def format_row(self, dataplan):
+        return {
+            "company": dataplan["Company"] or "",
+            "DataPlanName": dataplan["DataPlanName"] or "",
+            "operator": dataplan["Operator"] or "",
+            "coin": dataplan["Coin"] or "",
+            "price": dataplan["price"] or "",
         }
-        return JsonResponse(response_data, safe=False)
-    
+
+
 @method_decorator(csrf_exempt, name='dispatch')
-class ExportDataSimcards(View):
-    def get(self, request):
-        search_query = request.GET.get('query', None)
-        simcards = fetch_all_simcards(request.user.company, request.user, search_query)
-        formatted_results = []
-        # Encabezados traducidos
-        headers = [
-            _("Company"),
-            _("Phone number"),
-            _("Serial number"),
-            _("Data plan"),
-            _("Activate date"),
-            _("Status")
+class ExportDataSimcards(ExportView):
+    procedure = "ListSimcardsByCompany"
+    filename = "simcards"
+
+    def get_params(self, request):
+        return {
+            "CompanyId": request.user.company_id,
+            "UserId": request.user.id,
+            "SearchQuery": request.GET.get("query", None),
+        }
+
+    def get_columns(self):
+        return [
+            (_("Company"), "company"),
+            (_("Phone number"), "phone_number"),
+            (_("Serial number"), "serial_number"),
+            (_("Data plan"), "data_plan"),
+            (_("Activate date"), "activate_date"),
+            (_("Status"), "is_active"),
         ]
 
-        for simcard in simcards:
-            formatted_results.append({
-                "company": simcard["Company"] or "",
-                "serial_number": simcard["serial_number"] or "",
-                "phone_number": simcard["phone_number"] or "",
-                "data_plan": simcard["data_plan"] or "",
-                "is_active": simcard["is_active"] or False,
-                "activate_date": simcard["activate_date"],
-            })
-        response_data = {
-            'headers': headers,
-            'data': formatted_results
+    def format_row(self, simcard):
+        return {
+            "company": simcard["Company"] or "",
+            "serial_number": simcard["serial_number"] or "",
+            "phone_number": simcard["phone_number"] or "",
+            "data_plan": simcard["data_plan"] or "",
+            "is_active": simcard["is_active"] or False,
+            "activate_date": simcard["activate_date"],
         }
-        return JsonResponse(response_data, safe=False)
-    
+
+
 @method_decorator(csrf_exempt, name='dispatch')
-class ExportDataDevices(View):
-    def get(self, request):
-        search_query = request.GET.get('query', None)
-        devices = ListDeviceByCompany(request.user.company_id, request.user.id, search_query)
-        formatted_results = []
-        # Encabezados traducidos
-        headers = [
-            _("Company"),
-            _("IMEI"),
-            _("Serial Number"),
-            _("Device Type"),
-            _("Simcard"),
-            _("IP"),
-            _("Create Date"),
-            _("Status")
+class ExportDataDevices(ExportView):
+    procedure = "ListDeviceByCompany"
+    filename = "devices"
+
+    def get_params(self, request):
+        return {
+            "CompanyId": request.user.company_id,
+            "UserId": request.user.id,
+            "SearchQuery": request.GET.get("query", None),
+        }
+
+    def get_columns(self):
+        return [
+            (_("Company"), "company"),
+            (_("IMEI"), "imei"),
+            (_("Serial Number"), "serial_number"),
+            (_("Device Type"), "familymodel"),
+            (_("Simcard"), "simcard"),
+            (_("IP"), "ip"),
+            (_("Create Date"), "create_date"),
+            (_("Status"), "is_active"),
         ]
 
-        for device in devices:
-            formatted_results.append({
-                "imei": device["imei"],
-                "company": device["company"] or "",
-                "ip": device["ip"] or "",
-                "serial_number": device["serial_number"] or "",
-                "simcard": device["simcard"] or "",
-                "simcard_visible": device["simcard_visible"] or False,
-                "is_active": device["is_active"] or False,
-                "familymodel": device["familymodel"] or "",
-                "create_date": device["create_date"],
-            })
-        response_data = {
-            'headers': headers,
-            'data': formatted_results
+    def format_row(self, device):
+        return {
+            "imei": device["imei"],
+            "company": device["company"] or "",
+            "ip": device["ip"] or "",
+            "serial_number": device["serial_number"] or "",
+            "simcard": device["simcard"] or "",
+            "simcard_visible": device["simcard_visible"] or False,
+            "is_active": device["is_active"] or False,
+            "familymodel": device["familymodel"] or "",
+            "create_date": device["create_date"],
         }
-        return JsonResponse(response_data, safe=False)
-    
+
+
 @method_decorator(csrf_exempt, name='dispatch')
-class ExportDataVehicles(View):
-    def get(self, request):
-        search_query = request.GET.get('query', None)
-        vehicles = ListVehicleByUserAndCompany(request.user.company_id, request.user.id, search_query)
-        formatted_results = []
-        # Encabezados traducidos
-        headers = [
-            _("Company"),
-            _("Plate"),
-            _("N° Interno"),
-            _("Imei"),
-            _("Asset type"),
-            _("Installation Date"),
-            _("Status")
-        ]
+class ExportDataVehicles(ExportView):
+    procedure = "ListVehicleByUserAndCompany"
+    fallback_procedure = "ListVehicleByCompany"
+    filename = "assets"
+
+    def get_params(self, request):
+        return {
+            "CompanyId": request.user.company_id,
+            "UserId": request.user.id,
+            "SearchQuery": request.GET.get("query", None),
+        }
 
-        for vehicle in vehicles:
-            formatted_results.append({
-                "device": vehicle["device"],
-                "company": vehicle["company"] or "",
-                "license": vehicle["license"] or "",
-                "vehicle_type": vehicle["vehicle_type"] or "",
-                "n_interno": vehicle["n_interno"] or "",
-                "is_active": vehicle["is_active"] or False,
-                "installation_date": vehicle["installation_date"],
-            })
-        response_data = {
-            'headers': headers,
-            'data': formatted_results
+    def get_fallback_params(self, request):
+        return {
+            "CompanyId": request.user.company_id,
+            "SearchQuery": request.GET.get("query", None),
         }
 
-        return JsonResponse(response_data, safe=False)
-    
-@method_decorator(csrf_exempt, name='dispatch')
-class ExportDataAssetsGroups(View):
-    def get(self, request):
-        search_query = request.GET.get('query', None)
-        groupAssets = ListVehicleGroupsByCompany(request.user.company_id, search_query)
-        formatted_results = []
-        # Encabezados traducidos
-        headers = [
-            _("Name Group"),
-            _("Content")
+    def get_columns(self):
+        return [
+            (_("Company"), "company"),
+            (_("Plate"), "license"),
+            (_("N° Interno"), "n_interno"),
+            (_("Imei"), "device"),
+            (_("Asset type"), "vehicle_type"),
+            (_("Installation Date"), "installation_date"),
+            (_("Status"), "is_active"),
         ]
 
-        for groupAsset in groupAssets:
-            formatted_results.append({
-                "name": groupAsset["name"] or "",
-                "VehicleCount": groupAsset["VehicleCount"] or 0,
-            })
-        response_data = {
-            'headers': headers,
-            'data': formatted_results
+    def format_row(self, vehicle):
+        return {
+            "device": vehicle["device"],
+            "company": vehicle["company"] or "",
+            "license": vehicle["license"] or "",
+            "vehicle_type": vehicle["vehicle_type"] or "",
+            "n_interno": vehicle["n_interno"] or "",
+            "is_active": vehicle["is_active"] or False,
+            "installation_date": vehicle["installation_date"],
+        }
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ExportDataAssetsGroups(ExportView):
+    procedure = "ListVehicleGroupsByCompany"
+    filename = "assets_groups"
+
+    def get_params(self, request):
+        return {
+            "company_id": request.user.company_id,
+            "SearchQuery": request.GET.get("query", None),
         }
 
-        return JsonResponse(response_data, safe=False)
+    def get_columns(self):
+        return [
+            (_("Name Group"), "name"),
+            (_("Content"), "VehicleCount"),
+        ]
 
+    def format_row(self, group_asset):
+        return {
+            "name": group_asset["name"] or "",
+            "VehicleCount": group_asset["VehicleCount"] or 0,
+        }
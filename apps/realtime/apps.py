@@ -11,3 +11,7 @@ class RealtimeConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.realtime"
     label = "realtime"
+
+    def ready(self):
+        # Conecta los manejadores de señales decorados con @receiver.
+        from . import signals
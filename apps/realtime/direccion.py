@@ -1,9 +1,10 @@
-import psycopg2
 from django.http import JsonResponse
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.http import require_GET
 
+from apps.checkpoints.postgres import get_geocoder
+
 # Configuración de la base de datos
 database_config = {
     "dbname": "dbpostgis",
@@ -20,23 +21,11 @@ database_config = {
 class ObtenerDireccionView(View):
     def obtener_direccion(self, longitude, latitude):
         try:
-            # Conexión a la base de datos
-            conn = psycopg2.connect(**database_config)
-            cursor = conn.cursor()
-
-            # Consulta a la base de datos
-            # Consulta a la base de datos
-            query = "SELECT public.rev_geocode_azsmart(%s, %s)"
-            cursor.execute(query, (str(longitude), str(latitude)))
-
-            resultado = cursor.fetchone()
-
-            # Cerrar conexión
-            cursor.close()
-            conn.close()
-
-            # Devolver el resultado
-            return resultado[0] if resultado else "Ubicación no encontrada"
+            # Pool de conexiones y caché compartidos por el proceso
+            direccion = get_geocoder("rev_geocode_azsmart", database_config).reverse(
+                latitude, longitude
+            )
+            return direccion or "Ubicación no encontrada"
         except Exception as e:
             return str(e)
 
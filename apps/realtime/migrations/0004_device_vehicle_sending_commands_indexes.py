@@ -0,0 +1,33 @@
+# Generated by Django 4.0.7 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realtime', '0003_brands_assets_brand_en_brands_assets_brand_es_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['company', 'imei'], name='device_company_imei_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['company', 'serial_number'], name='device_company_serial_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['company', 'license', 'id'], name='vehicle_company_license_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['company', 'installation_date', 'id'], name='vehicle_company_install_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sending_commands',
+            index=models.Index(fields=['company', 'id'], name='sendcommand_company_id_idx'),
+        ),
+    ]
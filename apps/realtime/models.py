@@ -202,6 +202,13 @@ class Device(models.Model):
     )
     ip = models.GenericIPAddressField(null=True, blank=True, verbose_name=_("ip"))
 
+    class Meta:
+        # Paginación por cursor de los listados por compañía
+        indexes = [
+            models.Index(fields=["company", "imei"], name="device_company_imei_idx"),
+            models.Index(fields=["company", "serial_number"], name="device_company_serial_idx"),
+        ]
+
     def __str__(self):
         return f"{self.imei}"
 
@@ -369,6 +376,15 @@ class Vehicle(models.Model):
         null=True,
     )
 
+    class Meta:
+        # Paginación por cursor de los listados por compañía
+        indexes = [
+            models.Index(fields=["company", "license", "id"], name="vehicle_company_license_idx"),
+            models.Index(
+                fields=["company", "installation_date", "id"], name="vehicle_company_install_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"{self.license}"
 
@@ -551,6 +567,12 @@ class Sending_Commands(models.Model):
         null=True,
     )
 
+    class Meta:
+        # Paginación por cursor de los comandos enviados (`id` sigue a `shipping_date`)
+        indexes = [
+            models.Index(fields=["company", "id"], name="sendcommand_company_id_idx"),
+        ]
+
     def __str__(self):
         return f"{self.device} --> [ {self.command} ]"
 
@@ -0,0 +1,53 @@
+"""
+Señales de la aplicación: invalidan los listados guardados en la caché `listing` cuando cambia
+un registro (ver `config.resultcache`).
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from config.resultcache import bump_versions_on_commit
+
+from .models import (Command_response, Commands, DataPlan, Device, FamilyModelUEC, Geozones,
+                     MobileOperator, Sending_Commands, SimCard, Vehcile_geozone, Vehicle,
+                     VehicleGroup)
+
+
+@receiver([post_save, post_delete], sender=DataPlan)
+@receiver([post_save, post_delete], sender=MobileOperator)
+def on_dataplan_changed(sender, **kwargs):
+    bump_versions_on_commit("dataplan")
+
+
+@receiver([post_save, post_delete], sender=SimCard)
+def on_simcard_changed(sender, **kwargs):
+    bump_versions_on_commit("simcard")
+
+
+@receiver([post_save, post_delete], sender=Device)
+@receiver([post_save, post_delete], sender=FamilyModelUEC)
+def on_device_changed(sender, **kwargs):
+    bump_versions_on_commit("device")
+
+
+@receiver([post_save, post_delete], sender=Vehicle)
+def on_vehicle_changed(sender, **kwargs):
+    bump_versions_on_commit("vehicle")
+
+
+@receiver([post_save, post_delete], sender=VehicleGroup)
+def on_vehicle_group_changed(sender, **kwargs):
+    bump_versions_on_commit("vehicle_group")
+
+
+@receiver([post_save, post_delete], sender=Commands)
+@receiver([post_save, post_delete], sender=Sending_Commands)
+@receiver([post_save, post_delete], sender=Command_response)
+def on_command_changed(sender, **kwargs):
+    bump_versions_on_commit("command")
+
+
+@receiver([post_save, post_delete], sender=Geozones)
+@receiver([post_save, post_delete], sender=Vehcile_geozone)
+def on_geozone_changed(sender, **kwargs):
+    bump_versions_on_commit("geozone")
@@ -1,6 +1,10 @@
 from django.db import DatabaseError, connection
 
+from config.resultcache import cached_procedure
+from config.resultset import ResultSet
 
+
+@cached_procedure("ListDataplanByCompany", "dataplan")
 def fetch_all_dataplan(company, user, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -15,8 +19,7 @@ def fetch_all_dataplan(company, user, search_query=None):
             )
 
             rows = cursor.fetchall()
-            columns = [col[0] for col in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return ResultSet.from_cursor(cursor, rows)
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
         print("Error de base de datos:", e)
@@ -27,6 +30,7 @@ def fetch_all_dataplan(company, user, search_query=None):
         return []
 
 
+@cached_procedure("ListSimcardsByCompany", "simcard", "dataplan")
 def fetch_all_simcards(company, user, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -41,8 +45,7 @@ def fetch_all_simcards(company, user, search_query=None):
             )
 
             rows = cursor.fetchall()
-            columns = [col[0] for col in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return ResultSet.from_cursor(cursor, rows)
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
         print("Error de base de datos:", e)
@@ -53,6 +56,7 @@ def fetch_all_simcards(company, user, search_query=None):
         return []
 
 
+@cached_procedure("ListDeviceByCompany", "device", "simcard")
 def fetch_all_device(company, user):
     try:
         with connection.cursor() as cursor:
@@ -66,8 +70,7 @@ def fetch_all_device(company, user):
             )
 
             rows = cursor.fetchall()
-            columns = [col[0] for col in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return ResultSet.from_cursor(cursor, rows)
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
         print("Error de base de datos:", e)
@@ -78,6 +81,7 @@ def fetch_all_device(company, user):
         return []
 
 
+@cached_procedure("ListSendingCommandsdByCompanyAndUser", "command", "device", "vehicle", "user")
 def fetch_all_sending_commands(company_id, user_id, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -88,9 +92,7 @@ def fetch_all_sending_commands(company_id, user_id, search_query=None):
             )
             rows = cursor.fetchall()
             if rows:
-                # Usar cursor.description para obtener los nombres de las columnas
-                columns = [col[0] for col in cursor.description]
-                return [dict(zip(columns, row)) for row in rows]
+                return ResultSet.from_cursor(cursor, rows)
             else:
                 cursor.execute(
                     """
@@ -99,9 +101,7 @@ def fetch_all_sending_commands(company_id, user_id, search_query=None):
                     [company_id, user_id, search_query],
                 )
                 rows = cursor.fetchall()
-                # Usar cursor.description para obtener los nombres de las columnas
-                columns = [col[0] for col in cursor.description]
-                return [dict(zip(columns, row)) for row in rows]
+                return ResultSet.from_cursor(cursor, rows)
 
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
@@ -113,6 +113,7 @@ def fetch_all_sending_commands(company_id, user_id, search_query=None):
         return []
 
 
+@cached_procedure("ListResponseCommandsdByCompanyAndUser", "command", "device", "vehicle", "user")
 def fetch_all_response_commands(company_id, user_id, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -123,9 +124,7 @@ def fetch_all_response_commands(company_id, user_id, search_query=None):
             )
             rows = cursor.fetchall()
             if rows:
-                # Usar cursor.description para obtener los nombres de las columnas
-                columns = [col[0] for col in cursor.description]
-                return [dict(zip(columns, row)) for row in rows]
+                return ResultSet.from_cursor(cursor, rows)
             else:
                 cursor.execute(
                     """
@@ -134,9 +133,7 @@ def fetch_all_response_commands(company_id, user_id, search_query=None):
                     [company_id, user_id, search_query],
                 )
                 rows = cursor.fetchall()
-                # Usar cursor.description para obtener los nombres de las columnas
-                columns = [col[0] for col in cursor.description]
-                return [dict(zip(columns, row)) for row in rows]
+                return ResultSet.from_cursor(cursor, rows)
 
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
@@ -148,6 +145,7 @@ def fetch_all_response_commands(company_id, user_id, search_query=None):
         return []
 
 
+@cached_procedure("ListGeoZonesByCompany", "geozone")
 def fetch_all_geozones(user_company_id, user, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -159,9 +157,7 @@ def fetch_all_geozones(user_company_id, user, search_query=None):
             )  # Ejecuta la consulta sin parámetros
             rows = cursor.fetchall()
 
-            # Usar cursor.description para obtener los nombres de las columnas
-            columns = [col[0] for col in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return ResultSet.from_cursor(cursor, rows)
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
         print("Error de base de datos:", e)
@@ -172,6 +168,7 @@ def fetch_all_geozones(user_company_id, user, search_query=None):
         return []
 
 
+@cached_procedure("ListVehicleGroupsByCompany", "vehicle_group", "vehicle")
 def ListVehicleGroupsByCompany(company_id, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -182,9 +179,7 @@ def ListVehicleGroupsByCompany(company_id, search_query=None):
             )
             rows = cursor.fetchall()
 
-            # Usar cursor.description para obtener los nombres de las columnas
-            columns = [col[0] for col in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return ResultSet.from_cursor(cursor, rows)
 
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
@@ -196,6 +191,7 @@ def ListVehicleGroupsByCompany(company_id, search_query=None):
         return []
 
 
+@cached_procedure("ListVehicleByUserAndCompany", "vehicle", "device", "user")
 def ListVehicleByUserAndCompany(company_id, user_id, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -206,9 +202,7 @@ def ListVehicleByUserAndCompany(company_id, user_id, search_query=None):
             )
             rows = cursor.fetchall()
             if rows:
-                # Usar cursor.description para obtener los nombres de las columnas
-                columns = [col[0] for col in cursor.description]
-                return [dict(zip(columns, row)) for row in rows]
+                return ResultSet.from_cursor(cursor, rows)
             else:
                 cursor.execute(
                     """
@@ -217,9 +211,7 @@ def ListVehicleByUserAndCompany(company_id, user_id, search_query=None):
                     [company_id, search_query],
                 )
                 rows = cursor.fetchall()
-                # Usar cursor.description para obtener los nombres de las columnas
-                columns = [col[0] for col in cursor.description]
-                return [dict(zip(columns, row)) for row in rows]
+                return ResultSet.from_cursor(cursor, rows)
 
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
@@ -231,6 +223,7 @@ def ListVehicleByUserAndCompany(company_id, user_id, search_query=None):
         return []
 
 
+@cached_procedure("ListDeviceByCompany", "device", "simcard")
 def ListDeviceByCompany(company_id, user_id, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -241,9 +234,7 @@ def ListDeviceByCompany(company_id, user_id, search_query=None):
             )
             rows = cursor.fetchall()
 
-            # Usar cursor.description para obtener los nombres de las columnas
-            columns = [col[0] for col in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return ResultSet.from_cursor(cursor, rows)
 
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
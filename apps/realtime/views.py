@@ -25,9 +25,9 @@ from apps.realtime.models import (DataPlan, Device, FamilyModelUEC,
 from apps.whitelabel.models import Company
 from config.filtro import General_Filters
 from config.pagination import get_paginate_by
+from config.sorting import sort_key_commands_datetime, sort_rows
 
-from .apis import (extract_number, get_user_companies, get_user_vehicles,
-                   sort_key, sort_key_commands_datetime)
+from .apis import get_user_companies, get_user_vehicles
 from .forms import (ConfigurationReport, DataPlanForm, DeviceForm,
                     GeozonesForm, SendingCommandsFrom, SimcardForm,
                     VehicleForm, VehicleGroupForm)
@@ -298,11 +298,10 @@ class ListSimcardTemplate(
         ] = session_filters
         self.request.session.modified = True
         queryset = fetch_all_simcards(company, user, search)
-        # Función para convertir los valores a minúsculas y extraer números cuando sea necesario
-        key_function = sort_key(order_by)
+        # Orden natural de la columna (ver `config.sorting`)
         reverse = direction == 'desc'
         try:
-            sorted_queryset = sorted(queryset, key=key_function, reverse=reverse)
+            sorted_queryset = sort_rows(queryset, order_by, reverse)
         except KeyError:
             # Ordenamiento por defecto si la clave no existe
             sorted_queryset = sorted(
@@ -570,11 +569,10 @@ class ListDeviceTemplate(PermissionRequiredMixin, LoginRequiredMixin, ListView):
         ] = session_filters
         self.request.session.modified = True
         devices = ListDeviceByCompany(user.company_id, user.id, str(search))
-        # Función para convertir los valores a minúsculas y extraer números cuando sea necesario
-        key_function = sort_key(order_by)
+        # Orden natural de la columna (ver `config.sorting`)
         reverse = direction == 'desc'
         try:
-            sorted_queryset = sorted(devices, key=key_function, reverse=reverse)
+            sorted_queryset = sort_rows(devices, order_by, reverse)
         except KeyError:
             # Ordenamiento por defecto si la clave no existe
             sorted_queryset = sorted(
@@ -878,11 +876,10 @@ class ListVehicleTemplate(
             self.request.user.company_id, self.request.user.id, str(search)
         )
 
-        # Función para convertir los valores a minúsculas y extraer números cuando sea necesario
-        key_function = sort_key(order_by)
+        # Orden natural de la columna (ver `config.sorting`)
         reverse = direction == 'desc'
         try:
-            sorted_queryset = sorted(vehicles, key=key_function, reverse=reverse)
+            sorted_queryset = sort_rows(vehicles, order_by, reverse)
         except KeyError:
             # Ordenamiento por defecto si la clave no existe
             sorted_queryset = sorted(
@@ -1199,11 +1196,10 @@ class ListVehicleGroupTemplate(
         ] = session_filters
         self.request.session.modified = True
         groups = ListVehicleGroupsByCompany(self.request.user.company_id, search)
-        # Función para convertir los valores a minúsculas y extraer números cuando sea necesario
-        key_function = sort_key(order_by)
+        # Orden natural de la columna (ver `config.sorting`)
         reverse = direction == 'desc'
         try:
-            sorted_queryset = sorted(groups, key=key_function, reverse=reverse)
+            sorted_queryset = sort_rows(groups, order_by, reverse)
         except KeyError:
             # Ordenamiento por defecto si la clave no existe
             sorted_queryset = sorted(
@@ -1477,7 +1473,9 @@ class ListSendingCommandsTemplate(
         reverse = direction == "desc"
 
         try:
-            sorted_queryset = sorted(send_commands, key=sort_key_commands_datetime(order_by), reverse=reverse)
+            sorted_queryset = sort_rows(
+                send_commands, order_by, reverse, sort_key_commands_datetime
+            )
         except KeyError:
             # Ordenamiento por defecto si la clave no existe
             sorted_queryset = sorted(
@@ -1681,13 +1679,12 @@ class ListResponseCommandsTemplate(LoginRequiredMixin, ListView):
         # Obtener los planes de datos a través de la función fetch_all_dataplan.
         response_commands = fetch_all_response_commands(company, user.id, search)
 
-        # Función para convertir los valores a minúsculas y extraer números cuando sea necesario
-        key_function = sort_key(order_by)
+        # Orden natural de la columna (ver `config.sorting`)
         # Determinar si es orden descendente
         reverse = direction == "desc"
 
         try:
-            sorted_queryset = sorted(response_commands, key=key_function, reverse=reverse)
+            sorted_queryset = sort_rows(response_commands, order_by, reverse)
         except KeyError:
             # Ordenamiento por defecto si la clave no existe
             sorted_queryset = sorted(
@@ -1801,13 +1798,12 @@ class ListGeozonesTemplate(
         # Obtener los planes de datos a través de la función fetch_all_dataplan.
         geofence = fetch_all_geozones(user_company_id, user.id, search)
 
-        # Función para convertir los valores a minúsculas y extraer números cuando sea necesario
-        key_function = sort_key(order_by)
+        # Orden natural de la columna (ver `config.sorting`)
         # Determinar si es orden descendente
         reverse = direction == "desc"
 
         try:
-            sorted_queryset = sorted(geofence, key=key_function, reverse=reverse)
+            sorted_queryset = sort_rows(geofence, order_by, reverse)
         except KeyError:
             # Ordenamiento por defecto si la clave no existe
             sorted_queryset = sorted(
@@ -1,74 +1,476 @@
 import asyncio
 import json
-import re
-from datetime import datetime, timedelta, timezone
+import logging
+import time
+from collections import deque
+from urllib.parse import parse_qs
 
-import aioredis
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+
+from .frames import ENCODINGS, FORMATS, encode
+from .hub import position_hub
+from .tenancy import resolve_subscription
+from .viewport import Viewport
+
+logger = logging.getLogger(__name__)
+
+# Código de cierre para los sockets que no alcanzan a recibir las actualizaciones
+SLOW_CONSUMER_CLOSE_CODE = 4008
+
+
+class SlowConsumer(Exception):
+    """
+    El cliente no consume los mensajes al ritmo en que se generan.
+    """
 
 
 class GPSConsumer(AsyncWebsocketConsumer):
+    """
+    Socket del mapa en vivo.
+
+    Por defecto envía la foto inicial y luego los documentos modificados como `{imei: documento}`.
+    Si el cliente envía una acción, o negocia el formato en la URL (`?format=compact`,
+    `?encoding=msgpack`), los mensajes pasan a tener un campo `type`:
+
+    - `snapshot`: `vehicles` con los vehículos del recuadro (o de todo el alcance si no hay
+      recuadro), junto con `epoch` y `seq`.
+    - `update`: `vehicles` modificados dentro del recuadro, `removed` con los IMEI que salieron
+      de él o dejaron de existir y `seq`, la secuencia de la última difusión incluida.
+    - `clusters`: con zoom menor o igual a `GPS_CLUSTER_MAX_ZOOM`, grupos por celda con su
+      número de vehículos y centroide, enviados como máximo cada `GPS_CLUSTER_INTERVAL`.
+    - `detail`: documento completo del vehículo seleccionado.
+    - `throttled`: el socket no alcanzó a recibir las actualizaciones y desde ahora las recibe
+      agrupadas cada `interval` segundos; con `interval` 0 vuelve a recibirlas sin demora.
+
+    Acciones del cliente:
+
+    - `{"action": "viewport", "bbox": [oeste, sur, este, norte], "zoom": z}`.
+    - `{"action": "format", "format": "full" | "compact", "encoding": "json" | "msgpack"}`.
+    - `{"action": "detail", "imei": "..."}`: envía el documento completo del vehículo y lo
+      reenvía en cada cambio; `imei` null deja de seguirlo.
+    - `{"action": "ack", "received": n}`: número total de mensajes recibidos en este socket
+      (incluido el primero); activa el control de flujo.
+
+    Un cliente que se reconecta con `?resume=<epoch>.<seq>` (los últimos valores recibidos)
+    recibe un `update` con `resumed: true` que contiene solo los cambios posteriores, o una foto
+    completa si el historial del proceso ya no cubre ese intervalo.
+
+    Los cambios recibidos del hub no se envían desde el manejador del channel layer: se acumulan
+    por IMEI (el último documento reemplaza al anterior) y una tarea por socket los envía. Los
+    mensajes de control pasan por una cola acotada (`GPS_SEND_QUEUE_SIZE`).
+
+    Daphne escribe cada `send` en el transporte de Twisted sin esperar al cliente, así que el
+    tiempo de envío no indica si el cliente es lento. El control de flujo se basa en los acuses
+    del cliente: cuando los mensajes sin acuse superan `GPS_ACK_WINDOW_FRAMES` o
+    `GPS_ACK_WINDOW_BYTES`, los cambios se siguen acumulando por IMEI sin enviarse, el socket
+    pasa a recibir actualizaciones cada `GPS_SLOW_CONSUMER_INTERVAL` segundos y, si no llega un
+    acuse en `GPS_SLOW_CONSUMER_TIMEOUT` segundos, se cierra. Cuando el cliente confirma todos
+    los mensajes enviados vuelve a la frecuencia normal. Los clientes que nunca envían `ack` no
+    tienen control de flujo.
+    """
+
+    subscription = None
+    # Se activa con el primer mensaje del cliente; antes se conserva el formato original
+    envelope = False
+    viewport = None
+    format = "full"
+    encoding = "json"
+    detail = None
+    _sender_task = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # IMEI enviados al cliente dentro del recuadro actual
+        self.visible = set()
+        # Cambios pendientes de envío: último documento por IMEI e IMEI eliminados
+        self._pending = {}
+        self._removed = set()
+        self._clusters_dirty = False
+        self._detail_dirty = False
+        self._queue = asyncio.Queue(maxsize=settings.GPS_SEND_QUEUE_SIZE)
+        self._wake = asyncio.Event()
+        self._flushed_at = 0
+        self._throttled = False
+        # Control de flujo: mensajes enviados y (número, tamaño) de los que no tienen acuse
+        self._acks = False
+        self._sent = 0
+        self._unacked = deque()
+        self._unacked_bytes = 0
+        self._acked = asyncio.Event()
+        # Secuencia de la última difusión recibida del hub
+        self._seq = 0
+
     async def connect(self):
-        self.room_group_name = "gps_updates"
-        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            # Sin usuario no es posible saber qué vehículos puede ver el socket
+            await self.close()
+            return
+
+        # Alcance del socket (compañías y vehículos visibles), resuelto una sola vez
+        self.subscription = await self.get_subscription(user)
+
+        params = parse_qs(self.scope.get("query_string", b"").decode())
+        if params.get("format", [None])[0] in FORMATS:
+            self.format = params["format"][0]
+            self.envelope = True
+        if params.get("encoding", [None])[0] in ENCODINGS:
+            self.encoding = params["encoding"][0]
+            self.envelope = True
+        resume = params.get("resume", [None])[0]
+        if resume:
+            self.envelope = True
+
+        # Grupos `gps_updates` de este proceso, alimentados por la tarea de difusión compartida
+        self.room_groups = position_hub.groups_for(self.subscription)
+        for group in self.room_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        position_hub.subscribe(self.subscription)
         await self.accept()
 
-        # Crear la conexión a Redis
-        self.redis = aioredis.from_url(
-            "redis://redis-cip", encoding="utf-8", decode_responses=True
-        )
-        self.last_update_check = datetime.utcnow().replace(
-            tzinfo=timezone.utc
-        )  # Inicializar aquí
         # Realizar el cargue inicial de datos
-        await self.initial_data_load()
+        if self.envelope:
+            if not (resume and await self.send_resume(resume)):
+                await self.send_viewport()
+        else:
+            await self.initial_data_load()
+        self._sender_task = asyncio.create_task(self._sender())
 
-        # Iniciar la escucha de eventos de Redis
-        asyncio.create_task(self.send_updates())
+    async def get_subscription(self, user):
+        return await database_sync_to_async(resolve_subscription)(user)
 
     async def initial_data_load(self):
-        keys = await self.redis.keys("*")
-        keys_to_exclude = [
-            "command_response",
-            "commands",
-            "fmbxxx",
-            "asgi:group:gps_updates",
-        ]
-        numeric_key_pattern = re.compile(r"^\d+$")
-        all_values = {}
-        for key in keys:
-            if key not in keys_to_exclude and numeric_key_pattern.match(key):
-                # Usar el comando de ReJSON para obtener el objeto JSON almacenado en la clave
-                value = await self.redis.execute_command("JSON.GET", key)
-                if value:
-                    # Convertir la cadena JSON a un objeto Python y agregar al diccionario
-                    all_values[key] = json.loads(value)
+        # La foto en memoria del proceso evita recorrer Redis en cada conexión
+        all_values = self.subscription.filter(
+            await position_hub.get_snapshot(), position_hub.companies
+        )
         # Enviar todos los valores JSON recuperados a través de WebSocket
         await self.send(text_data=json.dumps(all_values))
 
     async def disconnect(self, close_code):
-        # Asegúrate de cerrar la conexión de Redis adecuadamente
-        await self.redis.close()
-        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
-
-    async def send_updates(self):
-        keys_to_exclude = [
-            "command_response",
-            "commands",
-            "fmbxxx",
-            "asgi:group:gps_updates",
-        ]
-        numeric_key_pattern = re.compile(r"^\d+$")
-        while True:
-            all_keys = await self.redis.keys("*")  # Considera usar SCAN en producción
-            all_values = {}
-            for key in all_keys:
-                if key not in keys_to_exclude and numeric_key_pattern.match(key):
-                    json_value = await self.redis.execute_command("JSON.GET", key)
-                    if json_value:
-                        all_values[key] = json.loads(json_value)
-            if all_values:
-                await self.send(text_data=json.dumps(all_values))
-            await asyncio.sleep(
-                0.5
-            )  # Espera 1 segundo antes de enviar la siguiente actualización
+        if self.subscription is None:
+            return
+        if self._sender_task:
+            self._sender_task.cancel()
+        position_hub.unsubscribe(self.subscription)
+        for group in self.room_groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = json.loads(text_data or "")
+        except ValueError:
+            return
+        if not isinstance(data, dict):
+            return
+        action = data.get("action")
+        if action == "viewport":
+            try:
+                viewport = Viewport.from_message(data)
+            except ValueError as e:
+                await self.send_error(str(e))
+                return
+            self.envelope = True
+            self.viewport = viewport
+            await self.send_viewport()
+        elif action == "format":
+            frame_format = data.get("format", self.format)
+            encoding = data.get("encoding", self.encoding)
+            if frame_format not in FORMATS or encoding not in ENCODINGS:
+                await self.send_error("Formato o codificación no soportados")
+                return
+            self.envelope = True
+            self.format, self.encoding = frame_format, encoding
+            await self.send_viewport()
+        elif action == "detail":
+            imei = data.get("imei")
+            if imei is None:
+                self.detail = None
+                return
+            imei = str(imei)
+            await position_hub.get_snapshot()
+            if imei not in position_hub.snapshot or not self.allows(imei):
+                await self.send_error("Vehículo no disponible")
+                return
+            self.envelope = True
+            self.detail = imei
+            await self.send_detail()
+        elif action == "ack":
+            try:
+                received = int(data.get("received"))
+            except (TypeError, ValueError):
+                await self.send_error("received debe ser un entero")
+                return
+            self.acknowledge(received)
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+        if text_data is None and bytes_data is None:
+            return
+        if self._acks:
+            size = len(text_data if text_data is not None else bytes_data)
+            self._unacked.append((self._sent, size))
+            self._unacked_bytes += size
+        self._sent += 1
+
+    def acknowledge(self, received):
+        """
+        Registra el acuse del cliente: los mensajes con número (desde 0) menor que `received` ya
+        llegaron.
+
+        El primer acuse activa el control de flujo; los mensajes anteriores se dan por recibidos.
+        """
+        self._acks = True
+        while self._unacked and self._unacked[0][0] < received:
+            self._unacked_bytes -= self._unacked.popleft()[1]
+        # Cualquier acuse reinicia la espera de `_wait_for_ack`
+        self._acked.set()
+        self._wake.set()
+
+    def window_full(self):
+        return self._acks and (
+            len(self._unacked) >= settings.GPS_ACK_WINDOW_FRAMES
+            or self._unacked_bytes >= settings.GPS_ACK_WINDOW_BYTES
+        )
+
+    async def send_resume(self, resume):
+        """
+        Envía solo los cambios posteriores a la última difusión que recibió el cliente.
+
+        Args:
+            resume (str): `<epoch>.<seq>` recibido en la URL.
+
+        Returns:
+            bool: False si no es posible reanudar y se debe enviar una foto completa.
+        """
+        epoch, _, seq = resume.partition(".")
+        try:
+            seq = int(seq)
+        except ValueError:
+            return False
+        await position_hub.get_snapshot()
+        missed = position_hub.replay(self.subscription, epoch, seq)
+        if missed is None:
+            return False
+        changed, removed = missed
+        if self.subscription.imeis is not None:
+            changed = [imei for imei in changed if imei in self.subscription.imeis]
+            removed = [imei for imei in removed if imei in self.subscription.imeis]
+        self._seq = position_hub.seq
+        self.visible = set(self.subscription.filter(position_hub.snapshot, position_hub.companies))
+        documents = {imei: position_hub.snapshot[imei] for imei in changed}
+        await self.send_frame({
+            "type": "update",
+            "vehicles": self.vehicles(documents),
+            "removed": removed,
+            "seq": self._seq,
+            "epoch": position_hub.epoch,
+            "resumed": True,
+        })
+        return True
+
+    async def send_frame(self, frame):
+        """
+        Encola un mensaje de control para la tarea de envío.
+
+        Si la cola está llena el cliente no está recibiendo los mensajes y se cierra el socket.
+        """
+        try:
+            self._queue.put_nowait(encode(frame, self.encoding))
+        except asyncio.QueueFull:
+            logger.info("Socket del mapa cerrado: cola de envío llena")
+            await self.close(code=SLOW_CONSUMER_CLOSE_CODE)
+            return
+        self._wake.set()
+
+    async def send_error(self, detail):
+        await self.send_frame({"type": "error", "detail": detail})
+
+    async def send_detail(self):
+        self._detail_dirty = False
+        await self.send_frame(
+            {"type": "detail", "imei": self.detail, "vehicle": position_hub.snapshot[self.detail]}
+        )
+
+    def allows(self, imei):
+        return self.subscription.allows(imei, position_hub.companies.get(imei))
+
+    def clustered(self):
+        return (
+            self.viewport is not None
+            and self.viewport.zoom <= settings.GPS_CLUSTER_MAX_ZOOM
+        )
+
+    def visible_imeis(self):
+        # Vehículos del recuadro actual dentro del alcance del socket
+        return [imei for imei in position_hub.index.query(self.viewport) if self.allows(imei)]
+
+    def vehicles(self, documents):
+        # Documentos completos por IMEI o filas del formato compacto ya proyectadas por el hub
+        if self.format == "compact":
+            return [position_hub.rows[imei] for imei in documents if imei in position_hub.rows]
+        return documents
+
+    def clusters_frame(self):
+        clusters = position_hub.index.clusters(self.viewport, self.visible_imeis())
+        return {"type": "clusters", "zoom": self.viewport.zoom, "clusters": clusters}
+
+    async def send_viewport(self):
+        # Foto completa del recuadro actual; reemplaza los cambios pendientes
+        await position_hub.get_snapshot()
+        self._pending, self._removed = {}, set()
+        self._clusters_dirty = False
+        if self.clustered():
+            self.visible = set()
+            await self.send_frame(self.clusters_frame())
+            return
+        if self.viewport is None:
+            documents = self.subscription.filter(position_hub.snapshot, position_hub.companies)
+        else:
+            documents = {imei: position_hub.snapshot[imei] for imei in self.visible_imeis()}
+        self.visible = set(documents)
+        self._seq = position_hub.seq
+        frame = {
+            "type": "snapshot",
+            "vehicles": self.vehicles(documents),
+            "epoch": position_hub.epoch,
+            "seq": self._seq,
+        }
+        if self.format == "compact":
+            frame["fields"] = ["imei", *position_hub.fields]
+        await self.send_frame(frame)
+
+    async def gps_update(self, event):
+        # Solo los dispositivos que cambiaron desde la última difusión, dentro del alcance
+        self._seq = max(self._seq, event.get("seq", 0))
+        updates = event["updates"]
+        if self.subscription.imeis is not None:
+            updates = {
+                imei: document
+                for imei, document in updates.items()
+                if imei in self.subscription.imeis
+            }
+        removed = []
+        if self.envelope:
+            if self.detail in updates:
+                self._detail_dirty = True
+            if self.clustered():
+                # Los grupos se recalculan al enviarlos, como máximo una vez por intervalo
+                self._clusters_dirty = self._clusters_dirty or bool(updates or event["removed"])
+                updates = {}
+            else:
+                removed = [imei for imei in event["removed"] if imei in self.visible]
+                if self.viewport is not None:
+                    inside = {}
+                    for imei, document in updates.items():
+                        position = position_hub.index.positions.get(imei)
+                        if position is not None and self.viewport.contains(*position):
+                            inside[imei] = document
+                        elif imei in self.visible:
+                            # El vehículo salió del recuadro
+                            removed.append(imei)
+                    updates = inside
+                self.visible.difference_update(removed)
+                self.visible.update(updates)
+
+        if not (updates or removed or self._clusters_dirty or self._detail_dirty):
+            return
+        # Gana el último documento de cada IMEI
+        for imei in removed:
+            self._pending.pop(imei, None)
+        self._removed.difference_update(updates)
+        self._removed.update(removed)
+        self._pending.update(updates)
+        self._wake.set()
+
+    def flush_interval(self):
+        if self.clustered():
+            return settings.GPS_CLUSTER_INTERVAL
+        return settings.GPS_SLOW_CONSUMER_INTERVAL if self._throttled else 0
+
+    def take_pending(self):
+        """
+        Convierte los cambios acumulados en mensajes y vacía la acumulación.
+
+        Returns:
+            list: Mensajes codificados para `send`.
+        """
+        frames = []
+        if not self.envelope:
+            if self._pending:
+                frames.append({"text_data": json.dumps(self._pending)})
+        else:
+            if self._detail_dirty and self.detail in position_hub.snapshot:
+                frames.append(encode(
+                    {"type": "detail", "imei": self.detail,
+                     "vehicle": position_hub.snapshot[self.detail]},
+                    self.encoding,
+                ))
+            if self._clusters_dirty and self.clustered():
+                frames.append(encode(self.clusters_frame(), self.encoding))
+            if self._pending or self._removed:
+                frame = {
+                    "type": "update",
+                    "vehicles": self.vehicles(self._pending),
+                    "removed": list(self._removed),
+                    "seq": self._seq,
+                }
+                frames.append(encode(frame, self.encoding))
+        self._pending, self._removed = {}, set()
+        self._clusters_dirty = self._detail_dirty = False
+        return frames
+
+    async def _sender(self):
+        try:
+            while True:
+                await self._wake.wait()
+                self._wake.clear()
+                while not self._queue.empty():
+                    await self.send(**self._queue.get_nowait())
+                if self._throttled and not self._unacked:
+                    # El cliente se puso al día
+                    await self.set_throttled(False)
+                if self.window_full():
+                    await self._wait_for_ack()
+                    self._wake.set()
+                    continue
+                delay = self._flushed_at + self.flush_interval() - time.monotonic()
+                if delay > 0:
+                    # Los cambios que lleguen mientras tanto se agrupan en el mismo mensaje; los
+                    # mensajes de control interrumpen la espera
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wake.set()
+                    continue
+                frames = self.take_pending()
+                if frames:
+                    self._flushed_at = time.monotonic()
+                for message in frames:
+                    await self.send(**message)
+        except SlowConsumer:
+            logger.info("Socket del mapa cerrado: el cliente no alcanza las actualizaciones")
+            await self.close(code=SLOW_CONSUMER_CLOSE_CODE)
+
+    async def set_throttled(self, throttled):
+        """
+        Cambia la frecuencia de envío de las actualizaciones y avisa al cliente con `throttled`.
+        """
+        self._throttled = throttled
+        if self.envelope:
+            interval = settings.GPS_SLOW_CONSUMER_INTERVAL if throttled else 0
+            await self.send(**encode({"type": "throttled", "interval": interval}, self.encoding))
+
+    async def _wait_for_ack(self):
+        # Los cambios se siguen acumulando por IMEI mientras el cliente no confirme los mensajes
+        if not self._throttled:
+            # Primera vez: se reduce la frecuencia de envío en lugar de cerrar el socket
+            await self.set_throttled(True)
+        self._acked.clear()
+        try:
+            await asyncio.wait_for(self._acked.wait(), settings.GPS_SLOW_CONSUMER_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise SlowConsumer()
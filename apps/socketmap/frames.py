@@ -0,0 +1,69 @@
+"""
+Formatos de los mensajes del mapa en vivo.
+
+El cliente puede negociar (ver `GPSConsumer`) el formato de los vehículos y la codificación de
+los mensajes:
+
+- `full`: documento ReJSON completo por IMEI (`{imei: documento}`), el formato original.
+- `compact`: una lista posicional por vehículo con solo los campos de `GPS_COMPACT_FIELDS`
+  (`[imei, latitud, longitud, velocidad, ...]`). Las fotos incluyen `fields` con el nombre de
+  cada posición; el documento completo se pide por vehículo con la acción `detail`.
+
+Los mensajes se codifican como texto JSON o, con `encoding=msgpack`, como mensajes binarios
+MessagePack.
+"""
+
+import json
+
+import msgpack
+from django.conf import settings
+
+FORMATS = ("full", "compact")
+ENCODINGS = ("json", "msgpack")
+
+
+def compact_fields():
+    """
+    Retorna las rutas de los campos del formato compacto.
+
+    Returns:
+        list: Rutas separadas por punto dentro del documento (p. ej. `gps.latitude`).
+    """
+    return [field.strip() for field in settings.GPS_COMPACT_FIELDS.split(",") if field.strip()]
+
+
+def project(imei, document, fields):
+    """
+    Proyecta un documento al formato compacto.
+
+    Args:
+        imei (str): IMEI del dispositivo.
+        document (dict): Documento ReJSON completo.
+        fields (list): Rutas de los campos a conservar.
+
+    Returns:
+        list: `[imei, valor_1, valor_2, ...]`; None en los campos que el documento no tiene.
+    """
+    row = [imei]
+    for field in fields:
+        value = document
+        for part in field.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        row.append(value)
+    return row
+
+
+def encode(frame, encoding):
+    """
+    Codifica un mensaje para enviarlo por el websocket.
+
+    Args:
+        frame (dict | list): Mensaje a enviar.
+        encoding (str): `json` o `msgpack`.
+
+    Returns:
+        dict: Argumentos para `AsyncWebsocketConsumer.send` (`text_data` o `bytes_data`).
+    """
+    if encoding == "msgpack":
+        return {"bytes_data": msgpack.packb(frame, use_bin_type=True)}
+    return {"text_data": json.dumps(frame, separators=(",", ":"))}
@@ -0,0 +1,196 @@
+"""
+Caché de lectura de los recorridos históricos por IMEI.
+
+Los rangos cerrados de `GetVehicleHistory` y `GetAVLData` no cambian, pero se consultan una y
+otra vez mientras se investiga un incidente. `cached_history` divide el rango pedido en bloques
+alineados de `HISTORY_CACHE_BUCKET` segundos:
+
+- Los bloques completos que terminaron hace más de `HISTORY_CACHE_GRACE` segundos (margen para
+  los reportes que llegan tarde) se guardan comprimidos en la caché `history`. Los bloques
+  faltantes contiguos se piden a SQL Server en una sola consulta y se reparten por `signal_date`.
+- Cada consulta de un bloque o del extremo inicial llega hasta el inicio del bloque siguiente
+  (el procedimiento incluye la fecha final) y se descartan los registros desde ese instante,
+  que trae la consulta siguiente; así no se pierden los registros con fracciones de segundo
+  entre `HH:59:59` y `HH+1:00:00`.
+- Los extremos parciales del rango y los bloques aún abiertos se consultan siempre a SQL Server.
+
+La caché `history` (ver `CACHES`) es Redis por defecto, cuya política de memoria se encarga del
+desalojo LRU; si no está disponible se consulta directamente la base de datos.
+"""
+
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _items(data):
+    # Lista de registros de un resultado: arreglo JSON o `features` de un GeoJSON
+    if isinstance(data, dict):
+        return data.get("features") or []
+    return data or []
+
+
+def _timestamp(item):
+    value = item.get("signal_date")
+    if value is None and isinstance(item.get("properties"), dict):
+        value = item["properties"].get("signal_date")
+    try:
+        return datetime.fromisoformat(str(value)[:19])
+    except ValueError:
+        return None
+
+
+def merge_results(parts):
+    """
+    Une los resultados de varias consultas en el orden recibido.
+
+    Args:
+        parts (list): Resultados decodificados (arreglos JSON o `FeatureCollection`); None para
+            las consultas sin filas.
+
+    Returns:
+        list | dict | None: El resultado combinado con la estructura del primero, o None si
+        ninguna consulta trajo filas.
+    """
+    parts = [part for part in parts if _items(part)]
+    if not parts:
+        return None
+    if isinstance(parts[0], dict):
+        merged = dict(parts[0])
+        merged["features"] = [item for part in parts for item in _items(part)]
+        return merged
+    return [item for part in parts for item in part]
+
+
+def _before(data, limit):
+    # Registros anteriores a `limit`: convierte la consulta [inicio, limit] en [inicio, limit)
+    if data is None:
+        return None
+    items = []
+    for item in _items(data):
+        moment = _timestamp(item)
+        if moment is None or moment < limit:
+            items.append(item)
+    if isinstance(data, dict):
+        return dict(data, features=items)
+    return items
+
+
+def _split(data, starts, bucket):
+    # Reparte los registros de una consulta entre los bloques que cubre; los registros desde el
+    # inicio del bloque siguiente se descartan
+    buckets = {start: [] for start in starts}
+    for item in _items(data):
+        moment = _timestamp(item)
+        start = starts[0]
+        if moment is not None:
+            index = int((moment - starts[0]) // bucket)
+            if index >= len(starts):
+                continue
+            start = starts[max(index, 0)]
+        buckets[start].append(item)
+    if isinstance(data, dict):
+        return {start: dict(data, features=items) for start, items in buckets.items()}
+    return buckets
+
+
+def _encode(data):
+    return zlib.compress(json.dumps(data).encode("utf-8"))
+
+
+def _decode(value):
+    return json.loads(zlib.decompress(value).decode("utf-8"))
+
+
+def _cache_key(procedure, company_id, imei, start):
+    return f"{procedure}:{company_id}:{imei}:{start:%Y%m%d%H%M%S}:{settings.HISTORY_CACHE_BUCKET}"
+
+
+def cached_history(procedure, fetch, company_id, imei, start, end, now=None):
+    """
+    Consulta un recorrido usando los bloques cerrados que ya están en caché.
+
+    Args:
+        procedure (str): Nombre del procedimiento, usado en la clave de caché.
+        fetch (callable): `fetch(inicio, fin)` ejecuta el procedimiento para el rango (cadenas
+            `%Y-%m-%d %H:%M:%S`) y retorna el JSON concatenado, o una cadena vacía.
+        company_id: Compañía enviada al procedimiento.
+        imei (str): IMEI del vehículo.
+        start (datetime): Inicio del rango.
+        end (datetime): Fin del rango.
+        now (datetime, optional): Hora actual en la misma zona que el rango.
+
+    Returns:
+        list | dict | None: El resultado decodificado, o None si no hay registros.
+    """
+    bucket = timedelta(seconds=settings.HISTORY_CACHE_BUCKET)
+    closed_until = (now or datetime.now()) - timedelta(seconds=settings.HISTORY_CACHE_GRACE)
+
+    def query(range_start, range_end):
+        raw = fetch(range_start.strftime(DATE_FORMAT), range_end.strftime(DATE_FORMAT))
+        return json.loads(raw) if raw else None
+
+    # Bloques completos y cerrados dentro del rango
+    epoch = datetime(2000, 1, 1)
+    first = epoch + -(-(start - epoch) // bucket) * bucket
+    starts = []
+    while first + bucket <= end and first + bucket <= closed_until:
+        starts.append(first)
+        first += bucket
+    if not starts:
+        return query(start, end)
+
+    cache = caches["history"]
+    keys = {start_: _cache_key(procedure, company_id, imei, start_) for start_ in starts}
+    try:
+        cached = cache.get_many(list(keys.values()))
+    except Exception as e:
+        logger.warning("Caché de historial no disponible: %s", e)
+        return query(start, end)
+
+    buckets = {}
+    for start_ in starts:
+        if keys[start_] in cached:
+            buckets[start_] = _decode(cached[keys[start_]])
+
+    # Los bloques faltantes contiguos se consultan juntos y se guardan por separado
+    missing = [start_ for start_ in starts if start_ not in buckets]
+    runs = []
+    for start_ in missing:
+        if runs and runs[-1][-1] + bucket == start_:
+            runs[-1].append(start_)
+        else:
+            runs.append([start_])
+    fresh = {}
+    for run in runs:
+        data = query(run[0], run[-1] + bucket)
+        if data is None:
+            fresh.update({start_: [] for start_ in run})
+        else:
+            fresh.update(_split(data, run, bucket))
+    if fresh:
+        try:
+            cache.set_many(
+                {keys[start_]: _encode(data) for start_, data in fresh.items()},
+                settings.HISTORY_CACHE_TIMEOUT,
+            )
+        except Exception as e:
+            logger.warning("No se pudo guardar el historial en caché: %s", e)
+        buckets.update(fresh)
+
+    parts = []
+    if start < starts[0]:
+        parts.append(_before(query(start, starts[0]), starts[0]))
+    parts.extend(buckets[start_] for start_ in starts)
+    tail = starts[-1] + bucket
+    if tail <= end:
+        parts.append(query(tail, end))
+    return merge_results(parts)
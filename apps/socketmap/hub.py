@@ -0,0 +1,458 @@
+"""
+Difusión de posiciones GPS en vivo.
+
+Cada proceso ASGI mantiene una única tarea en segundo plano que conserva en memoria el último
+documento ReJSON de cada IMEI y difunde solo los cambios (dispositivos nuevos, modificados o
+eliminados) a los consumidores locales a través del grupo `gps_updates` del channel layer.
+
+La tarea funciona en dos modos (`GPS_STREAM_MODE`):
+
+- `push`: escucha las notificaciones de keyspace de las claves numéricas, o el canal en el que
+  publica el servicio de ingesta, y solo lee de Redis los IMEI que cambiaron. Las
+  notificaciones requieren `notify-keyspace-events` con las clases `Kdgx` en el servidor (o
+  `GPS_CONFIGURE_KEYSPACE_EVENTS=1` para agregarlas al iniciar).
+- `poll`: lee todas las claves cada `GPS_POLL_INTERVAL` segundos y calcula la diferencia contra
+  la foto en memoria.
+
+En ambos casos la carga sobre Redis es independiente del número de mapas abiertos, y las nuevas
+conexiones reciben la foto en memoria sin consultar Redis.
+
+Las difusiones se separan por compañía (ver `tenancy`): el grupo base recibe toda la flota y
+existe un subgrupo por compañía, de modo que cada socket solo recibe los vehículos que el
+usuario puede ver.
+
+Cada difusión lleva un número de secuencia y se conserva un historial acotado por grupo, con el
+que un socket que se reconecta recibe solo los cambios que perdió (ver `PositionHub.replay`).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import socket
+import uuid
+from collections import Counter, deque
+
+import aioredis
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from .frames import compact_fields, project
+from .store import NUMERIC_KEY_PATTERN, PositionStore
+from .tenancy import load_company_index
+from .viewport import GridIndex
+
+logger = logging.getLogger(__name__)
+
+GROUP_NAME = "gps_updates"
+# Clases de `notify-keyspace-events` que necesita el modo push: K (canal __keyspace@*),
+# d (comandos de módulos: JSON.SET), g (DEL, RENAME) y x (claves que expiran)
+KEYSPACE_EVENT_FLAGS = "Kdgx"
+
+
+def local_group_name():
+    """
+    Retorna el nombre del grupo `gps_updates` propio de este proceso.
+
+    Cada proceso tiene su propio suscriptor, por lo que el grupo se limita a los consumidores
+    locales; de lo contrario cada actualización llegaría una vez por cada worker.
+
+    Returns:
+        str: Nombre de grupo válido para el channel layer (máximo 100 caracteres).
+    """
+    # Se deja espacio para el sufijo de compañía de `PositionHub.company_group`
+    host = re.sub(r"[^A-Za-z0-9\-_.]", "-", socket.gethostname())[:60]
+    return f"{GROUP_NAME}.{host}-{os.getpid()}"
+
+
+def merge_keyspace_flags(current, required=KEYSPACE_EVENT_FLAGS):
+    """
+    Agrega a la configuración actual de `notify-keyspace-events` solo las clases que faltan.
+
+    Args:
+        current (str): Valor actual (`CONFIG GET`), p. ej. "Ex" o "".
+        required (str): Clases que se necesitan.
+
+    Returns:
+        str: El valor actual con las clases faltantes al final.
+    """
+    # "A" es el alias de "g$lshzxetd"
+    present = set(current.replace("A", "g$lshzxetd"))
+    return current + "".join(flag for flag in required if flag not in present)
+
+
+async def configure_keyspace_events(redis):
+    """
+    Activa en Redis las notificaciones de keyspace del modo push sin borrar las clases que otros
+    servicios ya configuraron (requiere permiso CONFIG).
+    """
+    config = await redis.config_get("notify-keyspace-events")
+    current = config.get("notify-keyspace-events") or ""
+    if isinstance(current, bytes):
+        current = current.decode()
+    flags = merge_keyspace_flags(current)
+    if flags != current:
+        await redis.config_set("notify-keyspace-events", flags)
+
+
+def key_from_message(message):
+    """
+    Extrae la clave (IMEI) de un mensaje de pub/sub de Redis.
+
+    Args:
+        message (dict): Mensaje recibido de `PubSub.listen()`.
+
+    Returns:
+        str | None: El IMEI si el mensaje corresponde a una clave numérica, o None.
+    """
+    if message["type"] == "pmessage":
+        # Notificación de keyspace: el canal es "__keyspace@<db>__:<clave>"
+        key = message["channel"].split(":", 1)[-1]
+    elif message["type"] == "message":
+        # Canal de publicación de la ingesta: el contenido es el IMEI
+        key = message["data"]
+    else:
+        return None
+    if isinstance(key, str) and NUMERIC_KEY_PATTERN.match(key):
+        return key
+    return None
+
+
+class PositionHub:
+    """
+    Foto en memoria de las posiciones y tarea única por proceso que difunde sus cambios.
+
+    En modo `push` las notificaciones que llegan dentro de `flush_interval` se agrupan, de modo
+    que un IMEI que reporta varias veces en ese lapso se lee de Redis y se envía una sola vez.
+    """
+
+    flush_interval = 0.1
+
+    def __init__(self):
+        self.group_name = local_group_name()
+        # Último documento (ya decodificado) y su JSON original por IMEI
+        self.snapshot = {}
+        self._raw = {}
+        # Vehículo en formato compacto por IMEI, proyectado una sola vez por cambio
+        self.fields = compact_fields()
+        self.rows = {}
+        # Posiciones por celda para consultar el recuadro visible de cada socket
+        self.index = GridIndex()
+        # Compañía de cada IMEI y número de sockets locales en cada grupo
+        self.companies = {}
+        self._listeners = Counter()
+        self._ready = asyncio.Event()
+        self._index_ready = asyncio.Event()
+        self._task = None
+        self._index_task = None
+        self._idle_handle = None
+        self._changed = set()
+        # Número de secuencia de cada difusión y, por grupo, los IMEI de las últimas difusiones
+        # para reenviar solo lo perdido a los sockets que se reconectan. `epoch` cambia cada vez
+        # que la tarea arranca, porque los cambios ocurridos mientras estuvo detenida se pierden.
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self._history = {}
+
+    def start(self):
+        """
+        Inicia la tarea de difusión en el event loop actual si aún no está corriendo.
+        """
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            self.epoch = uuid.uuid4().hex[:8]
+            self._history = {}
+            self._task = loop.create_task(self._run())
+        if self._index_task is None or self._index_task.done():
+            self._index_task = loop.create_task(self._index_loop())
+
+    def stop(self):
+        """
+        Detiene la tarea de difusión y la recarga del índice.
+
+        La foto en memoria se conserva, pero deja de considerarse al día: la siguiente conexión
+        espera una nueva carga completa.
+        """
+        self._idle_handle = None
+        for task in (self._task, self._index_task):
+            if task is not None:
+                task.cancel()
+        self._task = self._index_task = None
+        self._ready.clear()
+        self._changed = set()
+
+    async def get_snapshot(self):
+        """
+        Retorna la foto en memoria, esperando a que terminen la primera carga completa y la del
+        índice de compañías.
+
+        Returns:
+            dict: Documentos indexados por IMEI.
+        """
+        self.start()
+        await self._ready.wait()
+        await self._index_ready.wait()
+        return self.snapshot
+
+    def company_group(self, company_id):
+        """
+        Retorna el subgrupo local de una compañía.
+
+        Args:
+            company_id (int): ID de la compañía.
+
+        Returns:
+            str: Nombre del grupo.
+        """
+        return f"{self.group_name}.c{company_id}"
+
+    def groups_for(self, subscription):
+        """
+        Retorna los grupos a los que debe unirse un socket según su alcance.
+
+        Args:
+            subscription (Subscription): Alcance del socket.
+
+        Returns:
+            list: Nombres de grupo; el grupo base si el socket ve todas las compañías.
+        """
+        if subscription.companies is None:
+            return [self.group_name]
+        return [self.company_group(company_id) for company_id in subscription.companies]
+
+    def subscribe(self, subscription):
+        """
+        Registra un socket local para que sus grupos reciban difusiones.
+        """
+        self._listeners.update(self.groups_for(subscription))
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+
+    def unsubscribe(self, subscription):
+        """
+        Elimina el registro de un socket local.
+
+        Cuando el proceso se queda sin sockets la tarea de difusión se detiene tras
+        `GPS_HUB_IDLE_TIMEOUT` segundos, de modo que Redis solo se consulta mientras haya mapas
+        abiertos.
+        """
+        self._listeners.subtract(self.groups_for(subscription))
+        self._listeners += Counter()  # Descarta los grupos sin sockets
+        if not self._listeners and self._task is not None and self._idle_handle is None:
+            self._idle_handle = asyncio.get_running_loop().call_later(
+                settings.GPS_HUB_IDLE_TIMEOUT, self.stop
+            )
+
+    def replay(self, subscription, epoch, seq):
+        """
+        Calcula los cambios que un socket perdió desde la difusión `seq`.
+
+        Args:
+            subscription (Subscription): Alcance del socket.
+            epoch (str): `epoch` recibido por el socket antes de desconectarse.
+            seq (int): Última secuencia recibida por el socket.
+
+        Returns:
+            tuple | None: (`changed`, `removed`): IMEI modificados que siguen existiendo y los
+            eliminados; None si el historial ya no cubre el intervalo y el socket necesita una
+            foto completa.
+        """
+        if epoch != self.epoch or not 0 <= seq <= self.seq:
+            return None
+        changed, removed = {}, {}
+        for group in self.groups_for(subscription):
+            history = self._history.get(group, ())
+            if len(history) == history.maxlen and history[0][0] > seq + 1:
+                # Las difusiones siguientes a `seq` ya salieron del historial
+                return None
+            for entry_seq, entry_changed, entry_removed in history:
+                if entry_seq <= seq:
+                    continue
+                for imei in entry_changed:
+                    changed[imei] = None
+                    removed.pop(imei, None)
+                for imei in entry_removed:
+                    removed[imei] = None
+                    changed.pop(imei, None)
+        changed = [imei for imei in changed if imei in self.snapshot]
+        return changed, list(removed)
+
+    def _record(self, group, updates, removed):
+        history = self._history.get(group)
+        if history is None:
+            history = self._history[group] = deque(maxlen=settings.GPS_REPLAY_BUFFER_SIZE)
+        history.append((self.seq, tuple(updates), tuple(removed)))
+
+    def connect(self):
+        """
+        Crea el cliente de Redis de la tarea de difusión.
+
+        Returns:
+            Redis: Cliente asíncrono que decodifica las respuestas como texto.
+        """
+        return aioredis.from_url(settings.GPS_REDIS_URL, encoding="utf-8", decode_responses=True)
+
+    def load_index(self):
+        """
+        Carga el índice IMEI → compañía (síncrono, se ejecuta en un hilo).
+        """
+        return load_company_index()
+
+    async def _index_loop(self):
+        while True:
+            try:
+                self.companies = await database_sync_to_async(self.load_index)()
+            except Exception as e:
+                logger.warning("No se pudo cargar el índice IMEI-compañía: %s", e)
+            self._index_ready.set()
+            await asyncio.sleep(settings.GPS_TENANT_INDEX_REFRESH)
+
+    def apply(self, raw_values, complete=False):
+        """
+        Actualiza la foto en memoria y calcula la diferencia con el estado anterior.
+
+        Args:
+            raw_values (dict): JSON original por IMEI; None indica que la clave ya no existe.
+            complete (bool): Si `raw_values` contiene todas las claves de Redis, los IMEI de la
+                foto que no aparecen se consideran eliminados.
+
+        Returns:
+            tuple: (`updates`, `removed`): documentos nuevos o modificados por IMEI y la lista
+            de IMEI eliminados.
+        """
+        updates = {}
+        removed = []
+        for key, raw in raw_values.items():
+            if raw is None:
+                if self._raw.pop(key, None) is not None:
+                    self.snapshot.pop(key, None)
+                    self.rows.pop(key, None)
+                    removed.append(key)
+            elif self._raw.get(key) != raw:
+                # Solo se decodifican los documentos que cambiaron
+                self._raw[key] = raw
+                self.snapshot[key] = updates[key] = json.loads(raw)
+                self.rows[key] = project(key, updates[key], self.fields)
+        if complete:
+            for key in [key for key in self._raw if key not in raw_values]:
+                del self._raw[key]
+                self.snapshot.pop(key, None)
+                self.rows.pop(key, None)
+                removed.append(key)
+        self.index.update(updates, removed)
+        return updates, removed
+
+    async def _run(self):
+        while True:
+            redis = self.connect()
+            try:
+                store = PositionStore(redis)
+                if settings.GPS_STREAM_MODE == "push":
+                    await self._listen(redis, store)
+                else:
+                    await self._poll(store)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Difusión GPS reiniciada tras un error: %s", e)
+                await asyncio.sleep(1)
+            finally:
+                await redis.close()
+
+    async def _sync(self, store):
+        # Lee todas las claves numéricas y difunde la diferencia con la foto en memoria
+        updates, removed = self.apply(await store.snapshot(), complete=True)
+        if not self._ready.is_set():
+            # Primera carga: los consumidores la reciben completa desde `get_snapshot`
+            self._ready.set()
+        elif updates or removed:
+            await self.broadcast(updates, removed)
+
+    async def _poll(self, store):
+        while True:
+            await self._sync(store)
+            await asyncio.sleep(settings.GPS_POLL_INTERVAL)
+
+    async def _listen(self, redis, store):
+        pubsub = redis.pubsub()
+        flusher = None
+        try:
+            if settings.GPS_CONFIGURE_KEYSPACE_EVENTS:
+                try:
+                    await configure_keyspace_events(redis)
+                except Exception as e:
+                    logger.warning("No se pudo activar notify-keyspace-events: %s", e)
+            db = redis.connection_pool.connection_kwargs.get("db", 0)
+            # El patrón se evalúa en Redis: solo llegan las claves que empiezan por un dígito,
+            # no las del channel layer (asgi:*) que comparten el servidor.
+            await pubsub.psubscribe(f"__keyspace@{db}__:[0-9]*")
+            if settings.GPS_PUSH_CHANNEL:
+                await pubsub.subscribe(settings.GPS_PUSH_CHANNEL)
+            # Carga completa después de suscribirse para no perder cambios intermedios
+            await self._sync(store)
+            flusher = asyncio.create_task(self._flush_loop(store))
+            async for message in pubsub.listen():
+                key = key_from_message(message)
+                if key:
+                    self._changed.add(key)
+        finally:
+            if flusher:
+                flusher.cancel()
+            await pubsub.close()
+
+    async def _flush_loop(self, store):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if not self._changed:
+                continue
+            keys, self._changed = list(self._changed), set()
+            updates, removed = self.apply(await store.fetch(keys))
+            if updates or removed:
+                await self.broadcast(updates, removed)
+
+    async def broadcast(self, updates, removed):
+        """
+        Envía las posiciones modificadas a los consumidores de este proceso.
+
+        Solo se envía a los grupos que tienen sockets locales: el grupo base recibe todos los
+        cambios y cada subgrupo de compañía solo los de sus dispositivos. Cada difusión lleva un
+        número de secuencia y queda en el historial de todos los grupos, tengan o no sockets.
+
+        Args:
+            updates (dict): Documentos actualizados indexados por IMEI.
+            removed (list): IMEI cuya clave ya no existe en Redis.
+        """
+        channel_layer = get_channel_layer()
+        self.seq += 1
+        self._record(self.group_name, updates, removed)
+        if self._listeners[self.group_name]:
+            await channel_layer.group_send(
+                self.group_name,
+                {"type": "gps.update", "updates": updates, "removed": removed, "seq": self.seq},
+            )
+        by_company = {}
+        for imei, document in updates.items():
+            group = self.company_group(self.companies.get(imei))
+            by_company.setdefault(group, ({}, []))[0][imei] = document
+        for imei in removed:
+            group = self.company_group(self.companies.get(imei))
+            by_company.setdefault(group, ({}, []))[1].append(imei)
+        for group, (company_updates, company_removed) in by_company.items():
+            self._record(group, company_updates, company_removed)
+            if not self._listeners[group]:
+                continue
+            await channel_layer.group_send(
+                group,
+                {
+                    "type": "gps.update",
+                    "updates": company_updates,
+                    "removed": company_removed,
+                    "seq": self.seq,
+                },
+            )
+
+
+position_hub = PositionHub()
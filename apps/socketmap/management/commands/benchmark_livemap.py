@@ -0,0 +1,296 @@
+"""
+Prueba de carga del mapa en vivo.
+
+Llena Redis con N documentos sintéticos, conecta M clientes simulados a `GPSConsumer` con el
+`WebsocketCommunicator` de channels, modifica posiciones a una tasa fija y reporta en JSON la
+latencia de extremo a extremo (escritura en Redis → mensaje recibido), mensajes y bytes por
+segundo, comandos de Redis por segundo y la memoria del proceso.
+
+Ejemplos:
+
+    python manage.py benchmark_livemap --devices 5000 --clients 200 --rate 500
+    python manage.py benchmark_livemap --redis-url redis://localhost:6379/15 --output bench.json
+
+Sin `--redis-url` se usa `fakeredis` (dependencia de desarrollo), de modo que la prueba no necesita
+servicios externos; en ese caso `redis_ops_per_second` es null porque fakeredis no lleva el
+contador de comandos. Con `--redis-url` las claves de prueba se eliminan al terminar.
+"""
+
+import asyncio
+import json
+import random
+import resource
+import time
+from types import SimpleNamespace
+
+import aioredis
+import msgpack
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from apps.socketmap.consumers import GPSConsumer
+from apps.socketmap.hub import position_hub
+from apps.socketmap.tenancy import Subscription
+
+PUSH_CHANNEL = "livemap-benchmark"
+# Prefijo de los IMEI sintéticos, fuera del rango de los dispositivos reales
+IMEI_PREFIX = 990000000000000
+
+
+class BenchmarkConsumer(GPSConsumer):
+    """
+    `GPSConsumer` con alcance de compañía raíz, sin consultar la base de datos.
+    """
+
+    async def get_subscription(self, user):
+        return Subscription()
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def rss_kb():
+    """
+    Retorna la memoria residente actual y el máximo del proceso en KB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        with open("/proc/self/statm") as statm:
+            current = int(statm.read().split()[1]) * resource.getpagesize() // 1024
+    except OSError:
+        current = None
+    return current, peak
+
+
+def fake_redis_factory():
+    try:
+        import fakeredis
+    except ImportError:
+        raise CommandError("Instale fakeredis o indique --redis-url para usar un Redis real")
+    server = fakeredis.FakeServer()
+
+    def factory():
+        client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        # El hub trabaja con el JSON original, sin los callbacks de decodificación
+        for command in [name for name in client.response_callbacks if name.startswith("JSON.")]:
+            client.response_callbacks.pop(command)
+        return client
+
+    return factory
+
+
+class Command(BaseCommand):
+    help = "Prueba de carga del mapa en vivo (GPSConsumer) con resultados en JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--devices", type=int, default=1000, help="Documentos en Redis")
+        parser.add_argument("--clients", type=int, default=50, help="Sockets simulados")
+        parser.add_argument("--rate", type=float, default=200, help="Posiciones por segundo")
+        parser.add_argument("--duration", type=float, default=10, help="Segundos de medición")
+        parser.add_argument("--mode", choices=["push", "poll"], default="push")
+        parser.add_argument("--format", choices=["legacy", "full", "compact"], default="legacy")
+        parser.add_argument("--encoding", choices=["json", "msgpack"], default="json")
+        parser.add_argument("--redis-url", help="Redis real; por defecto fakeredis")
+        parser.add_argument(
+            "--channel-layer",
+            choices=["memory", "configured"],
+            default="memory",
+            help="InMemoryChannelLayer o el channel layer de settings",
+        )
+        parser.add_argument("--output", help="Archivo para el JSON de resultados")
+
+    def handle(self, *args, **options):
+        if options["redis_url"]:
+            url = options["redis_url"]
+
+            def factory():
+                return aioredis.from_url(url, encoding="utf-8", decode_responses=True)
+        else:
+            factory = fake_redis_factory()
+
+        overrides = {
+            "GPS_STREAM_MODE": options["mode"],
+            "GPS_PUSH_CHANNEL": PUSH_CHANNEL,
+        }
+        if options["channel_layer"] == "memory":
+            overrides["CHANNEL_LAYERS"] = {
+                "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+            }
+        with override_settings(**overrides):
+            results = asyncio.run(self.run(factory, options))
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output)
+        self.stdout.write(output)
+
+    async def run(self, factory, options):
+        redis = factory()
+        imeis = [str(IMEI_PREFIX + number) for number in range(options["devices"])]
+        await self.seed(redis, imeis)
+
+        # El hub del proceso usa el Redis de la prueba y no consulta la base de datos; se
+        # restaura al terminar
+        patched = ("connect", "load_index", "fields")
+        original = {name: vars(position_hub)[name] for name in patched if name in vars(position_hub)}
+        position_hub.connect = factory
+        position_hub.load_index = dict
+        if options["format"] == "compact":
+            position_hub.fields = [*position_hub.fields, "bench_ts"]
+        try:
+            return await self.measure(redis, imeis, options)
+        finally:
+            position_hub.stop()
+            for name in patched:
+                vars(position_hub).pop(name, None)
+            vars(position_hub).update(original)
+            if options["redis_url"]:
+                for start in range(0, len(imeis), 1000):
+                    await redis.delete(*imeis[start:start + 1000])
+            await redis.close()
+
+    async def measure(self, redis, imeis, options):
+        query = ""
+        if options["format"] != "legacy":
+            query = f"?format={options['format']}&encoding={options['encoding']}"
+        stats = SimpleNamespace(frames=0, bytes=0, latencies=[])
+        communicators = []
+        connect_started = time.monotonic()
+        for number in range(options["clients"]):
+            communicator = WebsocketCommunicator(BenchmarkConsumer.as_asgi(), "/ws/gps/" + query)
+            communicator.scope["user"] = SimpleNamespace(is_authenticated=True)
+            connected, _ = await communicator.connect(timeout=30)
+            if not connected:
+                raise CommandError("El consumidor rechazó la conexión")
+            # Foto inicial
+            await communicator.receive_output(timeout=30)
+            communicators.append(communicator)
+        connect_seconds = time.monotonic() - connect_started
+
+        receivers = [
+            asyncio.create_task(self.receive(communicator, stats, options))
+            for communicator in communicators
+        ]
+        commands_before = await self.redis_commands(redis)
+        rss_before, _ = rss_kb()
+        started = time.monotonic()
+        written = await self.mutate(redis, imeis, options)
+        # Margen para recibir las últimas actualizaciones
+        await asyncio.sleep(1)
+        elapsed = time.monotonic() - started
+        commands_after = await self.redis_commands(redis)
+        rss_after, rss_peak = rss_kb()
+
+        for task in receivers:
+            task.cancel()
+        await asyncio.gather(*receivers, return_exceptions=True)
+        for communicator in communicators:
+            await communicator.disconnect()
+
+        latencies = [latency * 1000 for latency in stats.latencies]
+        redis_ops = None
+        if commands_before is not None and commands_after is not None:
+            redis_ops = round((commands_after - commands_before) / elapsed, 1)
+        return {
+            "config": {
+                key: options[key]
+                for key in (
+                    "devices", "clients", "rate", "duration", "mode", "format", "encoding",
+                    "channel_layer",
+                )
+            },
+            "redis": "real" if options["redis_url"] else "fakeredis",
+            "connect_seconds": round(connect_seconds, 3),
+            "positions_written": written,
+            "frames_per_second": round(stats.frames / elapsed, 1),
+            "bytes_per_second": round(stats.bytes / elapsed, 1),
+            "updates_received": len(latencies),
+            "latency_ms": {
+                "p50": percentile(latencies, 0.50),
+                "p90": percentile(latencies, 0.90),
+                "p99": percentile(latencies, 0.99),
+                "max": max(latencies) if latencies else None,
+            },
+            "redis_ops_per_second": redis_ops,
+            "rss_kb": {"before": rss_before, "after": rss_after, "peak": rss_peak},
+        }
+
+    def document(self, imei):
+        return {
+            "gps": {
+                "latitude": round(random.uniform(-4, 12), 6),
+                "longitude": round(random.uniform(-79, -67), 6),
+                "angle": random.randint(0, 359),
+                "calculated_speed": random.randint(0, 120),
+            },
+            "status_events": ["DIN1 On"],
+            "info_events": "",
+            "metadata": {"license": f"BEN{imei[-3:]}"},
+            "bench_ts": time.monotonic(),
+        }
+
+    async def seed(self, redis, imeis):
+        for start in range(0, len(imeis), 500):
+            async with redis.pipeline(transaction=False) as pipe:
+                for imei in imeis[start:start + 500]:
+                    pipe.execute_command("JSON.SET", imei, ".", json.dumps(self.document(imei)))
+                await pipe.execute()
+
+    async def mutate(self, redis, imeis, options):
+        # Escrituras agrupadas cada 10 ms para sostener la tasa pedida
+        tick = 0.01
+        written = 0
+        deadline = time.monotonic() + options["duration"]
+        carry = 0.0
+        while time.monotonic() < deadline:
+            carry += options["rate"] * tick
+            batch, carry = int(carry), carry - int(carry)
+            if batch:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for imei in random.sample(imeis, min(batch, len(imeis))):
+                        pipe.execute_command(
+                            "JSON.SET", imei, ".", json.dumps(self.document(imei))
+                        )
+                        pipe.publish(PUSH_CHANNEL, imei)
+                    await pipe.execute()
+                written += batch
+            await asyncio.sleep(tick)
+        return written
+
+    async def receive(self, communicator, stats, options):
+        while True:
+            message = await communicator.receive_output(timeout=3600)
+            payload = message.get("text") or message.get("bytes")
+            if payload is None:
+                continue
+            received = time.monotonic()
+            stats.frames += 1
+            stats.bytes += len(payload)
+            if options["encoding"] == "msgpack" and options["format"] != "legacy":
+                frame = msgpack.unpackb(payload)
+            else:
+                frame = json.loads(payload)
+            if options["format"] == "legacy":
+                vehicles = frame.values()
+            elif frame.get("type") in ("update", "snapshot"):
+                vehicles = frame["vehicles"]
+                vehicles = vehicles.values() if isinstance(vehicles, dict) else vehicles
+            else:
+                continue
+            for vehicle in vehicles:
+                sent = vehicle[-1] if isinstance(vehicle, list) else vehicle.get("bench_ts")
+                if sent is not None:
+                    stats.latencies.append(received - sent)
+
+    async def redis_commands(self, redis):
+        try:
+            info = await redis.info("stats")
+        except Exception:
+            return None
+        return info.get("total_commands_processed")
@@ -0,0 +1,84 @@
+"""
+Lectura en bloque de las posiciones guardadas en Redis.
+
+El servicio de ingesta guarda el último documento ReJSON de cada dispositivo en una clave cuyo
+nombre es el IMEI. Este módulo enumera esas claves con `SCAN` (o desde un set de IMEI activos,
+si la ingesta lo mantiene) y lee los documentos con `JSON.MGET` en lotes de tamaño configurable
+enviados en un único pipeline, en lugar de `KEYS *` seguido de un `JSON.GET` por clave.
+"""
+
+import re
+
+from django.conf import settings
+
+NUMERIC_KEY_PATTERN = re.compile(r"^\d+$")
+
+
+class PositionStore:
+    """
+    Acceso de solo lectura a los documentos de posición de Redis.
+
+    Args:
+        redis: Cliente asíncrono de Redis (aioredis) creado con `decode_responses=True`.
+        batch_size (int, optional): Número de claves por `SCAN`/`JSON.MGET`. Por defecto
+            `GPS_REDIS_BATCH_SIZE`.
+        active_set (str, optional): Set de Redis con los IMEI activos. Por defecto
+            `GPS_ACTIVE_SET_KEY`; si está vacío se recorre el keyspace con `SCAN`.
+    """
+
+    def __init__(self, redis, batch_size=None, active_set=None):
+        self.redis = redis
+        self.batch_size = batch_size or settings.GPS_REDIS_BATCH_SIZE
+        self.active_set = settings.GPS_ACTIVE_SET_KEY if active_set is None else active_set
+
+    async def keys(self):
+        """
+        Enumera los IMEI con documento en Redis sin bloquear el servidor.
+
+        Returns:
+            list: IMEI sin repetidos (`SCAN` puede devolver una clave más de una vez).
+        """
+        if self.active_set:
+            iterator = self.redis.sscan_iter(self.active_set, count=self.batch_size)
+        else:
+            # El patrón descarta en Redis las claves del channel layer (asgi:*) y similares
+            iterator = self.redis.scan_iter(match="[0-9]*", count=self.batch_size)
+        keys = {}
+        async for key in iterator:
+            if NUMERIC_KEY_PATTERN.match(key):
+                keys[key] = None
+        return list(keys)
+
+    async def fetch(self, keys):
+        """
+        Lee el JSON original de varias claves en un único viaje a Redis.
+
+        Args:
+            keys (list): IMEI a consultar.
+
+        Returns:
+            dict: JSON original por IMEI; None si la clave no existe.
+        """
+        if not keys:
+            return {}
+        batches = [
+            keys[start:start + self.batch_size]
+            for start in range(0, len(keys), self.batch_size)
+        ]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for batch in batches:
+                pipe.execute_command("JSON.MGET", *batch, ".")
+            results = await pipe.execute()
+        values = {}
+        for batch, raw_values in zip(batches, results):
+            values.update(zip(batch, raw_values))
+        return values
+
+    async def snapshot(self):
+        """
+        Lee todos los documentos de posición.
+
+        Returns:
+            dict: JSON original por IMEI.
+        """
+        return await self.fetch(await self.keys())
@@ -0,0 +1,108 @@
+"""
+Alcance de las suscripciones del mapa en vivo.
+
+Cada socket recibe únicamente los vehículos de las compañías que el usuario puede ver y, si el
+usuario tiene vehículos o grupos de vehículos asignados, solo esos vehículos. El alcance se
+resuelve una sola vez al conectarse; las difusiones se filtran en memoria con el índice
+IMEI → compañía que mantiene `PositionHub`.
+"""
+
+from django.db.models import Q
+
+from apps.realtime.models import Device, Vehicle
+from apps.whitelabel.models import Company
+
+
+class Subscription:
+    """
+    Alcance de un socket del mapa en vivo.
+
+    Attributes:
+        companies (set | None): IDs de las compañías visibles; None para todas (compañía raíz).
+        imeis (set | None): IMEI permitidos cuando el usuario tiene vehículos o grupos asignados;
+            None si no hay restricción por vehículo.
+    """
+
+    def __init__(self, companies=None, imeis=None):
+        self.companies = companies
+        self.imeis = imeis
+
+    def allows(self, imei, company_id):
+        """
+        Indica si el socket puede ver el dispositivo.
+
+        Args:
+            imei (str): IMEI del dispositivo.
+            company_id (int | None): Compañía del dispositivo según el índice del proceso.
+
+        Returns:
+            bool: True si el dispositivo está dentro del alcance.
+        """
+        if self.imeis is not None and imei not in self.imeis:
+            return False
+        return self.companies is None or company_id in self.companies
+
+    def filter(self, documents, company_index):
+        """
+        Filtra un diccionario de documentos por IMEI según el alcance.
+
+        Args:
+            documents (dict): Documentos indexados por IMEI.
+            company_index (dict): Índice IMEI → ID de compañía.
+
+        Returns:
+            dict: Solo los documentos visibles para el socket.
+        """
+        if self.companies is None and self.imeis is None:
+            return documents
+        return {
+            imei: document
+            for imei, document in documents.items()
+            if self.allows(imei, company_index.get(imei))
+        }
+
+
+def resolve_subscription(user):
+    """
+    Calcula el alcance del mapa en vivo para un usuario autenticado.
+
+    Sigue las mismas reglas que el resto de la plataforma: la compañía raíz (ID 1) ve todas las
+    compañías, un usuario con compañías a monitorear ve solo esas y los demás ven su compañía y
+    las compañías de las que es proveedor.
+
+    Args:
+        user (User): Usuario del `scope` del websocket.
+
+    Returns:
+        Subscription: Alcance del socket.
+    """
+    if user.company_id == 1:
+        companies = None
+    elif user.companies_to_monitor.exists():
+        companies = set(user.companies_to_monitor.values_list("id", flat=True))
+    else:
+        companies = set(
+            Company.objects.filter(
+                Q(id=user.company_id) | Q(provider_id=user.company_id)
+            ).values_list("id", flat=True)
+        )
+
+    imeis = None
+    if user.vehicles_to_monitor.exists() or user.group_vehicles.exists():
+        imeis = set(
+            Vehicle.objects.filter(
+                Q(vehicles_to_monitor=user) | Q(vehiclegroup__group_vehicles=user),
+                device__isnull=False,
+            ).values_list("device_id", flat=True)
+        )
+    return Subscription(companies, imeis)
+
+
+def load_company_index():
+    """
+    Construye el índice IMEI → compañía de todos los dispositivos.
+
+    Returns:
+        dict: ID de compañía por IMEI.
+    """
+    return dict(Device.objects.values_list("imei", "company_id"))
@@ -1,3 +1,624 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .consumers import GPSConsumer
+from .frames import encode, project
+from .history_cache import cached_history
+from .hub import (PositionHub, configure_keyspace_events, key_from_message, local_group_name,
+                  merge_keyspace_flags, position_hub)
+from .store import PositionStore
+from .tenancy import Subscription
+from .tracks import simplify_track
+from .viewport import GridIndex, Viewport
+from . import views
+from .views import iter_json_fragments
+
+IN_MEMORY_LAYER = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+class KeyFromMessageTestCase(SimpleTestCase):
+    def test_keyspace_notification(self):
+        message = {
+            "type": "pmessage",
+            "pattern": "__keyspace@0__:[0-9]*",
+            "channel": "__keyspace@0__:860896051234567",
+            "data": "json.set",
+        }
+        self.assertEqual(key_from_message(message), "860896051234567")
+
+    def test_publish_channel(self):
+        message = {"type": "message", "channel": "gps", "data": "860896051234567"}
+        self.assertEqual(key_from_message(message), "860896051234567")
+
+    def test_non_numeric_keys_are_ignored(self):
+        message = {"type": "pmessage", "channel": "__keyspace@0__:1commands", "data": "set"}
+        self.assertIsNone(key_from_message(message))
+        self.assertIsNone(key_from_message({"type": "psubscribe", "data": 1}))
+
+    def test_local_group_name(self):
+        name = local_group_name()
+        self.assertTrue(name.startswith("gps_updates."))
+        self.assertLess(len(name), 100)
+
+
+class KeyspaceFlagsTestCase(SimpleTestCase):
+    def test_only_missing_classes_are_added(self):
+        self.assertEqual(merge_keyspace_flags(""), "Kdgx")
+        self.assertEqual(merge_keyspace_flags("Ex"), "ExKdg")
+        self.assertEqual(merge_keyspace_flags("KA"), "KA")
+        self.assertEqual(merge_keyspace_flags("AE"), "AEK")
+
+    def test_existing_configuration_is_kept(self):
+        class ConfigRedis:
+            def __init__(self, value):
+                self.value = value
+                self.calls = []
+
+            async def config_get(self, name):
+                return {name: self.value}
+
+            async def config_set(self, name, value):
+                self.calls.append((name, value))
+
+        redis = ConfigRedis("Elg")
+        async_to_sync(configure_keyspace_events)(redis)
+        self.assertEqual(redis.calls, [("notify-keyspace-events", "ElgKdx")])
+        redis = ConfigRedis("AK")
+        async_to_sync(configure_keyspace_events)(redis)
+        self.assertEqual(redis.calls, [])
+
+
+class FakeRedis:
+    """Cliente mínimo que registra los comandos enviados por `PositionStore`."""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.commands = []
+
+    async def scan_iter(self, match=None, count=None):
+        for key in ["asgi:group", *self.documents, "1"]:
+            yield key
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queued = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def execute_command(self, *args):
+        self.queued.append(args)
+
+    async def execute(self):
+        self.redis.commands.extend(self.queued)
+        return [[self.redis.documents.get(key) for key in args[1:-1]] for args in self.queued]
+
+
+class PositionStoreTestCase(SimpleTestCase):
+    def test_snapshot_uses_batched_mget(self):
+        redis = FakeRedis({"1": "{}", "2": "{}", "3": "{}", "1commands": "[]"})
+        store = PositionStore(redis, batch_size=2, active_set="")
+        snapshot = async_to_sync(store.snapshot)()
+        self.assertEqual(snapshot, {"1": "{}", "2": "{}", "3": "{}"})
+        self.assertEqual(
+            redis.commands,
+            [("JSON.MGET", "1", "2", "."), ("JSON.MGET", "3", ".")],
+        )
+
+    def test_missing_keys_are_none(self):
+        store = PositionStore(FakeRedis({}), batch_size=10, active_set="")
+        self.assertEqual(async_to_sync(store.fetch)(["9"]), {"9": None})
+        self.assertEqual(async_to_sync(store.fetch)([]), {})
+
+
+class FramesTestCase(SimpleTestCase):
+    def test_project(self):
+        document = {"gps": {"latitude": 4.6, "longitude": -74.1, "angle": 90}, "status_events": []}
+        row = project("1", document, ["gps.latitude", "gps.angle", "gps.signal_date", "metadata.x"])
+        self.assertEqual(row, ["1", 4.6, 90, None, None])
+
+    def test_encode(self):
+        self.assertEqual(encode({"a": [1]}, "json"), {"text_data": '{"a":[1]}'})
+        self.assertIsInstance(encode({"a": [1]}, "msgpack")["bytes_data"], bytes)
+
+
+class PositionHubApplyTestCase(SimpleTestCase):
+    def setUp(self):
+        self.hub = PositionHub()
+        self.hub.apply({"1": '{"gps": {"latitude": 1}}', "2": '{"gps": {"latitude": 2}}'})
+
+    def test_only_changed_documents_are_returned(self):
+        updates, removed = self.hub.apply(
+            {"1": '{"gps": {"latitude": 1}}', "2": '{"gps": {"latitude": 3}}'}
+        )
+        self.assertEqual(updates, {"2": {"gps": {"latitude": 3}}})
+        self.assertEqual(removed, [])
+        self.assertEqual(self.hub.snapshot["2"], {"gps": {"latitude": 3}})
+        self.assertEqual(self.hub.rows["2"][:2], ["2", 3])
+
+    def test_missing_keys_are_removed(self):
+        updates, removed = self.hub.apply({"1": None})
+        self.assertEqual((updates, removed), ({}, ["1"]))
+        updates, removed = self.hub.apply({"3": '{}'}, complete=True)
+        self.assertEqual(updates, {"3": {}})
+        self.assertEqual(removed, ["2"])
+        self.assertEqual(set(self.hub.snapshot), {"3"})
+
+
+class SubscriptionTestCase(SimpleTestCase):
+    def test_company_scope(self):
+        subscription = Subscription(companies={10})
+        documents = {"1": {}, "2": {}, "3": {}}
+        self.assertEqual(subscription.filter(documents, {"1": 10, "2": 20}), {"1": {}})
+
+    def test_vehicle_scope(self):
+        subscription = Subscription(companies={10}, imeis={"2"})
+        self.assertFalse(subscription.allows("1", 10))
+        self.assertTrue(subscription.allows("2", 10))
+
+    def test_root_company_sees_everything(self):
+        documents = {"1": {}, "2": {}}
+        self.assertIs(Subscription().filter(documents, {}), documents)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER)
+class PositionHubBroadcastTestCase(SimpleTestCase):
+    def test_updates_are_split_by_company(self):
+        hub = PositionHub()
+        hub.companies = {"1": 10, "2": 20}
+        channel_layer = get_channel_layer()
+
+        async def scenario():
+            company_channel = await channel_layer.new_channel()
+            root_channel = await channel_layer.new_channel()
+            await channel_layer.group_add(hub.company_group(10), company_channel)
+            await channel_layer.group_add(hub.group_name, root_channel)
+            hub.subscribe(Subscription(companies={10}))
+            hub.subscribe(Subscription())
+            await hub.broadcast({"1": {"a": 1}, "2": {"a": 2}}, ["3"])
+            return (
+                await channel_layer.receive(company_channel),
+                await channel_layer.receive(root_channel),
+            )
+
+        company_message, root_message = async_to_sync(scenario)()
+        self.assertEqual(company_message["updates"], {"1": {"a": 1}})
+        self.assertEqual(company_message["removed"], [])
+        self.assertEqual(set(root_message["updates"]), {"1", "2"})
+        self.assertEqual(root_message["removed"], ["3"])
+
+    def test_replay_missed_changes(self):
+        hub = PositionHub()
+        hub.companies = {"1": 10, "2": 20, "3": 10}
+        hub.snapshot = {"1": {}, "2": {}}
+        subscription = Subscription(companies={10})
+        async_to_sync(hub.broadcast)({"1": {}}, [])
+        async_to_sync(hub.broadcast)({"2": {}}, [])
+        async_to_sync(hub.broadcast)({"3": {}}, [])
+        async_to_sync(hub.broadcast)({}, ["3"])
+        self.assertEqual(hub.replay(subscription, hub.epoch, 0), (["1"], ["3"]))
+        self.assertEqual(hub.replay(subscription, hub.epoch, 1), ([], ["3"]))
+        self.assertEqual(hub.replay(Subscription(), hub.epoch, 1), (["2"], ["3"]))
+        self.assertIsNone(hub.replay(subscription, "otro", 1))
+        self.assertIsNone(hub.replay(subscription, hub.epoch, 9))
+
+    @override_settings(GPS_REPLAY_BUFFER_SIZE=2)
+    def test_replay_gap_requires_snapshot(self):
+        hub = PositionHub()
+        for imei in ("1", "2", "3"):
+            async_to_sync(hub.broadcast)({imei: {}}, [])
+        self.assertIsNone(hub.replay(Subscription(), hub.epoch, 0))
+        self.assertIsNotNone(hub.replay(Subscription(), hub.epoch, 1))
+
+    def test_groups_without_sockets_are_skipped(self):
+        hub = PositionHub()
+        subscription = Subscription(companies={10})
+        hub.subscribe(subscription)
+        hub.unsubscribe(subscription)
+        self.assertEqual(hub._listeners[hub.company_group(10)], 0)
+        self.assertNotIn(hub.company_group(10), hub._listeners)
+
+
+class GridIndexTestCase(SimpleTestCase):
+    def setUp(self):
+        self.index = GridIndex()
+        self.index.update({
+            "1": {"gps": {"latitude": 4.60, "longitude": -74.08}},
+            "2": {"gps": {"latitude": 4.61, "longitude": -74.07}},
+            "3": {"gps": {"latitude": 6.24, "longitude": -75.58}},
+            "4": {"gps": {"latitude": 0, "longitude": 179.5}},
+            "5": {"gps": {}},
+        })
+
+    def test_query_bbox(self):
+        viewport = Viewport.from_message({"bbox": [-74.2, 4.5, -74.0, 4.7], "zoom": 14})
+        self.assertEqual(sorted(self.index.query(viewport)), ["1", "2"])
+        self.index.update({"2": {"gps": {"latitude": 10, "longitude": 10}}}, ["1"])
+        self.assertEqual(self.index.query(viewport), [])
+
+    def test_query_across_antimeridian(self):
+        viewport = Viewport.from_message({"bbox": [170, -10, 190, 10], "zoom": 5})
+        self.assertEqual(self.index.query(viewport), ["4"])
+
+    def test_clusters(self):
+        viewport = Viewport.from_message({"bbox": [-80, 0, -70, 10], "zoom": 4})
+        clusters = self.index.clusters(viewport, self.index.query(viewport))
+        counts = sorted(cluster["count"] for cluster in clusters)
+        self.assertEqual(counts, [1, 2])
+        single = next(cluster for cluster in clusters if cluster["count"] == 1)
+        self.assertEqual(single["imei"], "3")
+
+    def test_invalid_bbox(self):
+        with self.assertRaises(ValueError):
+            Viewport.from_message({"bbox": [0, 10, 1, 5]})
+        self.assertIsNone(Viewport.from_message({"zoom": 3}))
+
+    def test_non_finite_bbox_is_rejected(self):
+        for value in (float("nan"), float("inf"), float("-inf"), "NaN"):
+            with self.assertRaises(ValueError):
+                Viewport.from_message({"bbox": [value, 4.5, -74.0, 4.7], "zoom": 10})
+        with self.assertRaises(ValueError):
+            Viewport.from_message({"bbox": [-74.2, 4.5, -74.0, 4.7], "zoom": float("inf")})
+
+    def test_zoom_is_clamped(self):
+        low = Viewport.from_message({"bbox": [-80, 0, -70, 10], "zoom": -1100})
+        high = Viewport.from_message({"bbox": [-80, 0, -70, 10], "zoom": 1100})
+        self.assertEqual((low.zoom, high.zoom), (0, 22))
+        self.assertEqual(low.cluster_size(), 90)
+        self.assertGreater(high.cluster_size(), 0)
+
+
+class GPSConsumerCoalescingTestCase(SimpleTestCase):
+    def test_latest_document_wins(self):
+        consumer = GPSConsumer()
+        consumer.subscription = Subscription()
+        async_to_sync(consumer.gps_update)({"updates": {"1": {"a": 1}}, "removed": []})
+        async_to_sync(consumer.gps_update)({"updates": {"1": {"a": 2}}, "removed": []})
+        self.assertEqual(consumer.take_pending(), [{"text_data": '{"1": {"a": 2}}'}])
+        self.assertEqual(consumer.take_pending(), [])
+
+    def test_removed_devices_replace_pending_updates(self):
+        consumer = GPSConsumer()
+        consumer.subscription = Subscription()
+        consumer.envelope = True
+        consumer.visible = {"1"}
+        async_to_sync(consumer.gps_update)({"updates": {"1": {"a": 1}}, "removed": []})
+        async_to_sync(consumer.gps_update)({"updates": {}, "removed": ["1"]})
+        self.assertEqual(
+            consumer.take_pending(),
+            [{"text_data": '{"type":"update","vehicles":{},"removed":["1"],"seq":0}'}],
+        )
+
+
+@override_settings(
+    GPS_ACK_WINDOW_FRAMES=3, GPS_ACK_WINDOW_BYTES=1000, GPS_SLOW_CONSUMER_TIMEOUT=0.05
+)
+class GPSConsumerFlowControlTestCase(SimpleTestCase):
+    def consumer(self):
+        consumer = GPSConsumer()
+        consumer.subscription = Subscription()
+        consumer.envelope = True
+        consumer.sent = []
+
+        async def base_send(message):
+            consumer.sent.append(message)
+
+        consumer.base_send = base_send
+        return consumer
+
+    def test_clients_without_acks_have_no_window(self):
+        consumer = self.consumer()
+        for _ in range(10):
+            async_to_sync(consumer.send)(text_data="{}")
+        self.assertFalse(consumer.window_full())
+
+    def test_window_counts_frames_and_bytes_since_the_ack(self):
+        consumer = self.consumer()
+        async_to_sync(consumer.send)(text_data="{}")
+        consumer.acknowledge(1)
+        for _ in range(3):
+            async_to_sync(consumer.send)(text_data="{}")
+        self.assertTrue(consumer.window_full())
+        consumer.acknowledge(3)
+        self.assertFalse(consumer.window_full())
+        async_to_sync(consumer.send)(bytes_data=b"x" * 1000)
+        self.assertTrue(consumer.window_full())
+
+    def test_updates_wait_for_the_ack_and_then_resume(self):
+        consumer = self.consumer()
+
+        async def scenario():
+            consumer.acknowledge(0)
+            for _ in range(3):
+                await consumer.send(text_data="{}")
+            task = asyncio.create_task(consumer._sender())
+            await consumer.gps_update({"updates": {"1": {"a": 1}}, "removed": []})
+            await asyncio.sleep(0.01)
+            held = len(consumer.sent)
+            consumer.acknowledge(4)
+            await asyncio.sleep(0.01)
+            task.cancel()
+            return held
+
+        held = async_to_sync(scenario)()
+        # Tres mensajes previos y el aviso `throttled`; el cambio sale tras el acuse
+        self.assertEqual(held, 4)
+        self.assertIn('"type":"throttled"', consumer.sent[3]["text"])
+        self.assertIn('"type":"update"', consumer.sent[5]["text"])
+
+    def test_throttling_ends_when_the_client_catches_up(self):
+        consumer = self.consumer()
+
+        async def scenario():
+            consumer.acknowledge(0)
+            for _ in range(3):
+                await consumer.send(text_data="{}")
+            task = asyncio.create_task(consumer._sender())
+            consumer._wake.set()
+            await asyncio.sleep(0.01)
+            throttled = consumer.flush_interval()
+            # Un acuse parcial no basta
+            consumer.acknowledge(2)
+            await asyncio.sleep(0.01)
+            partial = consumer.flush_interval()
+            consumer.acknowledge(4)
+            await asyncio.sleep(0.01)
+            task.cancel()
+            return throttled, partial
+
+        with override_settings(GPS_SLOW_CONSUMER_INTERVAL=5):
+            throttled, partial = async_to_sync(scenario)()
+        self.assertEqual((throttled, partial), (5, 5))
+        self.assertEqual(consumer.flush_interval(), 0)
+        self.assertEqual(
+            [json.loads(message["text"]) for message in consumer.sent[3:]],
+            [{"type": "throttled", "interval": 5}, {"type": "throttled", "interval": 0}],
+        )
+
+    def test_socket_is_closed_without_acks(self):
+        consumer = self.consumer()
+
+        async def scenario():
+            consumer.acknowledge(0)
+            for _ in range(3):
+                await consumer.send(text_data="{}")
+            consumer._wake.set()
+            await asyncio.wait_for(consumer._sender(), 1)
+
+        async_to_sync(scenario)()
+        self.assertEqual(consumer.sent[-1], {"type": "websocket.close", "code": 4008})
+
+
+class PositionHubIdleTestCase(SimpleTestCase):
+    def test_hub_stops_without_sockets(self):
+        hub = PositionHub()
+        subscription = Subscription()
+
+        async def scenario():
+            hub._task = asyncio.get_running_loop().create_future()
+            hub.subscribe(subscription)
+            hub.unsubscribe(subscription)
+            scheduled = hub._idle_handle is not None
+            hub.subscribe(subscription)
+            kept = hub._idle_handle is None and not hub._task.cancelled()
+            hub.unsubscribe(subscription)
+            hub.stop()
+            return scheduled, kept
+
+        with override_settings(GPS_HUB_IDLE_TIMEOUT=60):
+            scheduled, kept = async_to_sync(scenario)()
+        self.assertTrue(scheduled)
+        self.assertTrue(kept)
+        self.assertIsNone(hub._task)
+        self.assertFalse(hub._ready.is_set())
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.closed = False
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+class IterJsonFragmentsTestCase(SimpleTestCase):
+    def test_fragments_are_streamed_unchanged(self):
+        cursor = FakeCursor([('{"b":"é"},',), ('{"c":3}]',)])
+        chunks = list(iter_json_fragments(cursor, [('[{"a":1},',)], 1))
+        self.assertEqual(b"".join(chunks).decode("utf-8"), '[{"a":1},{"b":"é"},{"c":3}]')
+        self.assertTrue(cursor.closed)
+
+    def test_cursor_closed_when_client_disconnects(self):
+        cursor = FakeCursor([("x",)])
+        chunks = iter_json_fragments(cursor, [("[",)], 1)
+        next(chunks)
+        chunks.close()
+        self.assertTrue(cursor.closed)
+
+
+class VehicleHistoryStreamTestCase(SimpleTestCase):
+    def post(self, cursor):
+        cursor.execute = lambda sql, params: None
+        request = RequestFactory().post(
+            "/history", {"Imei": "1", "FechaInicial": "a", "FechaFinal": "b"},
+            content_type="application/json",
+        )
+        with mock.patch.object(views, "connection") as connection:
+            connection.cursor.return_value = cursor
+            return views.vehicle_history_stream(request)
+
+    def test_history_is_read_inside_the_view(self):
+        cursor = FakeCursor([('[{"a":1},',), ('{"b":"é"}]',)])
+        response = self.post(cursor)
+        # El cursor ya se cerró: la respuesta sale de un archivo temporal
+        self.assertTrue(cursor.closed)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertFalse(response["Content-Disposition"].startswith("attachment"))
+        content = b"".join(response.streaming_content).decode("utf-8")
+        self.assertEqual(json.loads(content), [{"a": 1}, {"b": "é"}])
+
+    def test_empty_history(self):
+        cursor = FakeCursor([])
+        response = self.post(cursor)
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(cursor.closed)
+
+
+def track(points):
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [longitude, latitude]},
+                "properties": {"event": event, "signal_date": f"2024-01-01T00:{minute:02d}:00"},
+            }
+            for minute, (longitude, latitude, event) in enumerate(points)
+        ],
+    }
+
+
+class SimplifyTrackTestCase(SimpleTestCase):
+    def test_straight_segment_is_reduced(self):
+        data = track([(-74 + i * 0.001, 4.6, "Posición") for i in range(50)])
+        simplified = simplify_track(data, tolerance=0.0001)
+        self.assertEqual(len(simplified["features"]), 2)
+        self.assertEqual(len(data["features"]), 50)
+
+    def test_event_points_and_corners_are_kept(self):
+        points = [(-74 + i * 0.001, 4.6, "Posición") for i in range(20)]
+        points += [(-73.981, 4.6 + i * 0.001, "Posición") for i in range(1, 20)]
+        points[7] = (points[7][0], points[7][1], "Encendido")
+        simplified = simplify_track(track(points), zoom=12)
+        events = [feature["properties"]["event"] for feature in simplified["features"]]
+        self.assertIn("Encendido", events)
+        corner = [feature["geometry"]["coordinates"] for feature in simplified["features"]]
+        self.assertIn([-73.981, 4.6], corner)
+        self.assertLess(len(simplified["features"]), 10)
+
+    def test_max_points(self):
+        points = [(-74 + i * 0.01, 4.6 + (i % 2) * 0.01, "Posición") for i in range(200)]
+        simplified = simplify_track(track(points), max_points=20)
+        self.assertLessEqual(len(simplified["features"]), 20)
+
+    def test_other_structures_are_unchanged(self):
+        self.assertEqual(simplify_track([1, 2], tolerance=1), [1, 2])
+        data = track([(0, 0, "a"), (1, 1, "a"), (2, 2, "a")])
+        self.assertIs(simplify_track(data), data)
+
+
+LOCMEM_HISTORY = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "history": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "history-tests",
+    },
+}
+
+
+@override_settings(CACHES=LOCMEM_HISTORY, HISTORY_CACHE_BUCKET=3600, HISTORY_CACHE_GRACE=0)
+class CachedHistoryTestCase(SimpleTestCase):
+    def setUp(self):
+        from django.core.cache import caches
+
+        caches["history"].clear()
+        self.calls = []
+
+    # Un registro cada 30 minutos, más uno con fracciones de segundo al final de cada hora
+    moments = sorted(
+        [datetime(2024, 1, 1) + timedelta(minutes=minutes) for minutes in range(0, 24 * 60, 30)]
+        + [datetime(2024, 1, 1, hour, 59, 59, 500000) for hour in range(24)]
+    )
+
+    def fetch(self, start, end):
+        # Como el procedimiento: registros entre las dos fechas, ambas incluidas
+        self.calls.append((start, end))
+        first = datetime.strptime(start, "%Y-%m-%d %H:%M:%S")
+        last = datetime.strptime(end, "%Y-%m-%d %H:%M:%S")
+        items = [
+            {"signal_date": moment.isoformat(timespec="milliseconds")}
+            for moment in self.moments
+            if first <= moment <= last
+        ]
+        return json.dumps(items) if items else ""
+
+    def history(self, start, end):
+        return cached_history(
+            "GetAVLData", self.fetch, 1, "123", start, end, now=datetime(2024, 1, 1, 12)
+        )
+
+    def test_closed_buckets_are_cached(self):
+        start, end = datetime(2024, 1, 1, 1, 15), datetime(2024, 1, 1, 11, 50)
+        first = self.history(start, end)
+        self.assertEqual(first, json.loads(self.fetch("2024-01-01 01:15:00", "2024-01-01 11:50:00")))
+        self.calls = []
+        self.assertEqual(self.history(start, end), first)
+        # Solo los extremos parciales vuelven a SQL Server
+        self.assertEqual(
+            self.calls,
+            [("2024-01-01 01:15:00", "2024-01-01 02:00:00"),
+             ("2024-01-01 11:00:00", "2024-01-01 11:50:00")],
+        )
+
+    def test_bucket_boundaries_keep_fractional_seconds(self):
+        start, end = datetime(2024, 1, 1, 1, 15), datetime(2024, 1, 1, 11, 50)
+        for _ in range(2):
+            dates = [item["signal_date"] for item in self.history(start, end)]
+            # Cada registro una sola vez, incluidos los de HH:59:59.500
+            self.assertEqual(len(dates), len(set(dates)))
+            self.assertIn("2024-01-01T01:59:59.500", dates)
+            self.assertIn("2024-01-01T05:59:59.500", dates)
+            self.assertIn("2024-01-01T02:00:00.000", dates)
+            self.assertEqual(dates, sorted(dates))
+
+    def test_open_range_is_not_cached(self):
+        start, end = datetime(2024, 1, 1, 11, 30), datetime(2024, 1, 1, 12)
+        self.history(start, end)
+        self.history(start, end)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_empty_range(self):
+        self.assertIsNone(self.history(datetime(2024, 1, 2), datetime(2024, 1, 2, 1)))
+
+
+class BenchmarkLivemapCommandTestCase(SimpleTestCase):
+    def test_command_runs_with_fakeredis(self):
+        stdout = io.StringIO()
+        call_command(
+            "benchmark_livemap",
+            devices=5,
+            clients=2,
+            rate=50,
+            duration=0.2,
+            format="compact",
+            stdout=stdout,
+        )
+        results = json.loads(stdout.getvalue())
+        self.assertEqual(results["redis"], "fakeredis")
+        self.assertEqual(results["config"]["clients"], 2)
+        self.assertGreater(results["positions_written"], 0)
+        self.assertGreater(results["updates_received"], 0)
+        # El hub del proceso vuelve a su configuración
+        self.assertNotIn("connect", vars(position_hub))
+        self.assertNotIn("bench_ts", position_hub.fields)
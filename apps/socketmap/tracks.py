@@ -0,0 +1,147 @@
+"""
+Simplificación de recorridos para la reproducción del historial.
+
+`GetVehicleHistory` retorna un GeoJSON (`FeatureCollection`) con un punto por reporte AVL. Para
+recorridos largos vistos con poco zoom la mayoría de esos puntos no se distinguen en pantalla,
+por lo que `simplify_track` reduce los puntos con Douglas–Peucker (tolerancia en grados,
+derivada del zoom si no se indica) y, si aún sobran, con un muestreo por intervalos de tiempo.
+
+Los puntos de evento (cambios de `event` o `main_event`, como encendido o alarmas) y los
+extremos del recorrido se conservan siempre; la simplificación se hace entre cada par de
+puntos conservados.
+"""
+
+import numpy as np
+
+EVENT_PROPERTIES = ("event", "main_event")
+
+
+def tolerance_for_zoom(zoom):
+    """
+    Retorna la tolerancia en grados equivalente a un píxel con el zoom indicado.
+
+    Args:
+        zoom (int): Nivel de zoom del mapa (teselas de 256 px).
+
+    Returns:
+        float: Grados por píxel en el ecuador.
+    """
+    return 360 / (256 * 2 ** zoom)
+
+
+def _event_mask(properties):
+    # Primer y último punto, y todo punto cuyo evento cambia respecto al anterior o al siguiente
+    count = len(properties)
+    keep = np.zeros(count, dtype=bool)
+    keep[[0, -1]] = True
+    for name in EVENT_PROPERTIES:
+        values = np.array([str(item.get(name)) for item in properties], dtype=object)
+        changed = values[1:] != values[:-1]
+        keep[1:] |= changed
+        keep[:-1] |= changed
+    return keep
+
+
+def _douglas_peucker(x, y, start, end, tolerance, keep):
+    # Versión iterativa: cada tramo calcula las distancias de todos sus puntos de una vez
+    stack = [(start, end)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(px, py)
+        else:
+            distances = np.abs(px * dy - py * dx) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            middle = first + 1 + index
+            keep[middle] = True
+            stack.append((first, middle))
+            stack.append((middle, last))
+
+
+def _time_buckets(properties, keep, forced, max_points):
+    # Conserva el primer punto de cada intervalo de tiempo hasta completar `max_points`
+    candidates = np.flatnonzero(keep & ~forced)
+    budget = max_points - int(forced.sum())
+    if len(candidates) <= max(budget, 0):
+        return keep
+    result = forced.copy()
+    if budget <= 0:
+        return result
+    try:
+        times = np.array(
+            [properties[index].get("signal_date") for index in candidates], dtype="datetime64[s]"
+        ).astype(np.int64)
+    except (TypeError, ValueError):
+        # Sin fechas utilizables se muestrea por posición
+        times = candidates.astype(np.int64)
+    span = max(int(times[-1] - times[0]), 1)
+    buckets = ((times - times[0]) * budget // (span + 1)).astype(np.int64)
+    _, first_of_bucket = np.unique(buckets, return_index=True)
+    result[candidates[first_of_bucket]] = True
+    return result
+
+
+def simplify_track(data, tolerance=None, max_points=None, zoom=None):
+    """
+    Reduce los puntos de un recorrido GeoJSON.
+
+    Args:
+        data (dict): `FeatureCollection` de `GetVehicleHistory`.
+        tolerance (float, optional): Distancia máxima en grados entre el recorrido original y el
+            simplificado.
+        max_points (int, optional): Número máximo de puntos a retornar (los puntos de evento se
+            conservan aunque lo superen).
+        zoom (int, optional): Zoom del mapa; define la tolerancia si no se indica.
+
+    Returns:
+        dict: El mismo GeoJSON con menos puntos. Las features que no son puntos no se modifican
+        y cualquier otra estructura se retorna sin cambios.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("features"), list):
+        return data
+    if tolerance is None and zoom is not None:
+        tolerance = tolerance_for_zoom(zoom)
+    if tolerance is None and max_points is None:
+        return data
+
+    features = data["features"]
+    point_indexes = [
+        index
+        for index, feature in enumerate(features)
+        if (feature.get("geometry") or {}).get("type") == "Point"
+    ]
+    if len(point_indexes) < 3:
+        return data
+    points = [features[index] for index in point_indexes]
+    coordinates = np.array([feature["geometry"]["coordinates"][:2] for feature in points], float)
+    properties = [feature.get("properties") or {} for feature in points]
+
+    forced = _event_mask(properties)
+    keep = forced.copy()
+    if tolerance is not None:
+        # Longitud escalada por la latitud media para medir distancias aproximadamente iguales
+        y = coordinates[:, 1]
+        x = coordinates[:, 0] * np.cos(np.radians(np.nanmean(y)))
+        anchors = np.flatnonzero(forced)
+        for start, end in zip(anchors[:-1], anchors[1:]):
+            _douglas_peucker(x, y, start, end, tolerance, keep)
+    else:
+        keep[:] = True
+    if max_points is not None:
+        keep = _time_buckets(properties, keep, forced, max_points)
+
+    kept = {point_indexes[index] for index in np.flatnonzero(keep)}
+    points_set = set(point_indexes)
+    simplified = dict(data)
+    simplified["features"] = [
+        feature
+        for index, feature in enumerate(features)
+        if index not in points_set or index in kept
+    ]
+    return simplified
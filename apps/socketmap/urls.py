@@ -11,6 +11,11 @@ urlpatterns = [
     ),
     path("getalarmsuser/<int:user_id>/", views.get_alarms_user, name="getalarmsuser"),
     path("vehicle-history/", views.vehicle_history, name="vehicle_history"),
+    path(
+        "vehicle-history/stream/",
+        views.vehicle_history_stream,
+        name="vehicle_history_stream",
+    ),
     path("device-commands/", views.get_device_commands, name="device-commands"),
     path("insert-command/", views.insert_sending_command, name="insert-command"),
     path(
@@ -0,0 +1,234 @@
+"""
+Filtrado por área visible del mapa en vivo.
+
+Un socket puede enviar el recuadro visible y el zoom del mapa (ver `GPSConsumer.receive`). A
+partir de ese momento solo recibe los vehículos dentro del recuadro o, con zoom bajo, grupos
+por celda con el número de vehículos y su centroide en lugar de un marcador por vehículo.
+
+`GridIndex` mantiene las posiciones por celdas de tamaño fijo (en grados) para que consultar un
+recuadro solo recorra las celdas que lo cubren y no toda la flota.
+"""
+
+import math
+
+# Niveles de zoom de los mapas de teselas
+MIN_ZOOM = 0
+MAX_ZOOM = 22
+
+
+def position_of(document):
+    """
+    Extrae la posición de un documento de Redis.
+
+    Args:
+        document (dict): Documento ReJSON del dispositivo.
+
+    Returns:
+        tuple | None: (latitud, longitud), o None si el documento no tiene una posición válida.
+    """
+    try:
+        gps = document["gps"]
+        latitude, longitude = float(gps["latitude"]), float(gps["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+class Viewport:
+    """
+    Recuadro visible del mapa.
+
+    Args:
+        west, south, east, north (float): Límites en grados. Si `west` es mayor que `east` el
+            recuadro cruza el antimeridiano.
+        zoom (int): Nivel de zoom del mapa (0 = mundo completo).
+    """
+
+    def __init__(self, west, south, east, north, zoom):
+        self.west = west
+        self.south = south
+        self.east = east
+        self.north = north
+        self.zoom = zoom
+
+    @classmethod
+    def from_message(cls, data):
+        """
+        Construye el recuadro a partir del mensaje del cliente.
+
+        Args:
+            data (dict): Mensaje con `bbox` ([oeste, sur, este, norte]) y `zoom`.
+
+        Returns:
+            Viewport | None: El recuadro, o None si el mensaje no trae `bbox`.
+
+        Raises:
+            ValueError: Si `bbox` o `zoom` no son válidos (incluidos NaN e infinito). El zoom
+                se limita a `MIN_ZOOM`–`MAX_ZOOM`.
+        """
+        bbox = data.get("bbox")
+        if bbox is None:
+            return None
+        try:
+            west, south, east, north = (float(value) for value in bbox)
+            zoom = int(data.get("zoom", 0))
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError("bbox debe ser [oeste, sur, este, norte] y zoom un entero")
+        if not all(math.isfinite(value) for value in (west, south, east, north)):
+            raise ValueError("Los límites del bbox deben ser números finitos")
+        zoom = min(max(zoom, MIN_ZOOM), MAX_ZOOM)
+        if south > north:
+            raise ValueError("El límite sur del bbox es mayor que el norte")
+        # Los mapas permiten desplazarse más allá de ±180: se normaliza la longitud
+        if east - west >= 360:
+            west, east = -180.0, 180.0
+        elif not (-180 <= west <= 180 and -180 <= east <= 180):
+            west = (west + 180) % 360 - 180
+            east = (east + 180) % 360 - 180
+        return cls(west, max(south, -90.0), east, min(north, 90.0), zoom)
+
+    def contains(self, latitude, longitude):
+        """
+        Indica si la posición está dentro del recuadro.
+        """
+        if not self.south <= latitude <= self.north:
+            return False
+        if self.west <= self.east:
+            return self.west <= longitude <= self.east
+        return longitude >= self.west or longitude <= self.east
+
+    def longitude_ranges(self):
+        """
+        Retorna los rangos de longitud del recuadro (dos si cruza el antimeridiano).
+        """
+        if self.west <= self.east:
+            return [(self.west, self.east)]
+        return [(self.west, 180.0), (-180.0, self.east)]
+
+    def cluster_size(self):
+        """
+        Tamaño en grados de la celda de agrupación para el zoom actual.
+
+        Se usan cuatro celdas por tesela de 256 px, es decir, un grupo cada ~64 px en pantalla.
+        """
+        return 360 / (2 ** self.zoom * 4)
+
+
+class GridIndex:
+    """
+    Índice de posiciones por celdas de `cell_size` grados.
+
+    Args:
+        cell_size (float): Tamaño de la celda en grados.
+    """
+
+    def __init__(self, cell_size=1.0):
+        self.cell_size = cell_size
+        self.positions = {}
+        self._cells = {}
+
+    def _cell(self, latitude, longitude):
+        return (
+            math.floor(latitude / self.cell_size),
+            math.floor(longitude / self.cell_size),
+        )
+
+    def update(self, documents, removed=()):
+        """
+        Actualiza el índice con los documentos modificados y los IMEI eliminados.
+
+        Args:
+            documents (dict): Documentos indexados por IMEI.
+            removed (iterable): IMEI que ya no existen.
+        """
+        for imei, document in documents.items():
+            self.discard(imei)
+            position = position_of(document)
+            if position is not None:
+                self.positions[imei] = position
+                self._cells.setdefault(self._cell(*position), set()).add(imei)
+        for imei in removed:
+            self.discard(imei)
+
+    def discard(self, imei):
+        """
+        Elimina un IMEI del índice.
+        """
+        position = self.positions.pop(imei, None)
+        if position is None:
+            return
+        cell = self._cell(*position)
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(imei)
+            if not members:
+                del self._cells[cell]
+
+    def query(self, viewport):
+        """
+        Retorna los IMEI cuya posición está dentro del recuadro.
+
+        Args:
+            viewport (Viewport): Recuadro visible.
+
+        Returns:
+            list: IMEI visibles.
+        """
+        south, north = self._cell(viewport.south, 0)[0], self._cell(viewport.north, 0)[0]
+        imeis = {}
+        for west, east in viewport.longitude_ranges():
+            first, last = self._cell(0, west)[1], self._cell(0, east)[1]
+            if (north - south + 1) * (last - first + 1) > len(self._cells):
+                # Recuadro muy grande: es más barato recorrer las celdas ocupadas
+                cells = [
+                    members
+                    for (row, column), members in self._cells.items()
+                    if south <= row <= north and first <= column <= last
+                ]
+            else:
+                cells = [
+                    self._cells[(row, column)]
+                    for row in range(south, north + 1)
+                    for column in range(first, last + 1)
+                    if (row, column) in self._cells
+                ]
+            for members in cells:
+                for imei in members:
+                    if viewport.contains(*self.positions[imei]):
+                        imeis[imei] = None
+        return list(imeis)
+
+    def clusters(self, viewport, imeis):
+        """
+        Agrupa los IMEI por celdas del tamaño correspondiente al zoom del recuadro.
+
+        Args:
+            viewport (Viewport): Recuadro visible.
+            imeis (iterable): IMEI visibles (ya filtrados por el alcance del socket).
+
+        Returns:
+            list: Un diccionario por celda con `count`, `latitude` y `longitude` (centroide).
+                Las celdas con un único vehículo incluyen además su `imei`.
+        """
+        size = viewport.cluster_size()
+        cells = {}
+        for imei in imeis:
+            latitude, longitude = self.positions[imei]
+            key = (math.floor(latitude / size), math.floor(longitude / size))
+            cell = cells.setdefault(key, [0, 0.0, 0.0, imei])
+            cell[0] += 1
+            cell[1] += latitude
+            cell[2] += longitude
+        clusters = []
+        for count, latitude, longitude, imei in cells.values():
+            cluster = {
+                "count": count,
+                "latitude": round(latitude / count, 6),
+                "longitude": round(longitude / count, 6),
+            }
+            if count == 1:
+                cluster["imei"] = imei
+            clusters.append(cluster)
+        return clusters
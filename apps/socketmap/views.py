@@ -1,10 +1,17 @@
 import json
+from datetime import datetime
 
+from django.conf import settings
 from django.db import connection
 from django.http import JsonResponse
 from rest_framework.decorators import api_view
 
 from apps.whitelabel.models import CompanyTypeMap
+from config.exports import spooled_response
+from config.resultcache import bump_versions_on_commit
+
+from .history_cache import DATE_FORMAT, cached_history
+from .tracks import simplify_track
 
 
 def getmapscompany(request, company_id):
@@ -143,6 +150,22 @@ def get_alarms_user(request, user_id):
         return JsonResponse({"error": str(e)}, status=500)
 
 
+def track_options(request):
+    """
+    Lee los parámetros opcionales de simplificación del recorrido (`tolerance`, `max_points`,
+    `zoom`) del cuerpo o de la URL.
+
+    Raises:
+        ValueError: Si algún parámetro no es numérico.
+    """
+    options = {}
+    for name, cast in (("tolerance", float), ("max_points", int), ("zoom", int)):
+        value = request.data.get(name, request.query_params.get(name))
+        if value not in (None, ""):
+            options[name] = cast(value)
+    return options
+
+
 @api_view(["POST"])
 def vehicle_history(request):
     if request.method == "POST":
@@ -153,29 +176,37 @@ def vehicle_history(request):
             start_date = data.get("FechaInicial")
             end_date = data.get("FechaFinal")
             company_id = data.get("Company_id")
-
-            # Inicializa json_result como un string vacío
-            json_result = ""
-
-            # Ejecuta el procedimiento almacenado dentro del bloque with
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "EXEC GetVehicleHistory @Imei=%s, @FechaInicial=%s, @FechaFinal=%s, @Company_id=%s",
-                    [imei, start_date, end_date, company_id],
-                )
-                rows = cursor.fetchall()
-
-                # Concatena cada parte del JSON
-                if rows:
-                    for row in rows:
-                        json_result += row[0]
-                else:
-                    return JsonResponse(
-                        {"error": "No se encontraron resultados."}, status=404
+            options = track_options(request)
+
+            def fetch(range_start, range_end):
+                # Ejecuta el procedimiento almacenado y concatena cada parte del JSON
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "EXEC GetVehicleHistory @Imei=%s, @FechaInicial=%s, @FechaFinal=%s, @Company_id=%s",
+                        [imei, range_start, range_end, company_id],
                     )
+                    return "".join(row[0] for row in cursor.fetchall())
+
+            try:
+                start = datetime.strptime(start_date, DATE_FORMAT)
+                end = datetime.strptime(end_date, DATE_FORMAT)
+            except (TypeError, ValueError):
+                # Fechas en otro formato: se consulta el rango tal como llegó, sin caché
+                json_result = fetch(start_date, end_date)
+                json_data = json.loads(json_result) if json_result else None
+            else:
+                # Los bloques de horas ya cerrados se leen de la caché de historial
+                json_data = cached_history(
+                    "GetVehicleHistory", fetch, company_id, imei, start, end
+                )
+            if not json_data:
+                return JsonResponse(
+                    {"error": "No se encontraron resultados."}, status=404
+                )
 
-            # Convierte el string concatenado a un objeto JSON
-            json_data = json.loads(json_result)
+            if options:
+                # Simplificación del recorrido conservando los puntos de evento
+                json_data = simplify_track(json_data, **options)
 
             return JsonResponse(json_data, safe=False)
         except ValueError as e:
@@ -193,6 +224,72 @@ def vehicle_history(request):
             return JsonResponse({"error": str(e)}, status=500)
 
 
+def iter_json_fragments(cursor, rows, fetch_size):
+    """
+    Recorre el resultado de un procedimiento `FOR JSON` por bloques y entrega cada fragmento
+    tal como llega de SQL Server, sin decodificar ni volver a serializar el JSON.
+
+    Se consume dentro de la vista: con ASGI el contenido de un `StreamingHttpResponse` se
+    recorre en el event loop (donde `fetchmany` bloquearía los sockets del mapa en vivo) y la
+    conexión de SQL Server del hilo de las vistas síncronas quedaría ocupada con el resultado
+    pendiente mientras otras vistas la usan.
+
+    Args:
+        cursor: Cursor abierto con el resultado del procedimiento; se cierra al terminar.
+        rows (list): Primer bloque de filas, ya leído.
+        fetch_size (int): Número de filas por `fetchmany`.
+
+    Yields:
+        bytes: Fragmentos del JSON en UTF-8.
+    """
+    try:
+        while rows:
+            for row in rows:
+                yield row[0].encode("utf-8")
+            rows = cursor.fetchmany(fetch_size)
+    finally:
+        cursor.close()
+
+
+@api_view(["POST"])
+def vehicle_history_stream(request):
+    """
+    Variante de `vehicle_history` que copia el recorrido de la base de datos a la respuesta por
+    bloques, con los mismos parámetros y el mismo JSON de respuesta.
+
+    Los fragmentos se escriben en un archivo temporal (en memoria hasta `EXPORT_SPOOL_SIZE`
+    bytes y luego en disco) antes de responder, así el cursor se cierra dentro de la vista y el
+    JSON nunca se decodifica ni se arma completo en memoria.
+    """
+    data = request.data
+    imei = data.get("Imei")
+    start_date = data.get("FechaInicial")
+    end_date = data.get("FechaFinal")
+    company_id = data.get("Company_id")
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "EXEC GetVehicleHistory @Imei=%s, @FechaInicial=%s, @FechaFinal=%s, @Company_id=%s",
+            [imei, start_date, end_date, company_id],
+        )
+        rows = cursor.fetchmany(settings.HISTORY_FETCH_SIZE)
+        if not rows:
+            return JsonResponse({"error": "No se encontraron resultados."}, status=404)
+
+        def write(file):
+            for fragment in iter_json_fragments(cursor, rows, settings.HISTORY_FETCH_SIZE):
+                file.write(fragment)
+
+        return spooled_response(
+            write, "history.json", "application/json", as_attachment=False
+        )
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+    finally:
+        cursor.close()
+
+
 @api_view(["GET"])
 def get_device_commands(request):
     imei = request.query_params.get(
@@ -246,6 +343,8 @@ def insert_sending_command(request):
                 "EXEC dbo.InsertSendingCommand @Imei=%s, @IdCommand=%s, @User_Id=%s",
                 [imei, id_command, user_id],
             )
+            # El procedimiento no pasa por las señales de los modelos
+            bump_versions_on_commit("command")
 
             # Si necesitas capturar algún valor de retorno del SP, ajusta esto según sea necesario
             return JsonResponse({"message": "Comando insertado exitosamente"})
@@ -413,6 +512,7 @@ def insert_geozone(request):
                     color_edges,
                 ],
             )
+            bump_versions_on_commit("geozone")
 
             message = "Geozone successfully saved"
             return JsonResponse({"message": message}, safe=False)
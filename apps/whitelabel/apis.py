@@ -10,11 +10,12 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from apps.realtime.apis import extract_number
+from config.exports import ExportView
+from config.sorting import sort_rows
 
 from .models import Company, Module, Process
 from .serializer import CompanySerializer
-from .sql import get_modules_by_user, get_ticket_by_user, get_ticket_closed
+from .sql import get_modules_by_user, get_ticket_by_user
 from .views import ClosedTicketsView
 
 
@@ -146,25 +147,12 @@ class SearchTicketsViewOpen(View):
         tickets = get_ticket_by_user(user_id, search_query)
         order_by = session_filters.get('order_by', [None])[0]
         direction = session_filters.get('direction', [None])[0]
-        def sort_key(x):
-            value = x.get(order_by)
-            if value is None or value == "":
-                return (4, "")  # Prioridad 4 para valores nulos o vacíos
-            if isinstance(value, str):
-                # Verificar si comienza con números, letras o caracteres especiales
-                if value[0].isdigit():
-                    return (1, extract_number(value))  # Prioridad 1 para números
-                elif value[0].isalpha():
-                    return (2, value.lower())  # Prioridad 2 para letras
-                else:
-                    return (3, value.lower())  # Prioridad 3 para caracteres especiales
-            return value
 
         # Determinar si es orden descendente
         reverse = direction == "desc"
 
         try:
-            tickets = sorted(tickets, key=sort_key, reverse=reverse)
+            tickets = sort_rows(tickets, order_by, reverse)
         except KeyError:
             # Ordenamiento por defecto si la clave no existe
             tickets = sorted(
@@ -326,141 +314,123 @@ class SearchModule(APIView):
         return paginator.get_paginated_response(formatted_results)
     
     
-@method_decorator(csrf_exempt, name='dispatch')
-class ExportDataTicketsOpen(View):
-    def get(self, request):
-        search_query = request.GET.get('query', None)
-        tickets = get_ticket_by_user(request.user.id, search_query)
-        
+class TicketExportView(ExportView):
+    """
+    Base de las exportaciones de tickets: muestra "Distributor" como compañía de los tickets de
+    compañías distribuidoras, salvo que el usuario pertenezca a una.
+    """
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
         # Verificar si el usuario pertenece a una empresa distribuidora
-        user_is_distributor = Company.objects.filter(
+        self.user_is_distributor = Company.objects.filter(
             provider=request.user.company_id, visible=True, actived=True
         ).exists()
-        
-        formatted_results = []
-        # Encabezados traducidos
-        headers = [
-            "Ticket",
-            _("Created by User"),
-            _("Subject"),
-            _("Priority"),
-            _("Process"),
-            _("Assigned To User"),
-            _("Status"),
-            _("Assigned To Company"),
-            _("Created At"),
-            _("Last Comment")
+        # Una consulta por compañía y no por ticket
+        self.distributors = {}
+
+    def get_columns(self):
+        return [
+            ("Ticket", "id"),
+            (_("Created by User"), "created_by"),
+            (_("Subject"), "subject"),
+            (_("Priority"), "priority"),
+            (_("Process"), "process_type"),
+            (_("Assigned To User"), "assign_to"),
+            (_("Status"), "status"),
+            (_("Assigned To Company"), "company"),
+            (_("Created At"), "created_at"),
+            (_("Last Comment"), "last_comment"),
         ]
 
-        for ticket in tickets:
-            if user_is_distributor:
-                company_name = ticket["company"]
-            else:
-                # Verificar si la empresa del ticket es un proveedor
-                ticket_is_distributor = Company.objects.filter(
-                    provider=ticket["company_id"], visible=True, actived=True
-                ).exists()
-                company_name = "Distributor" if ticket_is_distributor else ticket["company"]
-            
-            formatted_results.append({
-                "id": ticket["id"],
-                "company": company_name,
-                "created_by": ticket["created_by"] or "",
-                "subject": ticket["subject"] or "",
-                "priority": ticket["priority"] or "",
-                "process_type": ticket["process_type"] or "",
-                "assign_to": ticket.get("assign_to") or "Unassigned",
-                "status": "Open" if ticket["status"] else "Closed",
-                "created_at": ticket["created_at"] or "",
-                "last_comment": ticket["last_comment"] or "",
-            })
-            
-        response_data = {
-            'headers': headers,
-            'data': formatted_results
+    def company_name(self, ticket):
+        if self.user_is_distributor:
+            return ticket["company"]
+        company_id = ticket["company_id"]
+        if company_id not in self.distributors:
+            # Verificar si la empresa del ticket es un proveedor
+            self.distributors[company_id] = Company.objects.filter(
+                provider=company_id, visible=True, actived=True
+            ).exists()
+        return "Distributor" if self.distributors[company_id] else ticket["company"]
+
+    def format_row(self, ticket):
+        return {
+            "id": ticket["id"],
+            "company": self.company_name(ticket),
+            "created_by": ticket["created_by"] or "",
+            "subject": ticket["subject"] or "",
+            "priority": ticket["priority"] or "",
+            "process_type": ticket["process_type"] or "",
+            "assign_to": ticket.get("assign_to") or "Unassigned",
+            "status": "Open" if ticket["status"] else "Closed",
+            "created_at": ticket["created_at"] or "",
+            "last_comment": ticket["last_comment"] or "",
         }
 
-        return JsonResponse(response_data, safe=False)
-    
+
 @method_decorator(csrf_exempt, name='dispatch')
-class ExportDataTicketsHistoric(View):
-    def get(self, request):
-        search_query = request.GET.get('query', None)
-        tickets = get_ticket_closed(request.user.company_id, request.user.id, search_query)
-        
-        # Verificar si el usuario pertenece a una empresa distribuidora
-        user_is_distributor = Company.objects.filter(
-            provider=request.user.company_id, visible=True, actived=True
-        ).exists()
-        
-        formatted_results = []
-        # Encabezados traducidos
-        headers = [
-            "Ticket",
-            _("Created by User"),
-            _("Subject"),
-            _("Priority"),
-            _("Process"),
-            _("Assigned To User"),
-            _("Status"),
-            _("Assigned To Company"),
-            _("Created At"),
-            _("Last Comment"),
-            _("Duration")
-        ]
+class ExportDataTicketsOpen(TicketExportView):
+    procedure = "ListTicketsForUser"
+    filename = "tickets_open"
+
+    def get_params(self, request):
+        return {
+            "UserId": request.user.id,
+            "SearchQuery": request.GET.get('query', None),
+        }
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ExportDataTicketsHistoric(TicketExportView):
+    procedure = "ListTicketsClosed"
+    filename = "tickets_historic"
+
+    def get_params(self, request):
+        return {
+            "UserId": request.user.id,
+            "CompanyId": request.user.company_id,
+            "SearchQuery": request.GET.get('query', None),
+        }
+
+    def get_columns(self):
+        return super().get_columns() + [(_("Duration"), "duration")]
+
+    def format_duration(self, duration):
         days_label = _("Days")
         hours_label = ("Hrs")
         minutes_label = ("Min")
-        for ticket in tickets:
-            duration = ticket.get("duration", "0,0,0,0")
-            days, hours, minutes, __ = duration.split(",")
-
-            # Formatear la duración
-            duration_str = f"{int(days)} {days_label}" if int(days) > 0 else ""
-            if int(hours) > 0:
-                duration_str += f", {int(hours)} {hours_label}" if duration_str else f"{int(hours)} {hours_label}"
-            if int(minutes) > 0:
-                duration_str += f", {int(minutes)} {minutes_label}" if duration_str else f"{int(minutes)} {minutes_label}"
-                
-            if user_is_distributor:
-                company_name = ticket["company"]
-            else:
-                # Verificar si la empresa del ticket es un proveedor
-                ticket_is_distributor = Company.objects.filter(
-                    provider=ticket["company_id"], visible=True, actived=True
-                ).exists()
-                company_name = "Distributor" if ticket_is_distributor else ticket["company"]
-            
-            formatted_results.append({
-                "id": ticket["id"],
-                "company": company_name,
-                "created_by": ticket["created_by"] or "",
-                "subject": ticket["subject"] or "",
-                "priority": ticket["priority"] or "",
-                "process_type": ticket["process_type"] or "",
-                "assign_to": ticket.get("assign_to") or "Unassigned",
-                "status": "Open" if ticket["status"] else "Closed",
-                "created_at": ticket["created_at"] or "",
-                "last_comment": ticket["last_comment"] or "",
-                "duration": duration_str,
-            })
-            
-        response_data = {
-            'headers': headers,
-            'data': formatted_results
-        }
+        days, hours, minutes, __ = duration.split(",")
 
-        return JsonResponse(response_data, safe=False)
+        # Formatear la duración
+        duration_str = f"{int(days)} {days_label}" if int(days) > 0 else ""
+        if int(hours) > 0:
+            duration_str += f", {int(hours)} {hours_label}" if duration_str else f"{int(hours)} {hours_label}"
+        if int(minutes) > 0:
+            duration_str += f", {int(minutes)} {minutes_label}" if duration_str else f"{int(minutes)} {minutes_label}"
+        return duration_str
 
+    def format_row(self, ticket):
+        row = super().format_row(ticket)
+        row["duration"] = self.format_duration(ticket.get("duration", "0,0,0,0"))
+        return row
 
-class ExportDataModule(View):
-    @method_decorator(csrf_exempt, name='dispatch')
-    def get(self, request, *args, **kwargs):
-        user = request.user
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ExportDataModule(ExportView):
+    procedure = "ListBillingByUserCompany"
+    filename = "modules"
+
+    def get_params(self, request):
         params = request.GET if request.method == 'GET' else request.POST
         query = params.get("query", "").lower()
-        search = params.get("q", query).lower()
-        modules = get_modules_by_user(user.company_id, user.id, search)
+        return {
+            "UserId": request.user.id,
+            "CompanyId": request.user.company_id,
+            "SearchQuery": params.get("q", query).lower(),
+        }
+
+    def get_columns(self):
         translated_item = [
             _("Maps"),
             _("Io Items report"),
@@ -470,30 +440,24 @@ class ExportDataModule(View):
             _("Assets group"),
             _("Assets"),
             ] #Lista para traducir nombres de modulos
-        headers = [
-            _("Company"),
-            _("Coin"),
-            _("Module/Price"),
-            _("Total Price")
+        return [
+            (_("Company"), "company"),
+            (_("Coin"), "name"),
+            (_("Module/Price"), "modules"),
+            (_("Total Price"), "total_price"),
         ]
-        formatted_results = []
-        for module in modules:
-            # Translate the module data
-            module_data = module["module"] or ""
-            # Assuming module_data is a string with concatenated name_en:price
-            translated_module = ', '.join(
-                f"{_(name_en)}: {price}"
-                for name_en, price in (item.split(':') for item in module_data.split(', '))
-            )
-            formatted_results.append({
-                "company": module["company_name"],
-                "name": module["name"] or "",
-                "modules": translated_module,
-                "total_price": module["total_price"] or 0,
-            })
-        response_data = {
-            'headers': headers,
-            'data': formatted_results
-        }
 
-        return JsonResponse(response_data, safe=False)
\ No newline at end of file
+    def format_row(self, module):
+        # Translate the module data
+        module_data = module["module"] or ""
+        # Assuming module_data is a string with concatenated name_en:price
+        translated_module = ', '.join(
+            f"{_(name_en)}: {price}"
+            for name_en, price in (item.split(':') for item in module_data.split(', '))
+        )
+        return {
+            "company": module["company_name"],
+            "name": module["name"] or "",
+            "modules": translated_module,
+            "total_price": module["total_price"] or 0,
+        }
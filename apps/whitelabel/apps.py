@@ -5,3 +5,7 @@ class WhitelabelConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.whitelabel"
     label = "whitelabel"
+
+    def ready(self):
+        # Conecta los manejadores de señales decorados con @receiver.
+        from . import signals
@@ -0,0 +1,34 @@
+"""
+Señales de la aplicación: invalidan los listados guardados en la caché `listing` cuando cambia
+un registro (ver `config.resultcache`).
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from config.resultcache import bump_versions_on_commit
+
+from .models import Comment, Company, Message, Module, Process, Ticket
+
+
+@receiver([post_save, post_delete], sender=Company)
+def on_company_changed(sender, **kwargs):
+    # Todos los listados dependen de `company`
+    bump_versions_on_commit("company")
+
+
+@receiver([post_save, post_delete], sender=Process)
+def on_process_changed(sender, **kwargs):
+    bump_versions_on_commit("process")
+
+
+@receiver([post_save, post_delete], sender=Ticket)
+@receiver([post_save, post_delete], sender=Message)
+@receiver([post_save, post_delete], sender=Comment)
+def on_ticket_changed(sender, **kwargs):
+    bump_versions_on_commit("ticket")
+
+
+@receiver([post_save, post_delete], sender=Module)
+def on_module_changed(sender, **kwargs):
+    bump_versions_on_commit("module")
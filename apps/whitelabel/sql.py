@@ -1,6 +1,10 @@
 from django.db import DatabaseError, connection
 
+from config.resultcache import cached_procedure
+from config.resultset import ResultSet
 
+
+@cached_procedure("ListProcessByCompany", "process")
 def fetch_all_process(company):
     with connection.cursor() as cursor:
         # Asegurarse de que 'company' es del tipo correcto, por ejemplo, un entero
@@ -10,9 +14,9 @@ def fetch_all_process(company):
         cursor.execute("EXEC [dbo].[ListProcessByCompany] @CompanyId=%s", [company_id])
 
         rows = cursor.fetchall()
-        columns = [col[0] for col in cursor.description]
-        return [dict(zip(columns, row)) for row in rows]
+        return ResultSet.from_cursor(cursor, rows)
 
+@cached_procedure("ListTicketsForUser", "ticket")
 def get_ticket_by_user(user_id, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -22,9 +26,7 @@ def get_ticket_by_user(user_id, search_query=None):
                 [user_id, search_query]
             )
             rows = cursor.fetchall()
-            # Usar cursor.description para obtener los nombres de las columnas
-            columns = [col[0] for col in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return ResultSet.from_cursor(cursor, rows)
 
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
@@ -36,6 +38,7 @@ def get_ticket_by_user(user_id, search_query=None):
         return []
 
 
+@cached_procedure("ListTicketsClosed", "ticket")
 def get_ticket_closed(company, user_id, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -44,9 +47,7 @@ def get_ticket_closed(company, user_id, search_query=None):
                 [user_id, company, search_query]
             )
             rows = cursor.fetchall()
-            # Usar cursor.description para obtener los nombres de las columnas
-            columns = [col[0] for col in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return ResultSet.from_cursor(cursor, rows)
 
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
@@ -58,6 +59,7 @@ def get_ticket_closed(company, user_id, search_query=None):
         return []
 
 
+@cached_procedure("ListBillingByUserCompany", "module", "user")
 def get_modules_by_user(company, user_id, search_query=None):
     try:
         with connection.cursor() as cursor:
@@ -66,9 +68,7 @@ def get_modules_by_user(company, user_id, search_query=None):
                 [user_id, company, search_query]
             )
             rows = cursor.fetchall()
-            # Usar cursor.description para obtener los nombres de las columnas
-            columns = [col[0] for col in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return ResultSet.from_cursor(cursor, rows)
 
     except DatabaseError as e:
         # Manejar el error de base de datos aquí
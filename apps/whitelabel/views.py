@@ -33,7 +33,7 @@ from apps.log.mixins import (CreateAuditLogAsyncMixin, CreateAuditLogSyncMixin,
                              DeleteAuditLogAsyncMixin,
                              UpdateAuditLogAsyncMixin, obtener_ip_publica)
 from apps.log.utils import log_action
-from apps.realtime.apis import extract_number, get_user_companies
+from apps.realtime.apis import get_user_companies
 from apps.whitelabel.forms import (AttachmentForm, CommentForm,
                                    CompanyCustomerForm, CompanyLogoForm,
                                    DistributionCompanyForm, KeyMapForm,
@@ -42,6 +42,7 @@ from apps.whitelabel.forms import (AttachmentForm, CommentForm,
 from apps.whitelabel.models import (Attachment, Company, CompanyTypeMap,
                                     MapType, Module, Process, Theme, Ticket)
 from config.filtro import General_Filters
+from config.sorting import extract_number, sort_rows
 
 from .forms import (AttachmentForm, CommentForm, CompanyCustomerForm,
                     CompanyLogoForm, DistributionCompanyForm, KeyMapForm,
@@ -1642,26 +1643,12 @@ class ListTicketTemplate(LoginRequiredMixin, PermissionRequiredMixin, ListView):
             f"filters_sorted_ticketsopen_{user.id}"
         ] = session_filters
         self.request.session.modified = True
-        # Función para convertir los valores a minúsculas y extraer números cuando sea necesario
-        def sort_key(x):
-            value = x.get(order_by)
-            if value is None or value == "":
-                return (4, "")  # Prioridad 4 para valores nulos o vacíos
-            if isinstance(value, str):
-                # Verificar si comienza con números, letras o caracteres especiales
-                if value[0].isdigit():
-                    return (1, extract_number(value))  # Prioridad 1 para números
-                elif value[0].isalpha():
-                    return (2, value.lower())  # Prioridad 2 para letras
-                else:
-                    return (3, value.lower())  # Prioridad 3 para caracteres especiales
-            return value
 
         # Determinar si es orden descendente
         reverse = direction == "desc"
 
         try:
-            sorted_queryset = sorted(tickets, key=sort_key, reverse=reverse)
+            sorted_queryset = sort_rows(tickets, order_by, reverse)
         except KeyError:
             # Ordenamiento por defecto si la clave no existe
             sorted_queryset = sorted(
@@ -2391,7 +2378,8 @@ class ClosedTicketsView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
         return int(self.request.POST['paginate_by'])
 
     def get_filtered_tickets(self, user_company, user, params, is_post=False):
-        tickets = get_ticket_closed(user_company, user)
+        # Las filas se completan con los campos de la plantilla
+        tickets = [dict(ticket) for ticket in get_ticket_closed(user_company, user)]
         tickets_all = tickets
         for ticket in tickets:
             ticket["rating_range"] = range(ticket["rating"] or 0)
@@ -2687,25 +2675,12 @@ class ClosedTicketsView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
             # Ordenar los tickets
             order_by = self.request.GET.get('order_by') or self.request.POST.get('order_by') or session_filters.get('order_by', ['last_comment'])[0]
             direction = self.request.GET.get('direction') or self.request.POST.get('direction') or session_filters.get('direction', ['desc'])[0]
-            def sort_key(x):
-                value = x.get(order_by)
-                if value is None or value == "":
-                    return (4, "")  # Prioridad 4 para valores nulos o vacíos
-                if isinstance(value, str):
-                    # Verificar si comienza con números, letras o caracteres especiales
-                    if value[0].isdigit():
-                        return (1, extract_number(value))  # Prioridad 1 para números
-                    elif value[0].isalpha():
-                        return (2, value.lower())  # Prioridad 2 para letras
-                    else:
-                        return (3, value.lower())  # Prioridad 3 para caracteres especiales
-                return value
 
             # Determinar si es orden descendente
             reverse = direction == "desc"
 
             try:
-                tickets_order = sorted(tickets, key=sort_key, reverse=reverse)
+                tickets_order = sort_rows(tickets, order_by, reverse)
             except KeyError:
                 # Ordenamiento por defecto si la clave no existe
                 tickets_order = sorted(
@@ -0,0 +1,102 @@
+"""
+Exportaciones en formatos columnares: Parquet y Arrow IPC (pyarrow).
+
+El equipo de BI descargaba el recorrido AVL en CSV o XLSX y volvía a interpretar gigas de texto.
+En Parquet y Arrow cada columna se guarda con su tipo (fechas como `timestamp`, coordenadas como
+`float64`, eventos como enteros) y comprimida con `EXPORT_COLUMNAR_COMPRESSION`; los archivos se
+escriben por grupos de `EXPORT_ROW_GROUP_SIZE` filas (un row group de Parquet o un record batch
+de Arrow por grupo) a medida que llegan las filas, sin armar la tabla completa.
+
+pyarrow solo lo necesitan estos formatos: los módulos que lo usan importan este módulo dentro de
+la función que escribe el archivo (los tipos de contenido están en `config.exports`).
+"""
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+
+
+def arrow_schema(columns):
+    """
+    Arma el esquema de Arrow a partir de `(nombre, tipo)`, con el tipo como alias de pyarrow
+    ("string", "int32", "float64", "timestamp[ms]", ...).
+    """
+    return pa.schema([pa.field(name, pa.type_for_alias(alias)) for name, alias in columns])
+
+
+def _batch(rows, schema):
+    # Transpone las filas y arma cada columna con el tipo del esquema
+    columns = zip(*rows)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+def row_batches(rows, schema, size=None):
+    """
+    Agrupa filas (secuencias de valores en el orden del esquema) en record batches.
+
+    Args:
+        rows (iterable): Filas, p. ej. de `values_list(...).iterator()`.
+        schema (pa.Schema): Esquema de las columnas.
+        size (int, optional): Filas por grupo; por defecto `EXPORT_ROW_GROUP_SIZE`.
+
+    Yields:
+        pa.RecordBatch: Cada grupo de filas.
+    """
+    size = size or settings.EXPORT_ROW_GROUP_SIZE
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield _batch(chunk, schema)
+            chunk = []
+    if chunk:
+        yield _batch(chunk, schema)
+
+
+def frame_batches(frame, size=None):
+    """
+    Divide un DataFrame en record batches con el esquema inferido de todo el DataFrame (así una
+    columna vacía en un grupo conserva el tipo de las demás).
+
+    Returns:
+        tuple: El esquema y un generador de record batches.
+    """
+    size = size or settings.EXPORT_ROW_GROUP_SIZE
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+
+    def batches():
+        for start in range(0, len(frame), size):
+            yield pa.RecordBatch.from_pandas(
+                frame.iloc[start:start + size], schema=schema, preserve_index=False
+            )
+
+    return schema, batches()
+
+
+def write_batches(file, export_format, schema, batches, progress=None):
+    """
+    Escribe los record batches en Parquet (un row group por batch) o en un archivo Arrow IPC.
+
+    Args:
+        file: Archivo binario de destino.
+        export_format (str): "parquet" o "arrow".
+        schema (pa.Schema): Esquema de las columnas.
+        batches (iterable): Record batches con ese esquema.
+        progress (JobProgress, optional): Avance del trabajo de exportación.
+    """
+    compression = settings.EXPORT_COLUMNAR_COMPRESSION
+    if export_format == "parquet":
+        writer = pq.ParquetWriter(file, schema, compression=compression)
+    elif export_format == "arrow":
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        writer = pa.ipc.new_file(file, schema, options=options)
+    else:
+        raise ValueError(f"Formato columnar no soportado: {export_format}")
+    with writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            if progress is not None:
+                progress.add(batch.num_rows)
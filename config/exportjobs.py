@@ -0,0 +1,351 @@
+"""
+Trabajos de exportación en segundo plano.
+
+Las exportaciones grandes (`export_report` sobre meses de `GetAVLData`, los `Export*` de todos
+los dispositivos o vehículos de una compañía) se generaban dentro de la solicitud: superaban el
+tiempo máximo del ingress y, con ASGI, ocupaban el hilo compartido en el que Django ejecuta las
+vistas síncronas. Con `background=1` la vista crea un trabajo y responde 202 con su estado; el
+archivo se genera fuera de la solicitud y se guarda en `default_storage` (disco local o Azure
+Blob), así el trabajo continúa aunque el navegador se cierre.
+
+    POST /checkpoints/export_report  (format=xlsx, background=1, ...)
+        -> 202 {"id": "...", "status": "queued", "status_url": "..."}
+    GET  /exports/jobs/<id>
+        -> {"status": "running", "rows": 120000, ...}
+        -> {"status": "done", "download_url": "...?token=...", "expires_in": 3600, ...}
+    GET  /exports/jobs/<id>/download?token=...
+        -> el archivo, una sola vez; luego 410
+
+El estado de cada trabajo se guarda en la caché `exports` durante `EXPORT_JOB_TTL` segundos.
+Los trabajos se ejecutan según `EXPORT_JOB_BACKEND`:
+
+- "thread": en un pool de `EXPORT_JOB_THREADS` hilos del mismo proceso.
+- "redis": se encolan en una lista de Redis que procesan uno o más workers
+  (`python manage.py run_export_jobs`), independientes de los procesos que atienden solicitudes.
+
+El enlace de descarga va firmado y vence `EXPORT_DOWNLOAD_MAX_AGE` segundos después de terminar
+el trabajo; el archivo se borra del almacenamiento al terminar la descarga. Los archivos de
+trabajos vencidos que nunca se descargaron los borra el worker (o `run_export_jobs --purge`).
+"""
+
+import logging
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connections
+from django.http import FileResponse, JsonResponse
+from django.urls import reverse
+from django.utils import translation
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext as _
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+DOWNLOADED = "downloaded"
+
+QUEUE_KEY = "exports:queue"
+DOWNLOAD_SALT = "config.exportjobs.download"
+
+# Funciones que generan el archivo de cada tipo de trabajo: runner(job, file, progress)
+RUNNERS = {
+    "list": "config.exports.run_export_job",
+    "report": "apps.checkpoints.api.run_report_job",
+    "avl": "apps.checkpoints.api.run_avl_export_job",
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ExportJobError(Exception):
+    """
+    Error esperado de un trabajo (p. ej. sin resultados); su mensaje se muestra al usuario.
+    """
+
+
+def _job_key(job_id):
+    return f"job:{job_id}"
+
+
+def get_job(job_id):
+    return caches["exports"].get(_job_key(job_id))
+
+
+def save_job(job):
+    caches["exports"].set(_job_key(job["id"]), job, settings.EXPORT_JOB_TTL)
+
+
+def create_job(kind, user, params, export_format, filename):
+    """
+    Crea un trabajo de exportación y lo encola.
+
+    Args:
+        kind (str): Tipo de trabajo, una clave de `RUNNERS`.
+        user: Usuario que solicita la exportación; solo él puede consultarla y descargarla.
+        params (dict): Parámetros del trabajo (valores simples, se guardan en la caché).
+        export_format (str): Formato del archivo ("csv", "xlsx", ...).
+        filename (str): Nombre del archivo descargado, sin extensión.
+
+    Returns:
+        dict: El estado del trabajo.
+    """
+    job = {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "user_id": user.id,
+        "language": translation.get_language(),
+        "params": params,
+        "format": export_format,
+        "filename": f"{filename}.{export_format}",
+        "status": QUEUED,
+        "rows": 0,
+        "error": None,
+        "storage_name": None,
+        "token": None,
+        "created": time.time(),
+        "finished": None,
+    }
+    save_job(job)
+    enqueue(job["id"])
+    return job
+
+
+def _redis():
+    return redis.Redis.from_url(settings.EXPORT_JOB_REDIS_URL)
+
+
+def _thread_pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.EXPORT_JOB_THREADS, thread_name_prefix="export-job"
+            )
+    return _executor
+
+
+def enqueue(job_id):
+    if settings.EXPORT_JOB_BACKEND == "redis":
+        _redis().rpush(QUEUE_KEY, job_id)
+    else:
+        _thread_pool().submit(run_job, job_id)
+
+
+class JobProgress:
+    """
+    Cuenta las filas escritas por un trabajo y guarda el avance cada `step` filas.
+    """
+
+    def __init__(self, job, step=None):
+        self.job = job
+        self.rows = 0
+        self.step = step or settings.EXPORT_CHUNK_SIZE
+
+    def add(self, count):
+        before = self.rows
+        self.rows += count
+        if self.rows // self.step != before // self.step:
+            self.job["rows"] = self.rows
+            save_job(self.job)
+
+    def track(self, rows):
+        for row in rows:
+            yield row
+            self.add(1)
+
+
+def _storage_name(job):
+    return f"{settings.EXPORT_STORAGE_PREFIX}/{job['id']}_{job['filename']}"
+
+
+def run_job(job_id):
+    """
+    Genera el archivo de un trabajo encolado y lo guarda en `default_storage`.
+    """
+    job = get_job(job_id)
+    if job is None or job["status"] != QUEUED:
+        return
+    job["status"] = RUNNING
+    save_job(job)
+    progress = JobProgress(job)
+    close_old_connections()
+    try:
+        runner = import_string(RUNNERS[job["kind"]])
+        with translation.override(job["language"]), tempfile.TemporaryFile() as file:
+            runner(job, file, progress)
+            file.seek(0)
+            job["storage_name"] = default_storage.save(_storage_name(job), File(file))
+        job["status"] = DONE
+        job["token"] = signing.dumps(job["id"], salt=DOWNLOAD_SALT)
+    except ExportJobError as e:
+        job["status"] = FAILED
+        job["error"] = str(e)
+    except Exception as e:
+        logger.exception("Error en el trabajo de exportación %s", job_id)
+        job["status"] = FAILED
+        job["error"] = "Error interno del servidor: " + str(e)
+    finally:
+        job["rows"] = progress.rows
+        job["finished"] = time.time()
+        save_job(job)
+        # Las conexiones son por hilo; el pool reutiliza el hilo en otros trabajos
+        connections.close_all()
+
+
+def job_payload(job):
+    """
+    Retorna el estado de un trabajo para el cliente.
+    """
+    payload = {
+        "id": job["id"],
+        "status": job["status"],
+        "rows": job["rows"],
+        "filename": job["filename"],
+        "error": job["error"],
+        "status_url": reverse("export_job_status", args=[job["id"]]),
+    }
+    if job["status"] == DONE:
+        url = reverse("export_job_download", args=[job["id"]])
+        payload["download_url"] = f"{url}?token={job['token']}"
+        payload["expires_in"] = max(
+            int(job["finished"] + settings.EXPORT_DOWNLOAD_MAX_AGE - time.time()), 0
+        )
+    return payload
+
+
+def _user_job(request, job_id):
+    job = get_job(job_id)
+    if job is None or job["user_id"] != request.user.id:
+        return None
+    return job
+
+
+def job_status(request, job_id):
+    """
+    Retorna el estado de un trabajo de exportación del usuario.
+    """
+    job = _user_job(request, job_id)
+    if job is None:
+        return JsonResponse({"error": _("Export not found")}, status=404)
+    return JsonResponse(job_payload(job))
+
+
+class DownloadOnceFile:
+    """
+    Archivo del almacenamiento que se borra al cerrarse (al terminar la descarga).
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.file = default_storage.open(job["storage_name"])
+
+    def read(self, size=-1):
+        return self.file.read(size)
+
+    def close(self):
+        self.file.close()
+        try:
+            default_storage.delete(self.job["storage_name"])
+        except Exception as e:
+            logger.warning("No se pudo borrar la exportación %s: %s", self.job["id"], e)
+        self.job["status"] = DOWNLOADED
+        self.job["storage_name"] = None
+        save_job(self.job)
+
+
+def job_download(request, job_id):
+    """
+    Descarga el archivo de un trabajo terminado con el enlace firmado de `job_payload`.
+
+    Retorna:
+    - El archivo como adjunto, una sola vez.
+    - Estado 404 si el trabajo no existe o es de otro usuario.
+    - Estado 409 si el trabajo aún no termina.
+    - Estado 410 si el enlace venció o el archivo ya se descargó.
+    """
+    job = _user_job(request, job_id)
+    if job is None:
+        return JsonResponse({"error": _("Export not found")}, status=404)
+    try:
+        signed_id = signing.loads(
+            request.GET.get("token", ""),
+            salt=DOWNLOAD_SALT,
+            max_age=settings.EXPORT_DOWNLOAD_MAX_AGE,
+        )
+    except signing.BadSignature:
+        return JsonResponse({"error": _("The download link has expired")}, status=410)
+    if signed_id != job["id"]:
+        return JsonResponse({"error": _("Export not found")}, status=404)
+    if job["status"] in (QUEUED, RUNNING):
+        return JsonResponse(job_payload(job), status=409)
+    # Solo la primera solicitud obtiene el archivo
+    if job["status"] != DONE or not caches["exports"].add(
+        f"download:{job_id}", 1, settings.EXPORT_JOB_TTL
+    ):
+        return JsonResponse({"error": _("The file was already downloaded")}, status=410)
+    return FileResponse(DownloadOnceFile(job), as_attachment=True, filename=job["filename"])
+
+
+def purge_files():
+    """
+    Borra del almacenamiento los archivos de trabajos que ya no existen (vencidos sin descargar).
+
+    Returns:
+        int: Número de archivos borrados.
+    """
+    prefix = settings.EXPORT_STORAGE_PREFIX
+    try:
+        _directories, files = default_storage.listdir(prefix)
+    except (FileNotFoundError, NotADirectoryError):
+        return 0
+    removed = 0
+    for name in files:
+        job_id = name.split("_", 1)[0]
+        if get_job(job_id) is None:
+            default_storage.delete(f"{prefix}/{name}")
+            removed += 1
+    return removed
+
+
+def serve(threads, stop=None):
+    """
+    Procesa los trabajos de la cola de Redis con un pool de hilos (ver `run_export_jobs`).
+
+    Solo se toma un trabajo de la cola cuando hay un hilo libre, así varios workers se reparten
+    los trabajos.
+
+    Args:
+        threads (int): Trabajos simultáneos.
+        stop (threading.Event, optional): Detiene el ciclo al activarse.
+    """
+    client = _redis()
+    slots = threading.BoundedSemaphore(threads)
+    last_purge = 0
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="export-job") as executor:
+        while stop is None or not stop.is_set():
+            if time.monotonic() - last_purge > settings.EXPORT_JOB_PURGE_INTERVAL:
+                try:
+                    purge_files()
+                except Exception as e:
+                    logger.warning("No se pudieron borrar las exportaciones vencidas: %s", e)
+                last_purge = time.monotonic()
+            slots.acquire()
+            item = client.blpop(QUEUE_KEY, timeout=5)
+            if item is None:
+                slots.release()
+                continue
+            future = executor.submit(run_job, item[1].decode())
+            future.add_done_callback(lambda future: slots.release())
@@ -0,0 +1,319 @@
+"""
+Motor de las exportaciones `Export*` de los listados (JSON, CSV, XLSX y PDF).
+
+Las vistas de exportación consultaban el procedimiento completo, armaban una lista de
+diccionarios y respondían `{"headers": [...], "data": [...]}`; el navegador convertía ese JSON en
+una hoja de cálculo, con todo el resultado en memoria en ambos lados. `ExportView` conserva esa
+respuesta por defecto y acepta además `?format=csv`, `?format=xlsx` o `?format=pdf`: las filas
+se leen del cursor por bloques de `EXPORT_CHUNK_SIZE` (`fetchmany`), se formatean una por una
+y se escriben en un archivo temporal (`tempfile.SpooledTemporaryFile`, en memoria hasta
+`EXPORT_SPOOL_SIZE` bytes y luego en disco) que se envía por partes con `FileResponse`. El XLSX
+se escribe con un libro `openpyxl` de solo escritura, que no guarda las celdas en memoria, y el
+PDF con `config.pdf`, con la marca de la compañía del usuario.
+
+El archivo se escribe completo antes de responder porque la aplicación corre con ASGI: Django
+recorre el contenido de una respuesta por partes en el hilo del event loop, donde no se puede
+usar el cursor de la base de datos (`SynchronousOnlyOperation`). Así la consulta termina dentro
+de la vista y un error de base de datos responde 500 en lugar de un archivo cortado. Con
+`&background=1` el archivo lo genera un trabajo en segundo plano (ver `config.exportjobs`).
+
+Cada vista declara el procedimiento, sus parámetros y las columnas `(encabezado, clave)`:
+
+    class ExportDataGeofence(ExportView):
+        procedure = "ListGeoZonesByCompany"
+        filename = "geofences"
+
+        def get_params(self, request):
+            return {"CompanyId": ..., "UserId": ..., "SearchQuery": ...}
+
+        def get_columns(self):
+            return [(_("Company"), "company"), (_("Name geozone"), "name"), ...]
+
+        def format_row(self, geofence):
+            return {"company": geofence["company"] or "", ...}
+"""
+
+import csv
+import tempfile
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
+from django.http import FileResponse, HttpRequest, JsonResponse, QueryDict
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext as _
+from django.views import View
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+from .exportjobs import create_job, job_payload
+from .pdf import company_branding, write_pdf
+from .resultset import row_class
+
+BOM = "\ufeff"
+CSV_CONTENT_TYPE = "text/csv; charset=utf-8"
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PDF_CONTENT_TYPE = "application/pdf"
+# Formatos de `config.columnar` (requieren pyarrow)
+COLUMNAR_CONTENT_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+
+def iter_procedure(procedure, params, chunk_size=None):
+    """
+    Ejecuta un procedimiento almacenado y retorna sus filas a medida que se leen del cursor.
+
+    Args:
+        procedure (str): Nombre del procedimiento en el esquema `dbo`.
+        params (dict): Parámetros `{nombre: valor}`, en el orden en que se envían.
+        chunk_size (int, optional): Filas por `fetchmany`; por defecto `EXPORT_CHUNK_SIZE`.
+
+    Yields:
+        Row: Cada fila, con acceso por nombre de columna (ver `config.resultset`).
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    assignments = ", ".join(f"@{name}=%s" for name in params)
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXEC [dbo].[{procedure}] {assignments}", list(params.values()))
+        if cursor.description is None:
+            return
+        row = row_class(tuple(col[0] for col in cursor.description))
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                return
+            for values in chunk:
+                yield row(values)
+
+
+def cell_value(value):
+    """
+    Convierte un valor en uno que se puede escribir en una celda: fechas en la hora local sin
+    zona horaria (Excel no las admite) y textos sin caracteres de control.
+    """
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub("", value)
+    return value
+
+
+class _Echo:
+    # `csv.writer` escribe cada fila en este objeto, que la retorna en lugar de guardarla
+    def write(self, value):
+        return value
+
+
+def write_csv(file, headers, rows):
+    """
+    Escribe un CSV en UTF-8 con BOM (para que Excel reconozca los acentos).
+
+    Args:
+        file: Archivo binario de destino.
+        headers (list): Encabezados.
+        rows (iterable): Filas como secuencias de valores.
+    """
+    writer = csv.writer(_Echo())
+    file.write((BOM + writer.writerow(headers)).encode("utf-8"))
+    for row in rows:
+        file.write(writer.writerow([cell_value(value) for value in row]).encode("utf-8"))
+
+
+def write_xlsx(file, headers, rows):
+    """
+    Escribe un libro XLSX de una hoja con un libro de solo escritura.
+
+    Args:
+        file: Archivo binario de destino, con `seek` y `tell`.
+        headers (list): Encabezados.
+        rows (iterable): Filas como secuencias de valores.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(headers)
+    try:
+        for row in rows:
+            sheet.append([cell_value(value) for value in row])
+    except BaseException:
+        # Cierra el archivo temporal de la hoja
+        sheet.close()
+        raise
+    workbook.save(file)
+
+
+EXPORT_FORMATS = {
+    "csv": (write_csv, CSV_CONTENT_TYPE),
+    "xlsx": (write_xlsx, XLSX_CONTENT_TYPE),
+    "pdf": (write_pdf, PDF_CONTENT_TYPE),
+}
+
+
+def spooled_response(write, filename, content_type, as_attachment=True):
+    """
+    Escribe un archivo temporal con `write(file)` y retorna la descarga.
+
+    Args:
+        write (callable): Función que escribe el contenido en el archivo binario que recibe.
+        filename (str): Nombre del archivo descargado, con extensión.
+        content_type (str): Tipo de contenido de la respuesta.
+        as_attachment (bool): Si es False el contenido se responde como un JSON o una página
+            normal, no como descarga.
+
+    Returns:
+        FileResponse: El archivo; se cierra (y se borra) al terminar la respuesta.
+    """
+    file = tempfile.SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_SIZE)
+    try:
+        write(file)
+        file.seek(0)
+    except BaseException:
+        file.close()
+        raise
+    return FileResponse(
+        file, as_attachment=as_attachment, filename=filename, content_type=content_type
+    )
+
+
+def export_response(export_format, filename, headers, rows, **options):
+    """
+    Escribe las filas en un archivo temporal y retorna la descarga.
+
+    Args:
+        export_format (str): Una clave de `EXPORT_FORMATS`.
+        filename (str): Nombre del archivo, sin extensión.
+        headers (list): Encabezados.
+        rows (iterable): Filas como secuencias de valores.
+        **options: Opciones del formato (`title` y `branding` del PDF).
+
+    Returns:
+        FileResponse: El archivo como adjunto.
+    """
+    writer, content_type = EXPORT_FORMATS[export_format]
+    return spooled_response(
+        lambda file: writer(file, [str(header) for header in headers], rows, **options),
+        f"{filename}.{export_format}",
+        content_type,
+    )
+
+
+class ExportView(View):
+    """
+    Vista base de las exportaciones de un listado.
+
+    Atributos:
+        procedure (str): Procedimiento que retorna las filas.
+        fallback_procedure (str, optional): Procedimiento que se consulta si el primero no
+            retorna filas.
+        filename (str): Nombre del archivo descargado, sin extensión.
+        title (str, optional): Título de las páginas del PDF; por defecto se deriva de
+            `filename`.
+    """
+
+    procedure = None
+    fallback_procedure = None
+    filename = "export"
+    title = None
+
+    def get_params(self, request):
+        return {}
+
+    def get_fallback_params(self, request):
+        return self.get_params(request)
+
+    def get_columns(self):
+        """
+        Retorna las columnas del archivo como `(encabezado traducido, clave de format_row)`.
+        """
+        raise NotImplementedError
+
+    def format_row(self, row):
+        raise NotImplementedError
+
+    def get_rows(self, request):
+        rows = iter_procedure(self.procedure, self.get_params(request))
+        if self.fallback_procedure is None:
+            return rows
+        return self._with_fallback(rows, request)
+
+    def _with_fallback(self, rows, request):
+        empty = True
+        for row in rows:
+            empty = False
+            yield row
+        if empty:
+            yield from iter_procedure(self.fallback_procedure, self.get_fallback_params(request))
+
+    def get_file_rows(self, request):
+        """
+        Retorna los encabezados y las filas del archivo (valores en el orden de las columnas).
+        """
+        columns = self.get_columns()
+        keys = [key for header, key in columns]
+        rows = (self.format_row(row) for row in self.get_rows(request))
+        return [header for header, key in columns], ([row[key] for key in keys] for row in rows)
+
+    def get_writer_options(self, request, export_format):
+        """
+        Retorna las opciones del formato: el título y la marca de la compañía del PDF.
+        """
+        if export_format != "pdf":
+            return {}
+        title = self.title or self.filename.replace("_", " ").capitalize()
+        return {"title": str(title), "branding": company_branding(request.user.company)}
+
+    def enqueue(self, request, export_format):
+        query = request.GET.copy()
+        query.pop("background", None)
+        view = type(self)
+        params = {"view": f"{view.__module__}.{view.__qualname__}", "query": query.urlencode()}
+        job = create_job("list", request.user, params, export_format, self.filename)
+        return JsonResponse(job_payload(job), status=202)
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get("format")
+
+        if export_format in EXPORT_FORMATS:
+            if request.GET.get("background") == "1":
+                return self.enqueue(request, export_format)
+            try:
+                headers, rows = self.get_file_rows(request)
+                options = self.get_writer_options(request, export_format)
+                return export_response(export_format, self.filename, headers, rows, **options)
+            except DatabaseError as e:
+                print("Error de base de datos:", e)
+                return JsonResponse({"error": _("The data could not be exported")}, status=500)
+
+        headers = [header for header, key in self.get_columns()]
+        try:
+            data = [self.format_row(row) for row in self.get_rows(request)]
+        except DatabaseError as e:
+            # Como antes, el listado se exporta vacío
+            print("Error de base de datos:", e)
+            data = []
+        return JsonResponse({"headers": headers, "data": data}, safe=False)
+
+
+def run_export_job(job, file, progress):
+    """
+    Genera el archivo de un trabajo de exportación de un listado (ver `config.exportjobs`).
+
+    La vista se ejecuta con una solicitud equivalente a la original: los mismos parámetros GET y
+    el usuario que creó el trabajo.
+    """
+    view_class = import_string(job["params"]["view"])
+    if not issubclass(view_class, ExportView):
+        raise TypeError(f"{job['params']['view']} no es una vista de exportación")
+    request = HttpRequest()
+    request.method = "GET"
+    request.GET = QueryDict(job["params"]["query"])
+    request.user = get_user_model().objects.get(pk=job["user_id"])
+    view = view_class()
+    view.setup(request)
+    headers, rows = view.get_file_rows(request)
+    writer, _content_type = EXPORT_FORMATS[job["format"]]
+    options = view.get_writer_options(request, job["format"])
+    writer(file, [str(header) for header in headers], progress.track(rows), **options)
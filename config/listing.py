@@ -0,0 +1,547 @@
+"""
+Motor de los listados paginados basados en procedimientos `List*`.
+
+Las páginas de búsqueda (vehículos, dispositivos, simcards, conductores, usuarios, ...) consultan
+un procedimiento almacenado por compañía. `ProcedureListView` centraliza ese flujo: cada vista
+declara el procedimiento, sus parámetros y cómo formatear una fila, y el motor lee el orden y la
+página de los filtros de la sesión, consulta la base de datos y construye la respuesta común
+(`results`, `page`, `query_string`).
+
+Por defecto el motor consulta todas las filas del procedimiento, las ordena con `config.sorting`
+y las pagina con `Paginator`. Los procedimientos listados en `LIST_ENGINE_PAGED_PROCEDURES` se
+llaman con cuatro parámetros adicionales, con la misma convención de `ReportAvlData`:
+
+    EXEC [dbo].[ListDeviceByCompany] @CompanyId=%s, @UserId=%s, @SearchQuery=%s,
+        @OrderBy=%s, @Direction=%s, @PageSize=%s, @PageNumber=%s
+
+y deben retornar solo las filas de la página ya ordenadas, cada una con la columna
+`TotalRecords` (`COUNT(*) OVER ()`), de modo que el costo de una página no depende del tamaño de
+la compañía; así los procedimientos se habilitan uno por uno a medida que se actualizan en la
+base de datos. Las vistas que declaran `cache_entities` guardan cada resultado en la caché
+`listing` (ver `config.resultcache`), así los cambios de orden y de página de la ruta sin
+paginación en la base de datos no repiten la consulta.
+
+Las tablas grandes (dispositivos, vehículos, comandos enviados, alarmas) aceptan además una
+paginación por cursor (`?pagination=cursor`, luego `?cursor=<token>`). En ese modo la vista
+consulta el modelo con el ORM ordenando por `(campo, pk)` y filtra a partir de la última fila
+vista (`campo > valor OR (campo = valor AND pk > id)`), de modo que la página un millón cuesta lo
+mismo que la primera con los índices compuestos `(company, campo, id)`. Los tokens `next` y
+`previous` van firmados (`django.core.signing`) y guardan esos valores y el sentido del recorrido.
+"""
+
+import json
+import logging
+import math
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils import translation
+from django.utils.translation import gettext as _
+from django.views import View
+
+from .resultcache import cached_call
+from .resultset import ResultSet
+from .sorting import sort_key, sort_rows
+
+logger = logging.getLogger(__name__)
+
+CURSOR_SALT = "config.listing.cursor"
+
+
+def format_long_date(value):
+    """
+    Formatea una fecha como "05 de marzo de 2024" (español) o "March 05, 2024".
+
+    Args:
+        value (date | datetime | None): Fecha a formatear.
+
+    Returns:
+        str: La fecha formateada, o una cadena vacía si no hay fecha.
+    """
+    if not value:
+        return ""
+    if translation.get_language() == "es":
+        month_name = _(value.strftime("%B"))
+        return value.strftime(f'%d {_("de")} {month_name} {_("de")} %Y')
+    return value.strftime("%B %d, %Y")
+
+
+def first_value(value):
+    # Los filtros de la sesión se guardan como listas (`QueryDict.lists()`)
+    if isinstance(value, (list, tuple)):
+        return value[0] if value else None
+    return value
+
+
+def execute_procedure(procedure, params):
+    """
+    Ejecuta un procedimiento almacenado con parámetros con nombre.
+
+    Args:
+        procedure (str): Nombre del procedimiento en el esquema `dbo`.
+        params (dict): Parámetros `{nombre: valor}`, en el orden en que se envían.
+
+    Returns:
+        ResultSet: Las filas.
+    """
+    assignments = ", ".join(f"@{name}=%s" for name in params)
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXEC [dbo].[{procedure}] {assignments}", list(params.values()))
+        return ResultSet.from_cursor(cursor)
+
+
+class ListPage:
+    """
+    Página de un listado, con la interfaz de `django.core.paginator.Page` que usan las vistas.
+
+    Args:
+        object_list (list): Filas de la página.
+        number (int): Número de la página.
+        page_size (int): Elementos por página.
+        count (int): Total de filas del listado.
+    """
+
+    def __init__(self, object_list, number, page_size, count):
+        self.object_list = object_list
+        self.number = number
+        self.page_size = page_size
+        self.count = count
+
+    @property
+    def num_pages(self):
+        return max(math.ceil(self.count / self.page_size), 1)
+
+    def has_next(self):
+        return self.number < self.num_pages
+
+    def has_previous(self):
+        return self.number > 1
+
+    def start_index(self):
+        if not self.count:
+            return 0
+        return (self.number - 1) * self.page_size + 1
+
+    def end_index(self):
+        return min(self.number * self.page_size, self.count)
+
+    def as_dict(self):
+        return {
+            "has_next": self.has_next(),
+            "has_previous": self.has_previous(),
+            "number": self.number,
+            "num_pages": self.num_pages,
+            "start_index": self.start_index(),
+            "end_index": self.end_index(),
+            "total_items": self.count,
+        }
+
+
+def _execute(procedure, params, entities):
+    if entities is None:
+        return execute_procedure(procedure, params)
+    return cached_call(
+        procedure, sorted(params.items()), entities, lambda: execute_procedure(procedure, params)
+    )
+
+
+def _fetch_paged(procedure, params, order_by, direction, number, page_size, entities=None):
+    def query(page_number):
+        paged = dict(
+            params,
+            OrderBy=order_by,
+            Direction=direction,
+            PageSize=page_size,
+            PageNumber=page_number,
+        )
+        rows = _execute(procedure, paged, entities)
+        if not rows:
+            return rows, 0
+        if "TotalRecords" not in rows.columns:
+            # Sin el total solo se conocen las filas hasta esta página
+            return rows, (page_number - 1) * page_size + len(rows)
+        return rows.without("TotalRecords"), int(rows[0].get("TotalRecords") or 0)
+
+    rows, total = query(number)
+    if not rows and number > 1:
+        # Página fuera de rango: como `Paginator`, se retorna la última
+        _, total = query(1)
+        number = max(math.ceil(total / page_size), 1)
+        rows, total = query(number) if total else ([], 0)
+    return ListPage(rows, number, page_size, total)
+
+
+def _fetch_all(
+    procedure, params, order_by, direction, number, page_size, key_function, entities=None
+):
+    rows = _execute(procedure, params, entities)
+    try:
+        rows = sort_rows(rows, order_by, direction == "desc", key_function)
+    except (KeyError, TypeError):
+        # Columnas inexistentes o valores no comparables: se conserva el orden del procedimiento
+        pass
+    paginator = Paginator(rows, page_size)
+    page = paginator.get_page(number)
+    return ListPage(list(page.object_list), page.number, page_size, paginator.count)
+
+
+def fetch_page(
+    sources, order_by, direction, page_number, page_size, key_function=sort_key, entities=None
+):
+    """
+    Consulta una página ordenada de un listado.
+
+    Args:
+        sources (list): Pares `(procedimiento, parámetros)`; los siguientes se consultan solo si
+            el anterior no trae filas (p. ej. `ListVehicleByCompany` para los usuarios sin
+            vehículos asignados).
+        order_by (str | None): Columna por la que ordenar; None conserva el orden del
+            procedimiento.
+        direction (str | None): `asc` o `desc`.
+        page_number: Número de página; los valores no numéricos equivalen a 1.
+        page_size (int): Elementos por página.
+        key_function (callable): `key_function(order_by)` retorna la clave de `sorted` de la
+            ruta sin paginación en la base de datos.
+        entities (iterable, optional): Entidades de las que depende el listado; si se indican,
+            los resultados se guardan en la caché `listing`.
+
+    Returns:
+        ListPage: La página; vacía si ocurre un error de base de datos.
+    """
+    try:
+        number = max(int(page_number), 1)
+    except (TypeError, ValueError):
+        number = 1
+    direction = "desc" if direction == "desc" else "asc"
+
+    page = ListPage([], 1, page_size, 0)
+    for procedure, params in sources:
+        try:
+            if procedure in settings.LIST_ENGINE_PAGED_PROCEDURES:
+                page = _fetch_paged(
+                    procedure, params, order_by, direction, number, page_size, entities
+                )
+            else:
+                page = _fetch_all(
+                    procedure,
+                    params,
+                    order_by,
+                    direction,
+                    number,
+                    page_size,
+                    key_function,
+                    entities,
+                )
+        except DatabaseError as e:
+            logger.error("Error de base de datos en %s: %s", procedure, e)
+            return ListPage([], 1, page_size, 0)
+        if page.count:
+            break
+    return page
+
+
+def company_filter(user, field="company"):
+    """
+    Filtro de las filas visibles para un usuario, con el mismo alcance de los procedimientos
+    `List*`: su compañía y las que provee, las compañías que monitorea o todas para la
+    compañía 1.
+
+    Args:
+        user (User): Usuario de la solicitud.
+        field (str): Ruta de la llave foránea a `Company`.
+
+    Returns:
+        Q: El filtro.
+    """
+    if user.company_id == 1:
+        return Q()
+    monitored = list(user.companies_to_monitor.values_list("id", flat=True))
+    if monitored:
+        return Q(**{f"{field}_id__in": monitored})
+    return Q(**{f"{field}_id": user.company_id}) | Q(**{f"{field}__provider_id": user.company_id})
+
+
+class KeysetPage:
+    """
+    Página de un listado por cursor.
+
+    Args:
+        object_list (list): Filas de la página.
+        page_size (int): Elementos por página.
+        next_cursor (str | None): Token de la página siguiente.
+        previous_cursor (str | None): Token de la página anterior.
+    """
+
+    def __init__(self, object_list, page_size, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def as_dict(self):
+        return {
+            "has_next": self.next_cursor is not None,
+            "has_previous": self.previous_cursor is not None,
+            "next": self.next_cursor,
+            "previous": self.previous_cursor,
+            "page_size": self.page_size,
+        }
+
+
+def _model_field(model, path):
+    # Campo del modelo al final de una ruta `relacion__campo`
+    field = None
+    for name in path.split("__"):
+        field = model._meta.pk if name == "pk" else model._meta.get_field(name)
+        model = field.related_model or model
+    return field
+
+
+def _row_value(row, path):
+    value = row
+    for name in path.split("__"):
+        value = getattr(value, name) if value is not None else None
+    return value
+
+
+def encode_cursor(values, backward=False):
+    """
+    Firma un token con los valores de orden de una fila.
+
+    Args:
+        values (list): Valores de los campos de orden, terminando en la llave primaria.
+        backward (bool): True si el token recorre hacia las filas anteriores.
+
+    Returns:
+        str: El token.
+    """
+    payload = {"v": json.loads(json.dumps(values, cls=DjangoJSONEncoder)), "b": backward}
+    return signing.dumps(payload, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token, model, fields):
+    """
+    Lee un token de `encode_cursor` para los campos de orden de un modelo.
+
+    Returns:
+        tuple | None: `(valores, hacia_atras)`, o None si el token no es válido o corresponde a
+        otro orden.
+    """
+    try:
+        payload = signing.loads(token, salt=CURSOR_SALT)
+        values, backward = payload["v"], bool(payload["b"])
+        if len(values) != len(fields):
+            return None
+        return [
+            _model_field(model, field).to_python(value) for field, value in zip(fields, values)
+        ], backward
+    except (signing.BadSignature, KeyError, TypeError, ValidationError, FieldDoesNotExist):
+        return None
+
+
+def seek_filter(fields, values, descending=False):
+    """
+    Filtro de las filas posteriores a unos valores de orden: para `(a, pk)` retorna
+    `a > v OR (a = v AND pk > id)` (`<` si el orden es descendente).
+    """
+    lookup = "lt" if descending else "gt"
+    seek = Q()
+    for position, field in enumerate(fields):
+        condition = Q(**{f"{field}__{lookup}": values[position]})
+        for previous, value in zip(fields[:position], values):
+            condition &= Q(**{previous: value})
+        seek |= condition
+    return seek
+
+
+def fetch_keyset(queryset, order_by, direction, page_size, cursor=None):
+    """
+    Consulta una página de un queryset después (o antes) de la fila de un cursor.
+
+    Args:
+        queryset (QuerySet): Filas del listado, ya filtradas.
+        order_by (str): Campo del modelo por el que ordenar; debe ser no nulo. El orden se
+            completa con la llave primaria para que sea único.
+        direction (str): `asc` o `desc`.
+        page_size (int): Elementos por página.
+        cursor (str, optional): Token `next` o `previous` de la página anterior; un token
+            inválido retorna la primera página.
+
+    Returns:
+        KeysetPage: La página con los tokens de sus vecinas.
+    """
+    fields = [order_by, "pk"] if order_by not in ("pk", queryset.model._meta.pk.name) else ["pk"]
+    decoded = decode_cursor(cursor, queryset.model, fields) if cursor else None
+    values, backward = decoded or (None, False)
+    descending = (direction == "desc") != backward
+
+    if values is not None:
+        queryset = queryset.filter(seek_filter(fields, values, descending))
+    ordering = [f"-{field}" if descending else field for field in fields]
+    rows = list(queryset.order_by(*ordering)[:page_size + 1])
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backward:
+        rows.reverse()
+
+    def token(row, backward):
+        return encode_cursor([_row_value(row, field) for field in fields], backward)
+
+    # Hacia adelante siempre hay página anterior si se llegó con un cursor; hacia atrás, siempre
+    # hay página siguiente
+    has_next = more if not backward else values is not None
+    has_previous = values is not None if not backward else more
+    return KeysetPage(
+        rows,
+        page_size,
+        token(rows[-1], False) if rows and has_next else None,
+        token(rows[0], True) if rows and has_previous else None,
+    )
+
+
+class ProcedureListView(View):
+    """
+    Vista base de los listados JSON con búsqueda, orden y paginación.
+
+    Atributos:
+        procedure (str): Procedimiento almacenado del listado.
+        fallback_procedure (str): Procedimiento que se consulta si el primero no trae filas.
+        session_name (str): Filtros de la sesión (`filters_sorted_<session_name>_<user_id>`) con
+            `order_by`, `direction`, `page` y `paginate_by`.
+        paginate_by (int): Elementos por página si la solicitud y la sesión no lo indican.
+        sort_fields (tuple): Columnas por las que se permite ordenar; None acepta cualquiera.
+        key_function (callable): Clave de orden de la ruta sin paginación en la base de datos.
+        cache_entities (tuple): Entidades de las que depende el listado (ver
+            `config.resultcache`); None no guarda los resultados.
+        keyset_fields (dict): Habilita la paginación por cursor; relaciona las columnas de
+            `order_by` con campos no nulos del modelo. Las columnas sin campo usan
+            `keyset_default`.
+        keyset_default (str): Campo del orden por cursor si la sesión no indica uno.
+        keyset_direction (str): Sentido del orden por cursor si la sesión no indica uno.
+        keyset_search_fields (tuple): Campos en los que se busca `query` (`icontains`).
+
+    Las subclases implementan `format_row` y, si el procedimiento usa otros parámetros,
+    `get_params`. Con `keyset_fields` implementan además `get_queryset` y `format_instance`;
+    una vista sin `procedure` solo responde por cursor.
+    """
+
+    procedure = None
+    fallback_procedure = None
+    session_name = None
+    paginate_by = 15
+    sort_fields = None
+    key_function = staticmethod(sort_key)
+    cache_entities = None
+    keyset_fields = None
+    keyset_default = "pk"
+    keyset_direction = "asc"
+    keyset_search_fields = ()
+
+    def get_params(self, request):
+        return {
+            "CompanyId": request.user.company_id,
+            "UserId": request.user.id,
+            "SearchQuery": request.GET.get("query", None),
+        }
+
+    def get_fallback_params(self, request):
+        return self.get_params(request)
+
+    def get_sources(self, request):
+        sources = [(self.procedure, self.get_params(request))]
+        if self.fallback_procedure:
+            sources.append((self.fallback_procedure, self.get_fallback_params(request)))
+        return sources
+
+    def get_paginate_by(self, request, session_filters):
+        paginate_by = request.POST.get("paginate_by", None)
+        if paginate_by is None:
+            paginate_by = first_value(session_filters.get("paginate_by"))
+        try:
+            return max(int(paginate_by), 1)
+        except (TypeError, ValueError):
+            return self.paginate_by
+
+    def format_row(self, row):
+        raise NotImplementedError
+
+    def get_queryset(self, request):
+        raise NotImplementedError
+
+    def format_instance(self, instance):
+        raise NotImplementedError
+
+    def uses_cursor(self, request):
+        if self.keyset_fields is None:
+            return False
+        if not self.procedure:
+            return True
+        return request.GET.get("pagination") == "cursor" or "cursor" in request.GET
+
+    def get_keyset_page(self, request, order_by, direction, page_size):
+        queryset = self.get_queryset(request)
+        query = request.GET.get("query", None)
+        if query and self.keyset_search_fields:
+            search = Q()
+            for field in self.keyset_search_fields:
+                search |= Q(**{f"{field}__icontains": query})
+            queryset = queryset.filter(search)
+        field = self.keyset_fields.get(order_by)
+        if field is None:
+            field, direction = self.keyset_default, None
+        return fetch_keyset(
+            queryset,
+            field,
+            direction or self.keyset_direction,
+            page_size,
+            request.GET.get("cursor") or None,
+        )
+
+    def get(self, request):
+        company = request.user.company_id
+        user_id = request.user.id
+        if not company or not user_id:
+            return JsonResponse({"error": "Faltan parámetros"}, status=400)
+
+        session_filters = request.session.get(f"filters_sorted_{self.session_name}_{user_id}", {})
+        page_number = request.GET.get("page") or first_value(session_filters.get("page")) or 1
+        order_by = first_value(session_filters.get("order_by"))
+        if self.sort_fields is not None and order_by not in self.sort_fields:
+            order_by = None
+        direction = first_value(session_filters.get("direction"))
+        page_size = self.get_paginate_by(request, session_filters)
+
+        if self.uses_cursor(request):
+            try:
+                page = self.get_keyset_page(request, order_by, direction, page_size)
+            except DatabaseError as e:
+                logger.error("Error de base de datos en %s: %s", type(self).__name__, e)
+                page = KeysetPage([], page_size)
+            response_data = {
+                "results": [self.format_instance(instance) for instance in page.object_list],
+                "page": page.as_dict(),
+                "query_string": request.GET.urlencode(),
+            }
+            return JsonResponse(response_data, safe=False)
+
+        page = fetch_page(
+            self.get_sources(request),
+            order_by,
+            direction,
+            page_number,
+            page_size,
+            self.key_function,
+            self.cache_entities,
+        )
+        response_data = {
+            "results": [self.format_row(row) for row in page.object_list],
+            "page": page.as_dict(),
+            "query_string": request.GET.urlencode(),
+        }
+        return JsonResponse(response_data, safe=False)
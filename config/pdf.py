@@ -0,0 +1,297 @@
+"""
+Informes tabulares en PDF con reportlab (platypus).
+
+`write_pdf` recibe las filas como un generador y las convierte en tablas de `ROWS_PER_TABLE`
+filas que se entregan a `build` a medida que se necesitan (`FlowableStream`), de modo que en
+memoria solo está la tabla en curso y no el informe completo. Todas las tablas usan los mismos
+anchos de columna; la plantilla de página dibuja en cada hoja la marca de la compañía (logo,
+nombre y color del tema), el título, los encabezados traducidos y el número de página, así los
+encabezados se repiten en cada página sin importar dónde termina cada tabla.
+
+El documento se escribe al final en `file` (reportlab guarda el contenido de las páginas
+comprimido hasta ese momento); los informes de miles de páginas deben generarse con
+`background=1` (ver `config.exportjobs`).
+"""
+
+import io
+import logging
+from datetime import date, datetime
+
+from django.utils import timezone
+from django.utils.formats import date_format
+from django.utils.translation import gettext as _
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate, Paragraph, Table, TableStyle
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = landscape(A4)
+MARGIN = 10 * mm
+BRAND_HEIGHT = 18 * mm
+HEADER_HEIGHT = 7 * mm
+FOOTER_HEIGHT = 8 * mm
+FONT = "Helvetica"
+FONT_BOLD = "Helvetica-Bold"
+FONT_SIZE = 7
+ROWS_PER_TABLE = 50
+# Filas de la primera tabla usadas para calcular los anchos de las columnas
+SAMPLE_ROWS = 200
+DEFAULT_COLOR = "#000000"
+
+CELL_STYLE = ParagraphStyle("cell", fontName=FONT, fontSize=FONT_SIZE, leading=FONT_SIZE + 1)
+
+
+class Branding:
+    """
+    Marca de la compañía en el encabezado de las páginas.
+
+    Args:
+        name (str): Nombre de la compañía.
+        logo (bytes, optional): Imagen del logo (PNG o JPG).
+        color (str): Color del tema en hexadecimal.
+    """
+
+    def __init__(self, name="", logo=None, color=DEFAULT_COLOR):
+        self.name = name
+        self.logo = logo
+        self.color = color or DEFAULT_COLOR
+
+
+def company_branding(company):
+    """
+    Retorna la marca de una compañía: `Company.company_logo` y el color de botones de su tema.
+    """
+    if company is None:
+        return Branding()
+    logo = None
+    if company.company_logo:
+        try:
+            with company.company_logo.open("rb") as image:
+                logo = image.read()
+        except Exception as e:
+            logger.warning("No se pudo leer el logo de la compañía %s: %s", company.pk, e)
+    theme = company.theme_set.first()
+    return Branding(company.company_name, logo, theme.button_color if theme else None)
+
+
+class FlowableStream(list):
+    """
+    Lista de flowables para `build` que se llena desde un generador cuando se vacía.
+
+    `BaseDocTemplate.build` consume la lista mientras `len(flowables)` no sea cero; aquí cada
+    consulta de la longitud con la lista vacía toma el siguiente flowable del generador.
+    """
+
+    def __init__(self, flowables):
+        super().__init__()
+        self.pending = iter(flowables)
+
+    def __len__(self):
+        if not list.__len__(self):
+            flowable = next(self.pending, None)
+            if flowable is not None:
+                self.append(flowable)
+        return list.__len__(self)
+
+
+def cell_text(value):
+    """
+    Convierte un valor en el texto de una celda.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return _("Yes") if value else _("No")
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, date):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, float):
+        return f"{value:.6f}".rstrip("0").rstrip(".")
+    return str(value)
+
+
+def column_widths(headers, sample, width):
+    """
+    Reparte el ancho disponible según la longitud de los encabezados y de las filas de muestra.
+    """
+    lengths = [min(max(len(str(header)), 4), 40) for header in headers]
+    for row in sample:
+        for position, text in enumerate(row):
+            lengths[position] = max(lengths[position], min(len(text), 40))
+    total = sum(lengths)
+    return [width * length / total for length in lengths]
+
+
+def escape(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _fits(text, column_width):
+    # Estimación del ancho del texto sin medir cada celda
+    return len(text) * FONT_SIZE * 0.5 <= column_width - 4
+
+
+class ReportTemplate(BaseDocTemplate):
+    """
+    Plantilla de los informes: marca, título y encabezados fijos en cada página.
+    """
+
+    def __init__(self, file, headers, widths, title, branding):
+        super().__init__(
+            file,
+            pagesize=PAGE_SIZE,
+            leftMargin=MARGIN,
+            rightMargin=MARGIN,
+            topMargin=MARGIN,
+            bottomMargin=MARGIN,
+            title=title,
+            author=branding.name,
+        )
+        self.headers = headers
+        self.widths = widths
+        self.report_title = title
+        self.branding = branding
+        self.color = colors.HexColor(branding.color)
+        self.logo = ImageReader(io.BytesIO(branding.logo)) if branding.logo else None
+        now = timezone.now()
+        if timezone.is_aware(now):
+            now = timezone.localtime(now)
+        self.generated = date_format(now, "DATETIME_FORMAT")
+        frame = Frame(
+            self.leftMargin,
+            self.bottomMargin + FOOTER_HEIGHT,
+            self.width,
+            self.height - BRAND_HEIGHT - HEADER_HEIGHT - FOOTER_HEIGHT,
+            leftPadding=0,
+            rightPadding=0,
+            topPadding=0,
+            bottomPadding=0,
+        )
+        self.addPageTemplates([PageTemplate("report", frames=[frame], onPage=self.draw_page)])
+
+    def draw_page(self, canvas, doc):
+        canvas.saveState()
+        page_width, page_height = PAGE_SIZE
+        top = page_height - self.topMargin
+
+        # Marca: logo, compañía, título y fecha de generación
+        text_x = self.leftMargin
+        if self.logo is not None:
+            canvas.drawImage(
+                self.logo,
+                self.leftMargin,
+                top - BRAND_HEIGHT + 2 * mm,
+                width=40 * mm,
+                height=BRAND_HEIGHT - 4 * mm,
+                preserveAspectRatio=True,
+                anchor="w",
+                mask="auto",
+            )
+            text_x += 44 * mm
+        canvas.setFillColor(self.color)
+        canvas.setFont(FONT_BOLD, 12)
+        canvas.drawString(text_x, top - 8 * mm, self.report_title)
+        canvas.setFillColor(colors.black)
+        canvas.setFont(FONT, 8)
+        canvas.drawString(text_x, top - 13 * mm, self.branding.name)
+        canvas.drawRightString(page_width - self.rightMargin, top - 13 * mm, self.generated)
+
+        # Encabezados de la tabla
+        header_top = top - BRAND_HEIGHT
+        canvas.setFillColor(self.color)
+        canvas.rect(
+            self.leftMargin, header_top - HEADER_HEIGHT, self.width, HEADER_HEIGHT, stroke=0, fill=1
+        )
+        canvas.setFillColor(colors.white)
+        canvas.setFont(FONT_BOLD, FONT_SIZE)
+        x = self.leftMargin
+        for header, column_width in zip(self.headers, self.widths):
+            text = header
+            while text and canvas.stringWidth(text, FONT_BOLD, FONT_SIZE) > column_width - 4:
+                text = text[:-1]
+            canvas.drawString(x + 2, header_top - HEADER_HEIGHT + 2.5 * mm, text)
+            x += column_width
+
+        # Pie de página
+        canvas.setFillColor(colors.grey)
+        canvas.setFont(FONT, 7)
+        canvas.drawRightString(
+            page_width - self.rightMargin,
+            self.bottomMargin,
+            _("Page %(number)s") % {"number": doc.page},
+        )
+        canvas.restoreState()
+
+
+TABLE_STYLE = TableStyle(
+    [
+        ("FONTNAME", (0, 0), (-1, -1), FONT),
+        ("FONTSIZE", (0, 0), (-1, -1), FONT_SIZE),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 2),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 2),
+        ("TOPPADDING", (0, 0), (-1, -1), 1),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 1),
+        ("ROWBACKGROUNDS", (0, 0), (-1, -1), [colors.white, colors.HexColor("#F2F2F2")]),
+        ("LINEBELOW", (0, 0), (-1, -1), 0.25, colors.HexColor("#D0D0D0")),
+    ]
+)
+
+
+def _tables(rows, widths):
+    # Tablas de ROWS_PER_TABLE filas; los textos que no caben se ajustan en varias líneas
+    data = []
+    for row in rows:
+        data.append(
+            [
+                text if _fits(text, column_width) else Paragraph(escape(text), CELL_STYLE)
+                for text, column_width in zip(row, widths)
+            ]
+        )
+        if len(data) == ROWS_PER_TABLE:
+            yield Table(data, colWidths=widths, style=TABLE_STYLE)
+            data = []
+    if data:
+        yield Table(data, colWidths=widths, style=TABLE_STYLE)
+
+
+def write_pdf(file, headers, rows, title="", branding=None):
+    """
+    Escribe un informe tabular en PDF.
+
+    Args:
+        file: Destino con `write` (archivo binario o `HttpResponse`).
+        headers (list): Encabezados ya traducidos.
+        rows (iterable): Filas como secuencias de valores, en el orden de los encabezados.
+        title (str): Título de las páginas.
+        branding (Branding, optional): Marca de la compañía.
+    """
+    branding = branding or Branding()
+    headers = [str(header) for header in headers]
+    rows = ([cell_text(value) for value in row] for row in rows)
+
+    # Los anchos se calculan con las primeras filas y se usan en todo el informe
+    sample = []
+    for row in rows:
+        sample.append(row)
+        if len(sample) == SAMPLE_ROWS:
+            break
+    width = PAGE_SIZE[0] - 2 * MARGIN
+    widths = column_widths(headers, sample, width)
+
+    def all_rows():
+        yield from sample
+        yield from rows
+
+    doc = ReportTemplate(file, headers, widths, title, branding)
+    flowables = FlowableStream(_tables(all_rows(), widths))
+    if not len(flowables):
+        flowables.append(Paragraph(escape(_("No results found")), CELL_STYLE))
+    doc.build(flowables)
@@ -0,0 +1,173 @@
+"""
+Caché de corta duración de los resultados de los procedimientos `List*`.
+
+Cada pulsación en el buscador y cada cambio de página o de orden ejecutaba de nuevo el mismo
+procedimiento con los mismos parámetros. `cached_procedure` (para las funciones de `sql.py`) y
+`cached_call` (para `config.listing`) guardan el resultado en la caché `listing` durante
+`LIST_CACHE_TIMEOUT` segundos, comprimido y como `(columnas, filas)` (ver `config.resultset`).
+
+La clave incluye el procedimiento, sus parámetros (compañía, usuario, búsqueda, ...) y la versión
+de cada entidad de la que depende el listado (`vehicle`, `device`, `simcard`, ...). Las señales
+`post_save` / `post_delete` de los modelos y las vistas que escriben con procedimientos llaman a
+`bump_versions_on_commit`, de modo que un cambio hecho desde la aplicación se ve en la siguiente
+consulta; los cambios hechos fuera de la aplicación (otros sistemas, `QuerySet.update`) se ven al
+expirar la entrada. Toda clave depende además de `company`.
+"""
+
+import functools
+import hashlib
+import logging
+import pickle
+import time
+import zlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+
+from .resultset import ResultSet
+
+logger = logging.getLogger(__name__)
+
+# Entidad de la que dependen todos los listados (nombres de compañía y proveedores)
+COMMON_ENTITY = "company"
+
+
+def _version_key(entity):
+    return f"version:{entity}"
+
+
+def _argument(value):
+    # Las funciones de `sql.py` reciben ids o instancias (`request.user.company`)
+    if isinstance(value, models.Model):
+        return value.pk
+    return value
+
+
+def get_versions(entities):
+    """
+    Retorna la versión actual de cada entidad; las que no existen se crean con la hora actual,
+    así una versión desalojada de la caché no vuelve a un valor anterior.
+    """
+    cache = caches["listing"]
+    keys = [_version_key(entity) for entity in entities]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*entities):
+    """
+    Invalida los resultados guardados de los listados que dependen de las entidades indicadas.
+    """
+    cache = caches["listing"]
+    for entity in entities:
+        key = _version_key(entity)
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), None)
+        except Exception as e:
+            logger.warning("No se pudo invalidar la caché de listados (%s): %s", entity, e)
+
+
+def bump_versions_on_commit(*entities):
+    """
+    Como `bump_versions`, pero dentro de un `transaction.atomic` espera a que la transacción se
+    confirme: si se invalidara antes, otra solicitud podría guardar el resultado anterior al
+    cambio con la versión nueva y mostrarlo hasta que expire.
+    """
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_versions(*entities))
+    else:
+        bump_versions(*entities)
+
+
+def _entry_key(procedure, arguments, entities):
+    entities = sorted(set(entities) | {COMMON_ENTITY})
+    versions = get_versions(entities)
+    digest = hashlib.md5(repr((arguments, versions)).encode("utf-8")).hexdigest()
+    return f"{procedure}:{digest}"
+
+
+def _encode(rows):
+    if not isinstance(rows, ResultSet):
+        rows = ResultSet.from_dicts(rows)
+    data = (list(rows.columns), [tuple(row) for row in rows])
+    return zlib.compress(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+
+
+def _decode(value):
+    columns, rows = pickle.loads(zlib.decompress(value))
+    return ResultSet(columns, rows)
+
+
+def cached_call(procedure, arguments, entities, fetch):
+    """
+    Retorna el resultado guardado de un procedimiento o lo consulta con `fetch()`.
+
+    Args:
+        procedure (str): Nombre del procedimiento, usado en la clave.
+        arguments: Parámetros del procedimiento (valor serializable con `repr`).
+        entities (iterable): Entidades de las que depende el resultado.
+        fetch (callable): Consulta el procedimiento y retorna un `ResultSet` (o una lista de
+            diccionarios).
+
+    Returns:
+        ResultSet: Las filas. Los resultados vacíos o None (también los de un error de base de
+        datos en las funciones que lo capturan) no se guardan.
+    """
+    if settings.LIST_CACHE_TIMEOUT <= 0:
+        return fetch()
+    cache = caches["listing"]
+    try:
+        key = _entry_key(procedure, arguments, entities)
+        cached = cache.get(key)
+    except Exception as e:
+        logger.warning("Caché de listados no disponible: %s", e)
+        return fetch()
+    if cached is not None:
+        return _decode(cached)
+
+    rows = fetch()
+    if rows:
+        try:
+            cache.set(key, _encode(rows), settings.LIST_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning("No se pudo guardar el listado en caché: %s", e)
+    return rows
+
+
+def cached_procedure(procedure, *entities):
+    """
+    Decorador de las funciones de `sql.py` que ejecutan un procedimiento `List*`.
+
+    Args:
+        procedure (str): Nombre del procedimiento, usado en la clave.
+        *entities (str): Entidades de las que depende el resultado.
+
+    Ejemplo:
+        @cached_procedure("ListDeviceByCompany", "device", "simcard")
+        def ListDeviceByCompany(company_id, user_id, search_query=None): ...
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            arguments = (
+                function.__name__,
+                tuple(_argument(value) for value in args),
+                tuple(sorted((name, _argument(value)) for name, value in kwargs.items())),
+            )
+            return cached_call(
+                procedure, arguments, entities, lambda: function(*args, **kwargs)
+            )
+
+        return wrapper
+
+    return decorator
+
@@ -0,0 +1,197 @@
+"""
+Resultados de los procedimientos almacenados como tuplas con acceso por nombre de columna.
+
+Las funciones de `sql.py` convertían cada fila del cursor en `dict(zip(columnas, fila))`: un
+diccionario por fila y por solicitud, con las mismas claves repetidas miles de veces.
+`ResultSet` guarda las columnas una sola vez y cada fila como una tupla (`Row`) de una clase
+generada por conjunto de columnas, sin `__dict__`, que se lee como un diccionario:
+
+    devices = ListDeviceByCompany(company_id, user_id)
+    devices[0]["imei"], devices[0].get("ip"), dict(devices[0])
+
+Las plantillas (`{{ device.imei }}`), `sorted`, `Paginator` y `config.sorting` la usan sin
+cambios. A diferencia de un diccionario, una fila es de solo lectura y al recorrerla con `for`
+entrega los valores, no los nombres de las columnas.
+"""
+
+import functools
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class Row(tuple):
+    """
+    Fila de un `ResultSet`: una tupla con la interfaz de lectura de un diccionario.
+    """
+
+    __slots__ = ()
+    columns = ()
+    index = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self.index[key])
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        position = self.index.get(key)
+        return default if position is None else tuple.__getitem__(self, position)
+
+    def keys(self):
+        return self.columns
+
+    def values(self):
+        return tuple(self)
+
+    def items(self):
+        return zip(self.columns, self)
+
+    def as_dict(self):
+        return dict(zip(self.columns, self))
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __eq__(self, other):
+        if isinstance(other, dict):
+            return self.as_dict() == other
+        return tuple.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = tuple.__hash__
+
+    def __repr__(self):
+        return f"Row({self.as_dict()!r})"
+
+    def __reduce__(self):
+        # Las clases generadas no se pueden importar; se reconstruyen desde las columnas
+        return make_row, (self.columns, tuple(self))
+
+
+@functools.lru_cache(maxsize=256)
+def row_class(columns):
+    """
+    Retorna la subclase de `Row` de un conjunto de columnas (una por conjunto, reutilizada).
+
+    Args:
+        columns (tuple): Nombres de las columnas.
+    """
+    index = {}
+    for position, column in enumerate(columns):
+        # Con columnas repetidas se conserva la última, como `dict(zip(...))`
+        index[column] = position
+    return type("Row", (Row,), {"__slots__": (), "columns": columns, "index": index})
+
+
+def make_row(columns, values):
+    return row_class(tuple(columns))(values)
+
+
+class ResultSet:
+    """
+    Filas de un procedimiento con sus columnas.
+
+    Args:
+        columns (iterable): Nombres de las columnas.
+        rows (iterable): Filas como secuencias de valores en el orden de las columnas.
+    """
+
+    def __init__(self, columns, rows=()):
+        self.columns = tuple(columns)
+        row = row_class(self.columns)
+        self.rows = [row(values) for values in rows]
+
+    @classmethod
+    def from_cursor(cls, cursor, rows=None):
+        """
+        Crea el resultado de la última sentencia de un cursor.
+
+        Args:
+            cursor: Cursor de la base de datos, después de `execute`.
+            rows (list, optional): Filas ya leídas con `fetchall`; por defecto se leen.
+        """
+        if cursor.description is None:
+            return cls(())
+        columns = [col[0] for col in cursor.description]
+        return cls(columns, cursor.fetchall() if rows is None else rows)
+
+    @classmethod
+    def from_dicts(cls, rows):
+        rows = list(rows)
+        columns = list(rows[0]) if rows else []
+        return cls(columns, ([row.get(column) for column in columns] for row in rows))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __bool__(self):
+        return bool(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            result = ResultSet(self.columns)
+            result.rows = self.rows[index]
+            return result
+        return self.rows[index]
+
+    def __eq__(self, other):
+        if isinstance(other, ResultSet):
+            return self.columns == other.columns and self.rows == other.rows
+        if isinstance(other, list):
+            return len(self.rows) == len(other) and all(
+                row == item for row, item in zip(self.rows, other)
+            )
+        return NotImplemented
+
+    def __repr__(self):
+        return f"<ResultSet columns={list(self.columns)} rows={len(self.rows)}>"
+
+    def sort(self, key=None, reverse=False):
+        self.rows.sort(key=key, reverse=reverse)
+
+    def without(self, *columns):
+        """
+        Retorna el resultado sin las columnas indicadas (p. ej. `TotalRecords`).
+        """
+        keep = [position for position, column in enumerate(self.columns) if column not in columns]
+        if len(keep) == len(self.columns):
+            return self
+        return ResultSet(
+            [self.columns[position] for position in keep],
+            ([row[position] for position in keep] for row in self.rows),
+        )
+
+    def as_dicts(self):
+        return [row.as_dict() for row in self.rows]
+
+    def to_json(self, formatter=None):
+        """
+        Serializa las filas como un arreglo JSON de objetos.
+
+        Args:
+            formatter (callable, optional): Convierte cada fila en el objeto a serializar; por
+                defecto todas sus columnas.
+
+        Returns:
+            str: El JSON, con fechas y decimales como en `JsonResponse`.
+        """
+        encoder = DjangoJSONEncoder(separators=(",", ":"))
+        formatter = formatter or Row.as_dict
+        return "[" + ",".join(encoder.encode(formatter(row)) for row in self.rows) + "]"
+
+    def to_compact_json(self):
+        """
+        Serializa el resultado como `{"columns": [...], "rows": [[...], ...]}`, sin repetir los
+        nombres de las columnas en cada fila.
+        """
+        return json.dumps(
+            {"columns": list(self.columns), "rows": [list(row) for row in self.rows]},
+            cls=DjangoJSONEncoder,
+            separators=(",", ":"),
+        )
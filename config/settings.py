@@ -192,6 +192,120 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Filas leídas por bloque al copiar el historial de un vehículo a la respuesta
+HISTORY_FETCH_SIZE = int(os.environ.get("HISTORY_FETCH_SIZE", "200"))
+
+# Caché de los recorridos históricos (bloques cerrados de GetVehicleHistory y GetAVLData)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "history": {
+        "BACKEND": os.environ.get(
+            "HISTORY_CACHE_BACKEND", "django.core.cache.backends.redis.RedisCache"
+        ),
+        "LOCATION": os.environ.get("HISTORY_CACHE_LOCATION", REDIS_URL),
+        "KEY_PREFIX": "history",
+    },
+    "geocoding": {
+        "BACKEND": os.environ.get(
+            "GEOCODING_CACHE_BACKEND", "django.core.cache.backends.redis.RedisCache"
+        ),
+        "LOCATION": os.environ.get("GEOCODING_CACHE_LOCATION", REDIS_URL),
+        "KEY_PREFIX": "geocoding",
+    },
+    "listing": {
+        "BACKEND": os.environ.get(
+            "LIST_CACHE_BACKEND", "django.core.cache.backends.redis.RedisCache"
+        ),
+        "LOCATION": os.environ.get("LIST_CACHE_LOCATION", REDIS_URL),
+        "KEY_PREFIX": "listing",
+    },
+    "exports": {
+        "BACKEND": os.environ.get(
+            "EXPORT_JOB_CACHE_BACKEND", "django.core.cache.backends.redis.RedisCache"
+        ),
+        "LOCATION": os.environ.get("EXPORT_JOB_CACHE_LOCATION", REDIS_URL),
+        "KEY_PREFIX": "exports",
+    },
+}
+# Tamaño en segundos de los bloques en que se divide un rango de historial
+HISTORY_CACHE_BUCKET = int(os.environ.get("HISTORY_CACHE_BUCKET", "3600"))
+# Segundos tras el fin de un bloque antes de considerarlo cerrado (reportes que llegan tarde y
+# diferencias de zona horaria de las fechas recibidas)
+HISTORY_CACHE_GRACE = int(os.environ.get("HISTORY_CACHE_GRACE", "7200"))
+# Segundos que se conserva cada bloque en caché
+HISTORY_CACHE_TIMEOUT = int(os.environ.get("HISTORY_CACHE_TIMEOUT", str(7 * 24 * 3600)))
+
+# Geocodificación inversa (PostGIS)
+# -----------------------------------------------------------------
+
+# Conexiones máximas del pool compartido por cada base de geocodificación
+GEOCODING_POOL_SIZE = int(os.environ.get("GEOCODING_POOL_SIZE", "10"))
+# Decimales a los que se redondean las coordenadas de la clave de caché (4 ≈ 11 m)
+GEOCODING_PRECISION = int(os.environ.get("GEOCODING_PRECISION", "4"))
+# Segundos que se conserva una dirección en la caché `geocoding` (Redis)
+GEOCODING_CACHE_TIMEOUT = int(os.environ.get("GEOCODING_CACHE_TIMEOUT", str(30 * 24 * 3600)))
+# Entradas y segundos de la caché en memoria de cada proceso, delante de Redis
+GEOCODING_LOCAL_CACHE_SIZE = int(os.environ.get("GEOCODING_LOCAL_CACHE_SIZE", "10000"))
+GEOCODING_LOCAL_CACHE_TIMEOUT = int(os.environ.get("GEOCODING_LOCAL_CACHE_TIMEOUT", "600"))
+# Geocodificación por lotes: coordenadas por consulta, consultas en paralelo y máximo de
+# coordenadas por solicitud al endpoint
+GEOCODING_BATCH_SIZE = int(os.environ.get("GEOCODING_BATCH_SIZE", "500"))
+GEOCODING_BATCH_WORKERS = int(os.environ.get("GEOCODING_BATCH_WORKERS", "4"))
+GEOCODING_BATCH_MAX = int(os.environ.get("GEOCODING_BATCH_MAX", "10000"))
+# Índice local de lugares (`build_place_index`) usado antes de PostGIS; vacío lo desactiva
+GEOCODING_OFFLINE_INDEX = os.environ.get("GEOCODING_OFFLINE_INDEX", "")
+# Distancia máxima en metros al lugar más cercano del índice para aceptar su nombre
+GEOCODING_OFFLINE_MAX_DISTANCE = float(os.environ.get("GEOCODING_OFFLINE_MAX_DISTANCE", "100"))
+# Segundos entre revisiones de una nueva versión del índice
+GEOCODING_OFFLINE_RELOAD = int(os.environ.get("GEOCODING_OFFLINE_RELOAD", "300"))
+
+# Configuración del mapa en vivo (socketmap)
+# -----------------------------------------------------------------
+
+# Redis donde el servicio de ingesta guarda el último documento ReJSON de cada IMEI
+GPS_REDIS_URL = os.environ.get("GPS_REDIS_URL", REDIS_URL)
+# Modo de difusión: "push" (notificaciones de Redis) o "poll" (consulta periódica)
+GPS_STREAM_MODE = os.environ.get("GPS_STREAM_MODE", "push")
+# Intervalo en segundos entre lecturas completas de Redis en modo "poll"
+GPS_POLL_INTERVAL = float(os.environ.get("GPS_POLL_INTERVAL", "0.5"))
+# Número de claves por lote en SCAN y JSON.MGET
+GPS_REDIS_BATCH_SIZE = int(os.environ.get("GPS_REDIS_BATCH_SIZE", "500"))
+# Set opcional con los IMEI activos mantenido por la ingesta (evita recorrer el keyspace)
+GPS_ACTIVE_SET_KEY = os.environ.get("GPS_ACTIVE_SET_KEY", "")
+# Zoom máximo en el que el mapa recibe grupos por celda en lugar de un marcador por vehículo
+GPS_CLUSTER_MAX_ZOOM = int(os.environ.get("GPS_CLUSTER_MAX_ZOOM", "10"))
+# Segundos mínimos entre dos envíos de grupos a un mismo socket
+GPS_CLUSTER_INTERVAL = float(os.environ.get("GPS_CLUSTER_INTERVAL", "1"))
+# Campos (rutas separadas por punto) del formato compacto de los mensajes del mapa en vivo
+GPS_COMPACT_FIELDS = os.environ.get(
+    "GPS_COMPACT_FIELDS",
+    "gps.latitude,gps.longitude,gps.calculated_speed,gps.angle,gps.signal_date,gps.main_event",
+)
+# Mensajes de control que pueden esperar envío en cada socket antes de cerrarlo
+GPS_SEND_QUEUE_SIZE = int(os.environ.get("GPS_SEND_QUEUE_SIZE", "20"))
+# Mensajes y bytes sin acuse (`{"action": "ack"}`) a partir de los que se deja de enviar
+# cambios a un socket; solo aplica a los clientes que envían acuses
+GPS_ACK_WINDOW_FRAMES = int(os.environ.get("GPS_ACK_WINDOW_FRAMES", "50"))
+GPS_ACK_WINDOW_BYTES = int(os.environ.get("GPS_ACK_WINDOW_BYTES", str(4 * 1024 * 1024)))
+# Segundos que se espera un acuse con la ventana llena antes de cerrar el socket
+GPS_SLOW_CONSUMER_TIMEOUT = float(os.environ.get("GPS_SLOW_CONSUMER_TIMEOUT", "30"))
+# Intervalo en segundos entre envíos para los clientes lentos
+GPS_SLOW_CONSUMER_INTERVAL = float(os.environ.get("GPS_SLOW_CONSUMER_INTERVAL", "5"))
+# Segundos sin sockets tras los que el proceso deja de consultar Redis
+GPS_HUB_IDLE_TIMEOUT = float(os.environ.get("GPS_HUB_IDLE_TIMEOUT", "30"))
+# Difusiones que se conservan por compañía para reanudar los sockets que se reconectan
+GPS_REPLAY_BUFFER_SIZE = int(os.environ.get("GPS_REPLAY_BUFFER_SIZE", "3000"))
+# Canal opcional en el que la ingesta publica el IMEI de cada posición actualizada
+GPS_PUSH_CHANNEL = os.environ.get("GPS_PUSH_CHANNEL", "")
+# Segundos entre recargas del índice IMEI → compañía usado para filtrar por cliente
+GPS_TENANT_INDEX_REFRESH = int(os.environ.get("GPS_TENANT_INDEX_REFRESH", "300"))
+# Agrega al iniciar el suscriptor las clases de `notify-keyspace-events` que faltan (Kdgx) a las
+# que ya tiene Redis (requiere permiso CONFIG). Desactivado: el Redis es compartido y lo normal
+# es configurarlo en el servidor
+GPS_CONFIGURE_KEYSPACE_EVENTS = os.getenv("GPS_CONFIGURE_KEYSPACE_EVENTS", "0") == "1"
+
 # Configuración de idioma e internacionalización
 # -----------------------------------------------------------------
 
@@ -359,6 +473,40 @@ EMAIL_USE_TLS = env.bool('EMAIL_USE_TLS', default=True)
 # -----------------------------------------------------------------
 
 DEFAULT_PAGINATION = 10
+# Procedimientos `List*` (separados por comas) que aceptan @OrderBy, @Direction, @PageSize y
+# @PageNumber y retornan `TotalRecords`: `config.listing` les pide solo la página ordenada. Los
+# demás se ordenan y paginan en Python
+LIST_ENGINE_PAGED_PROCEDURES = {
+    name.strip()
+    for name in os.getenv("LIST_ENGINE_PAGED_PROCEDURES", "").split(",")
+    if name.strip()
+}
+# Segundos que se conserva en la caché `listing` el resultado de un procedimiento `List*`; los
+# cambios hechos desde la aplicación lo invalidan antes (ver `config.resultcache`). 0 la desactiva
+LIST_CACHE_TIMEOUT = int(os.getenv("LIST_CACHE_TIMEOUT", "60"))
+# Filas a partir de las cuales `config.sorting.sort_rows` ordena con NumPy
+SORT_VECTORIZE_THRESHOLD = int(os.getenv("SORT_VECTORIZE_THRESHOLD", "2000"))
+# Exportaciones CSV/XLSX (`config.exports`): filas por `fetchmany` y bytes del archivo temporal
+# que se guardan en memoria antes de pasar a disco
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+EXPORT_SPOOL_SIZE = int(os.getenv("EXPORT_SPOOL_SIZE", str(5 * 1024 * 1024)))
+# Exportaciones Parquet/Arrow (`config.columnar`): filas por row group y compresión de columnas
+EXPORT_ROW_GROUP_SIZE = int(os.getenv("EXPORT_ROW_GROUP_SIZE", "100000"))
+EXPORT_COLUMNAR_COMPRESSION = os.getenv("EXPORT_COLUMNAR_COMPRESSION", "zstd")
+# Trabajos de exportación en segundo plano (`config.exportjobs`): "thread" los ejecuta en un
+# pool de hilos del mismo proceso; "redis" los encola para `manage.py run_export_jobs`
+EXPORT_JOB_BACKEND = os.getenv("EXPORT_JOB_BACKEND", "thread")
+EXPORT_JOB_REDIS_URL = os.getenv("EXPORT_JOB_REDIS_URL", REDIS_URL)
+# Trabajos simultáneos por proceso
+EXPORT_JOB_THREADS = int(os.getenv("EXPORT_JOB_THREADS", "2"))
+# Segundos que se conserva el estado de un trabajo (y su archivo, si no se descarga)
+EXPORT_JOB_TTL = int(os.getenv("EXPORT_JOB_TTL", str(24 * 3600)))
+# Segundos de validez del enlace de descarga desde que termina el trabajo
+EXPORT_DOWNLOAD_MAX_AGE = int(os.getenv("EXPORT_DOWNLOAD_MAX_AGE", "3600"))
+# Carpeta de `default_storage` (disco local o Azure Blob) donde se guardan los archivos
+EXPORT_STORAGE_PREFIX = os.getenv("EXPORT_STORAGE_PREFIX", "exports")
+# Segundos entre limpiezas de los archivos de trabajos vencidos en el worker
+EXPORT_JOB_PURGE_INTERVAL = int(os.getenv("EXPORT_JOB_PURGE_INTERVAL", "600"))
 
 # Configuración de logging
 # -----------------------------------------------------------------
@@ -12,6 +12,8 @@ from django.contrib import admin
 from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 from django.urls import include, path
 
+from config.exportjobs import job_download, job_status
+
 apps = i18n_patterns(
     # Módulo personalizado de autenticación de usuarios.
     path("", include("apps.authentication.urls"), name="main"),
@@ -29,6 +31,9 @@ apps = i18n_patterns(
     path("socketmap/", include("apps.socketmap.urls")),
     # Modulo de Power BI Embbeded
     path("powerbi/", include("apps.powerbi.urls")),
+    # Trabajos de exportación en segundo plano (estado y descarga)
+    path("exports/jobs/<str:job_id>", job_status, name="export_job_status"),
+    path("exports/jobs/<str:job_id>/download", job_download, name="export_job_download"),
 )
 
 django = i18n_patterns(